@@ -0,0 +1,273 @@
+# --------------------------------------------------
+# admission.py 🚦
+# --------------------------------------------------
+#
+# STORY:
+# A marketing campaign brings a sign-up rush. Without
+# a door policy every request walks in, they all queue
+# for the same DB threads and connections, and EVERYONE
+# waits until the browsers give up.
+#
+# Now there is a DOORMAN with five doors (classes):
+#
+#   auth      → /login, /register, /logout
+#   reads     → GET /members...
+#   writes    → POST / PUT / DELETE /members...
+#   dashboard → /dashboard...
+#   checkins  → /checkins (door scanners)
+#
+# Each door lets in at most LIMIT requests at a time.
+# A few more may wait in a short line (QUEUE), but
+# only for WAIT_MS. Anyone beyond that is told right
+# away: "503, come back in Retry-After seconds".
+# A fast "no" beats a slow timeout: the requests that
+# are let in stay fast.
+#
+# /login also has a per-client throttle (a token
+# bucket per IP): too many attempts → 429.
+#
+# Not gated: health check, /metrics, /debug, CORS
+# preflights and the /members/events stream (it stays
+# open for hours).
+#
+# Settings:
+# GYM_ADMISSION=0            → turn the doorman off
+# GYM_ADMISSION_LIMITS       → e.g. "auth=8,reads=64,writes=64,dashboard=16,checkins=16"
+# GYM_ADMISSION_QUEUES       → waiting places per door (same format)
+# GYM_ADMISSION_WAIT_MS      → longest wait in line
+# GYM_ADMISSION_RETRY_AFTER  → Retry-After seconds on a 503
+# GYM_LOGIN_RATE_PER_MIN     → login attempts per client per minute
+#                              (0 = no throttle)
+# GYM_LOGIN_BURST            → attempts allowed back to back
+#
+# Everything here runs on the event loop only, so no
+# locks are needed.
+# --------------------------------------------------
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+
+from fastapi.responses import JSONResponse
+
+ADMISSION = os.environ.get("GYM_ADMISSION", "1") != "0"
+
+
+def parse_classes(spec: str) -> dict:
+    """ "auth=8,reads=64" → {"auth": 8, "reads": 64} """
+    values = {}
+    for part in spec.split(","):
+        if part.strip():
+            name, value = part.split("=")
+            values[name.strip()] = int(value)
+    return values
+
+
+CLASS_LIMITS = {"auth": 8, "reads": 64, "writes": 64, "dashboard": 16, "checkins": 16}
+CLASS_LIMITS.update(parse_classes(os.environ.get("GYM_ADMISSION_LIMITS", "")))
+
+CLASS_QUEUES = {name: 4 * limit for name, limit in CLASS_LIMITS.items()}
+CLASS_QUEUES.update(parse_classes(os.environ.get("GYM_ADMISSION_QUEUES", "")))
+
+WAIT_MS = float(os.environ.get("GYM_ADMISSION_WAIT_MS", "2000"))
+RETRY_AFTER = int(os.environ.get("GYM_ADMISSION_RETRY_AFTER", "1"))
+
+LOGIN_RATE_PER_MIN = float(os.environ.get("GYM_LOGIN_RATE_PER_MIN", "10"))
+LOGIN_BURST = int(os.environ.get("GYM_LOGIN_BURST", "5"))
+
+UNGATED_PATHS = ("/", "/metrics", "/members/events")
+
+
+def route_class(method: str, path: str):
+    """Which door a request uses (None = not gated)."""
+    if method == "OPTIONS" or path in UNGATED_PATHS or path.startswith("/debug"):
+        return None
+    if path in ("/login", "/register", "/logout"):
+        return "auth"
+    if path.startswith("/dashboard"):
+        return "dashboard"
+    if path.startswith("/checkins"):
+        return "checkins"
+    if path.startswith("/members"):
+        return "reads" if method in ("GET", "HEAD") else "writes"
+    return None
+
+
+# --------------------------------------------------
+# STEP 1️⃣: One door
+# --------------------------------------------------
+class Gate:
+    def __init__(self, name: str, limit: int, queue_size: int, wait_ms: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.wait = wait_ms / 1000
+
+        self.active = 0
+        self._waiting = deque()  # futures, first come first served
+
+        self.admitted = 0
+        self.shed = {"queue_full": 0, "timeout": 0}
+
+    async def enter(self) -> bool:
+        """
+        STORY:
+        True  → you are in (call leave() when done)
+        False → turned away (line full, or waited too long)
+        """
+        if self.active < self.limit and not self._waiting:
+            self.active += 1
+            self.admitted += 1
+            return True
+
+        if len(self._waiting) >= self.queue_size:
+            self.shed["queue_full"] += 1
+            return False
+
+        ticket = asyncio.get_running_loop().create_future()
+        self._waiting.append(ticket)
+
+        try:
+            await asyncio.wait_for(ticket, self.wait)
+        except asyncio.TimeoutError:
+            self._forget(ticket)
+            self.shed["timeout"] += 1
+            return False
+        except BaseException:
+            # Client went away while waiting: hand back a
+            # place we may have just been given
+            self._forget(ticket)
+            if ticket.done() and not ticket.cancelled():
+                self.leave()
+            raise
+
+        self.admitted += 1
+        return True
+
+    def _forget(self, ticket):
+        try:
+            self._waiting.remove(ticket)
+        except ValueError:
+            pass
+
+    def leave(self):
+        # The place goes straight to the next one in line
+        while self._waiting:
+            ticket = self._waiting.popleft()
+            if not ticket.done():
+                ticket.set_result(None)
+                return
+
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": len(self._waiting),
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+        }
+
+
+# --------------------------------------------------
+# STEP 2️⃣: Login throttle (token bucket per client)
+# --------------------------------------------------
+#
+# STORY:
+# Every client has a bucket of LOGIN_BURST tokens that
+# refills at LOGIN_RATE_PER_MIN. A login attempt takes
+# one token; an empty bucket → 429 until it refills.
+#
+class LoginThrottle:
+    MAX_CLIENTS = 10_000  # forget full buckets beyond this
+
+    def __init__(self, rate_per_min: float = LOGIN_RATE_PER_MIN, burst: int = LOGIN_BURST):
+        self.rate = rate_per_min / 60
+        self.burst = burst
+
+        self._buckets = {}  # client → (tokens, last refill)
+        self.throttled = 0
+
+    def take(self, client: str) -> float:
+        """0 → allowed, otherwise seconds until the next try."""
+        if self.rate <= 0:
+            return 0  # throttle turned off
+
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+        if tokens >= 1:
+            self._buckets[client] = (tokens - 1, now)
+            if len(self._buckets) > self.MAX_CLIENTS:
+                self._prune(now)
+            return 0
+
+        self._buckets[client] = (tokens, now)
+        self.throttled += 1
+        return (1 - tokens) / self.rate
+
+    def _prune(self, now: float):
+        # Clients whose bucket has refilled are like new ones
+        self._buckets = {
+            client: (tokens, updated)
+            for client, (tokens, updated) in self._buckets.items()
+            if tokens + (now - updated) * self.rate < self.burst
+        }
+
+
+gates = {
+    name: Gate(name, limit, CLASS_QUEUES.get(name, 4 * limit), WAIT_MS)
+    for name, limit in CLASS_LIMITS.items()
+}
+login_throttle = LoginThrottle()
+
+
+def stats() -> dict:
+    return {name: gate.stats() for name, gate in gates.items()}
+
+
+# --------------------------------------------------
+# STEP 3️⃣: The middleware (pure ASGI)
+# --------------------------------------------------
+def refuse(status: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail},
+        status_code=status,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION:
+            return await self.app(scope, receive, send)
+
+        method, path = scope["method"], scope["path"]
+        name = route_class(method, path)
+        gate = gates.get(name)
+
+        if gate is None:
+            return await self.app(scope, receive, send)
+
+        if method == "POST" and path == "/login":
+            client = (scope.get("client") or ("unknown",))[0]
+            wait = login_throttle.take(client)
+            if wait:
+                response = refuse(429, "Too many login attempts, try again later", wait)
+                return await response(scope, receive, send)
+
+        if not await gate.enter():
+            response = refuse(503, "Server busy, please retry shortly", RETRY_AFTER)
+            return await response(scope, receive, send)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.leave()
@@ -7,9 +7,29 @@ import base64
 import json
 import hmac
 import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Request, HTTPException
+
+import shards
+from database import DEFAULT_BRANCH, current_shard
+from sql_profiler import show_timing
 
 SECRET_KEY = "gym_super_secret_key"
 
+# How long a login token stays valid (seconds)
+TOKEN_MAX_AGE = int(os.environ.get("GYM_TOKEN_MAX_AGE", str(24 * 60 * 60)))
+
+# The role that may look across branches (users.role)
+HEAD_OFFICE = "head_office"
+
+# Verified-token cache: how many tokens, and for how long
+TOKEN_CACHE_SIZE = int(os.environ.get("GYM_TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = int(os.environ.get("GYM_TOKEN_CACHE_TTL", "300"))
+
 
 def verify_token(token: str):
     """
@@ -17,6 +37,7 @@ def verify_token(token: str):
     - User sends token in request header
     - We decode it
     - We verify the signature
+    - We check it is not too old
     - If valid → allow access
     """
 
@@ -36,10 +57,201 @@ def verify_token(token: str):
             hashlib.sha256
         ).hexdigest()
 
-        if signature != expected_signature:
+        if not hmac.compare_digest(signature, expected_signature):
+            return None
+
+        if token_expires_at(payload) <= time.time():
             return None
 
         return payload  # token is valid
 
     except Exception:
         return None
+
+
+def token_expires_at(payload: dict) -> float:
+    return payload.get("issued_at", 0) + TOKEN_MAX_AGE
+
+
+# -------------------------------------------------
+# 🗂️ VERIFIED-TOKEN CACHE
+# -------------------------------------------------
+#
+# STORY:
+# The guard at the door used to re-check the stamp
+# on the SAME ID card on every single request
+# (base64 → JSON → HMAC).
+#
+# Now the guard keeps a short list of cards it has
+# already checked:
+# - LRU: the list holds at most TOKEN_CACHE_SIZE cards,
+#   the least recently seen one is dropped first
+# - TTL: a card is re-checked after TOKEN_CACHE_TTL
+#   seconds, and NEVER trusted past its own expiry
+# - Revoked cards (logout) are refused even if cached
+#
+class TokenCache:
+    def __init__(self, size: int = TOKEN_CACHE_SIZE, ttl: int = TOKEN_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+
+        self._entries = OrderedDict()  # token → (payload, valid_until)
+        self._revoked = {}             # token → expires_at
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token: str):
+        now = time.time()
+
+        with self._lock:
+            if token in self._revoked:
+                return None
+
+            entry = self._entries.get(token)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(token)
+                self.hits += 1
+                return entry[0]
+
+            self.misses += 1
+
+        payload = verify_token(token)
+
+        with self._lock:
+            if payload is None or token in self._revoked:
+                self._entries.pop(token, None)
+                return None
+
+            valid_until = min(now + self.ttl, token_expires_at(payload))
+            self._entries[token] = (payload, valid_until)
+            self._entries.move_to_end(token)
+
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+        return payload
+
+    def revoke(self, token: str):
+        payload = verify_token(token)
+        if payload is None:
+            return
+
+        now = time.time()
+
+        with self._lock:
+            self._entries.pop(token, None)
+            self._revoked[token] = token_expires_at(payload)
+
+            # Forget revocations of tokens that have expired anyway
+            for old, expires_at in list(self._revoked.items()):
+                if expires_at <= now:
+                    del self._revoked[old]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "revoked": len(self._revoked),
+            }
+
+
+token_cache = TokenCache()
+
+
+def bearer_token(request: Request) -> str:
+    auth_header = request.headers.get("Authorization")
+
+    if not auth_header:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    return auth_header.replace("Bearer ", "")
+
+
+# -------------------------------------------------
+# 🔐 SHARED DEPENDENCY
+# -------------------------------------------------
+async def require_user(request: Request) -> dict:
+    """
+    STORY:
+    One guard for every private route:
+
+        @router.get("/members")
+        async def get_members(user=Depends(require_user)):
+
+    - No Authorization header → 401 Unauthorized
+    - Bad / expired / revoked token → 401 Invalid token
+    - Otherwise → the token payload, and the rest of the
+      request works on the user's branch (shards.py)
+    """
+
+    payload = token_cache.verify(bearer_token(request))
+
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    if payload.get("role") == HEAD_OFFICE:
+        show_timing()  # Server-Timing headers (sql_profiler.py)
+
+    await enter_branch(payload)
+    return payload
+
+
+async def require_stream_user(request: Request) -> dict:
+    """
+    STORY:
+    Same guard, for GET /members/events.
+
+    The browser's EventSource cannot send headers, so
+    the token may also come as ?token=... in the URL.
+    """
+
+    token = request.query_params.get("token")
+    if not token:
+        return await require_user(request)
+
+    payload = token_cache.verify(token)
+
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    if payload.get("role") == HEAD_OFFICE:
+        show_timing()  # Server-Timing headers (sql_profiler.py)
+
+    await enter_branch(payload)
+    return payload
+
+
+async def enter_branch(payload: dict):
+    """
+    STORY:
+    Point the rest of this request at the user's branch
+    database. Tokens from before branches existed
+    belong to the default branch.
+    """
+
+    shard = await shards.shard_for(payload.get("branch") or DEFAULT_BRANCH)
+
+    if shard is None:
+        raise HTTPException(status_code=403, detail="Unknown branch")
+
+    current_shard.set(shard)
+
+
+def require_head_office(user: dict):
+    """
+    STORY:
+    Some rooms are for head office only (every branch's
+    numbers, process-wide debug data). The role is in
+    the token, given on purpose (python shards.py
+    head-office <email>), never by signing up.
+    """
+    if user.get("role") != HEAD_OFFICE:
+        raise HTTPException(status_code=403, detail="Head office only")
@@ -0,0 +1,147 @@
+# --------------------------------------------------
+# benchmarks/bench_export.py 🚰
+# --------------------------------------------------
+#
+# STORY:
+# Proves that GET /members/export STREAMS:
+# - the first bytes arrive almost immediately
+# - server memory does not grow with the register
+#
+# It starts the real app with uvicorn in a background
+# thread, downloads the export over HTTP and reports:
+#
+# - ttfb_ms          → time to first byte
+# - total_s          → time to download everything
+# - bytes / rows     → how much came through
+# - peak_python_mb   → peak Python memory during the
+#                      export (tracemalloc, second run)
+#
+# Usage (from backend/gym-backend):
+#   python benchmarks/bench_export.py --members 1m --format ndjson
+# --------------------------------------------------
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datasets  # noqa: E402
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int):
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    while not server.started:
+        time.sleep(0.05)
+
+    return server, thread
+
+
+def post_json(url: str, data: dict) -> dict:
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(data).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def login(base: str) -> str:
+    user = {"name": "bench", "email": "bench@gym.local", "password": "bench"}
+
+    answer = post_json(f"{base}/login", user)
+    if "token" not in answer:  # first run on this dataset
+        post_json(f"{base}/register", user)
+        answer = post_json(f"{base}/login", user)
+
+    return answer["token"]
+
+
+def download(url: str, token: str, chunk: int = 64 * 1024):
+    request = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"})
+
+    started = time.perf_counter()
+    first_byte = None
+    size = 0
+    lines = 0
+
+    with urllib.request.urlopen(request) as response:
+        while True:
+            data = response.read1(chunk)
+            if not data:
+                break
+            if first_byte is None:
+                first_byte = time.perf_counter()
+            size += len(data)
+            lines += data.count(b"\n")
+
+    finished = time.perf_counter()
+
+    return {
+        "ttfb_ms": round((first_byte - started) * 1000, 2),
+        "total_s": round(finished - started, 3),
+        "bytes": size,
+        "lines": lines,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming member export")
+    parser.add_argument("--members", type=datasets.member_count, default=datasets.SIZES["1m"])
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--db", default=None, help="reuse a dataset file (default: temp file)")
+    parser.add_argument("--skip-memory", action="store_true",
+                        help="skip the slower tracemalloc run")
+    args = parser.parse_args()
+
+    os.environ["GYM_DB_PATH"] = args.db or os.path.join(tempfile.mkdtemp(), "bench.db")
+
+    members = datasets.ensure_members(args.members)
+
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    server, thread = start_server(port)
+
+    token = login(base)
+    url = f"{base}/members/export?format={args.format}"
+
+    result = {"members": members, "format": args.format}
+    result.update(download(url, token))
+
+    if not args.skip_memory:
+        tracemalloc.start()
+        download(url, token)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_python_mb"] = round(peak / 1024 / 1024, 2)
+
+    server.should_exit = True
+    thread.join()
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# --------------------------------------------------
+# benchmarks/bench_group_commit.py 📮
+# --------------------------------------------------
+#
+# STORY:
+# Does group commit help at the evening rush?
+#
+# N clerks add members at the same time, first with
+# one commit per write, then through the group-commit
+# writer with a few different windows.
+#
+# For every mode it prints JSON:
+# - writes_per_s       → throughput
+# - p50_ms / p99_ms    → latency one clerk sees
+# - writes_per_commit  → how well writes were grouped
+#
+# Usage (from backend/gym-backend):
+#   python benchmarks/bench_group_commit.py --clerks 64 --writes 50
+# --------------------------------------------------
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def rush(repository, clerks: int, writes: int) -> list:
+    latencies = []
+
+    async def clerk(number: int):
+        for i in range(writes):
+            started = time.perf_counter()
+            await repository.add_member(f"Clerk {number} member {i}", "5550000", "Monthly")
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(clerk(number) for number in range(clerks)))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark group commit against one commit per write")
+    parser.add_argument("--clerks", type=int, default=64)
+    parser.add_argument("--writes", type=int, default=50, help="writes per clerk")
+    parser.add_argument("--windows", default="0,1,5", help="group-commit windows (ms) to try")
+    parser.add_argument("--max-batch", type=int, default=128)
+    parser.add_argument("--db", help="database file (default: a temp file)")
+    args = parser.parse_args()
+
+    os.environ["GYM_DB_PATH"] = args.db or os.path.join(tempfile.mkdtemp(), "bench.db")
+
+    import group_commit
+    import repository
+    from database import pool
+
+    modes = [("commit per write", None)] + [
+        (f"group commit {window} ms", float(window)) for window in args.windows.split(",")
+    ]
+
+    for label, window in modes:
+        writer = None
+        if window is not None:
+            writer = group_commit.GroupCommitWriter(pool, window, args.max_batch)
+        group_commit.writer = writer
+
+        started = time.perf_counter()
+        latencies = asyncio.run(rush(repository, args.clerks, args.writes))
+        elapsed = time.perf_counter() - started
+
+        if writer is not None:
+            writer.stop()
+
+        print(json.dumps({
+            "mode": label,
+            "writes": len(latencies),
+            "writes_per_s": round(len(latencies) / elapsed),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "writes_per_commit": round(writer.writes / writer.batches, 1) if writer else 1.0,
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# --------------------------------------------------
+# benchmarks/bench_login.py 🔐
+# --------------------------------------------------
+#
+# STORY:
+# How many logins per second can the gym take at a
+# given password-hash cost, and do the other routes
+# stay fast while a burst of logins is hashing?
+#
+# For every cost setting it:
+# 1️⃣ Registers a user whose hash uses that cost
+# 2️⃣ Lets --clients clients log in over and over
+#    for --seconds
+# 3️⃣ Meanwhile pings GET / to see whether the rest
+#    of the app still answers quickly
+#
+# and prints JSON per setting:
+# - logins_per_s       → throughput
+# - p50_ms / p99_ms    → login latency
+# - other_p99_ms       → GET / latency during the burst
+#
+# Usage (from backend/gym-backend):
+#   python benchmarks/bench_login.py --costs scrypt:16384,pbkdf2_sha256:600000
+# --------------------------------------------------
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_COSTS = "scrypt:4096,scrypt:16384,scrypt:32768,pbkdf2_sha256:100000,pbkdf2_sha256:600000"
+
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def use_cost(security, scheme: str, cost: int):
+    security.PASSWORD_SCHEME = scheme
+    if scheme == "scrypt":
+        security.SCRYPT_N = cost
+    else:
+        security.PBKDF2_ITERATIONS = cost
+
+
+async def burst(client, user: dict, clients: int, seconds: float):
+    logins, others = [], []
+    deadline = time.perf_counter() + seconds
+
+    async def login():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            answer = (await client.post("/login", json=user)).json()
+            assert answer.get("status") == "success", answer
+            logins.append(time.perf_counter() - started)
+
+    async def other():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await client.get("/")
+            others.append(time.perf_counter() - started)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(other(), *(login() for _ in range(clients)))
+    return logins, others
+
+
+async def run(args):
+    import httpx
+
+    import security
+    from main import app
+
+    if args.workers:
+        security.HASH_WORKERS = args.workers
+        security.hashing_executor = ThreadPoolExecutor(
+            max_workers=args.workers, thread_name_prefix="gym-hash"
+        )
+
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for setting in args.costs.split(","):
+            scheme, cost = setting.split(":")
+            use_cost(security, scheme, int(cost))
+
+            user = {"name": "bench", "email": f"bench-{scheme}-{cost}@gym.local", "password": "bench"}
+            await client.post("/register", json=user)
+
+            started = time.perf_counter()
+            logins, others = await burst(client, user, args.clients, args.seconds)
+            elapsed = time.perf_counter() - started
+
+            print(json.dumps({
+                "scheme": scheme,
+                "cost": int(cost),
+                "hash_workers": security.HASH_WORKERS,
+                "logins": len(logins),
+                "logins_per_s": round(len(logins) / elapsed, 1),
+                "p50_ms": round(percentile(logins, 50) * 1000, 1),
+                "p99_ms": round(percentile(logins, 99) * 1000, 1),
+                "other_p99_ms": round(percentile(others, 99) * 1000, 2),
+            }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login throughput per password-hash cost")
+    parser.add_argument("--costs", default=DEFAULT_COSTS, help="scheme:cost,... to try")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=0, help="hashing threads (default: GYM_HASH_WORKERS)")
+    parser.add_argument("--db", help="database file (default: a temp file)")
+    args = parser.parse_args()
+
+    os.environ["GYM_DB_PATH"] = args.db or os.path.join(tempfile.mkdtemp(), "bench.db")
+    # Measure the hashing pool, not the doorman (admission.py)
+    os.environ.setdefault("GYM_ADMISSION", "0")
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# --------------------------------------------------
+# benchmarks/bench_search.py 🔎
+# --------------------------------------------------
+#
+# STORY:
+# How fast does the front desk find a member?
+#
+# Runs typical searches (repository.search, the same
+# code GET /members/search uses) against a synthetic
+# gym and reports the median ms per query, in JSON:
+#
+# - phone fragments
+# - one common first name / surname
+# - first + last name, in either order
+# - two common names that never go together
+#   (nothing to find: the slowest case, every match
+#   of both words is read to prove it)
+#
+# --budget-ms N makes the script fail (exit 1) when a
+# query that finds members is above N.
+#
+# Usage (from backend/gym-backend):
+#   python benchmarks/bench_search.py --members 1m --db bench.db
+# --------------------------------------------------
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datasets  # noqa: E402
+
+QUERIES = [
+    "98765",
+    "priya",
+    "sharma",
+    "rao",
+    "priya sharma",
+    "patel priya",
+    "kavya pat",
+    "sharma 98",
+    "sharma singh",
+]
+
+
+def time_query(search, query: str, limit: int, runs: int) -> tuple:
+    words = query.split()
+    args = (
+        [word for word in words if len(word) >= 3],
+        [word for word in words if len(word) < 3],
+        query.strip(),
+        limit,
+    )
+
+    found = search(*args)  # warm the page cache
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        search(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return statistics.median(timings), len(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark member search")
+    parser.add_argument("--members", type=datasets.member_count, default=datasets.SIZES["1m"])
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--db", default=None, help="reuse a dataset file (default: temp file)")
+    parser.add_argument("--budget-ms", type=float, help="fail when a query with results is slower")
+    args = parser.parse_args()
+
+    os.environ["GYM_DB_PATH"] = args.db or os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ.setdefault("GYM_SQL_PROFILE", "0")
+    members = datasets.ensure_members(args.members)
+
+    from repository import _search_members
+
+    queries = {}
+    for query in QUERIES:
+        ms, found = time_query(_search_members, query, args.limit, args.runs)
+        queries[query] = {"ms": round(ms, 2), "found": found}
+
+    print(json.dumps({"members": members, "limit": args.limit, "queries": queries}, indent=2))
+
+    if args.budget_ms is not None:
+        over = [q for q, r in queries.items() if r["found"] and r["ms"] > args.budget_ms]
+        if over:
+            sys.exit(f"over {args.budget_ms} ms: {', '.join(over)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# --------------------------------------------------
+# benchmarks/bench_snapshot.py 🧮
+# --------------------------------------------------
+#
+# STORY:
+# How much faster are the NumPy analytics than the
+# old way: read every member and loop in Python with
+# plans.calculate_expiry()?
+#
+# It measures:
+# - loop_s             → the Python loop (plan summary,
+#                        join months, expiry histogram)
+# - snapshot_load_s    → first full load of the snapshot
+# - refresh_s          → incremental refresh after
+#                        --writes member changes
+# - vectorized_ms      → the same analytics in NumPy
+#
+# and checks that both ways give the same answer.
+#
+# Usage (from backend/gym-backend):
+#   python benchmarks/bench_snapshot.py --members 1m
+# --------------------------------------------------
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datasets  # noqa: E402
+
+
+def loop_analytics(connection, calculate_expiry, today: date, days: int):
+    """The per-row Python version, for comparison."""
+    plans = Counter()
+    active = Counter()
+    months = Counter()
+    still_active = Counter()
+    expiring = Counter()
+    first, last = today + timedelta(days=1), today + timedelta(days=days)
+
+    with connection() as conn:
+        for plan, joined_on in conn.execute("SELECT plan, joined_on FROM members"):
+            expiry = calculate_expiry(joined_on, plan).date()
+            month = joined_on[:7]
+
+            plans[plan] += 1
+            months[month] += 1
+
+            if expiry > today:
+                active[plan] += 1
+                still_active[month] += 1
+            if first <= expiry <= last:
+                expiring[expiry] += 1
+
+    return {
+        "total_members": sum(plans.values()),
+        "active_members": sum(active.values()),
+        "months": len(months),
+        "still_active": sum(still_active.values()),
+        "expiring": sum(expiring.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NumPy analytics against the Python loop")
+    parser.add_argument("--members", type=datasets.member_count, default=datasets.SIZES["1m"])
+    parser.add_argument("--writes", type=int, default=1000, help="changes before the refresh")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--db", default=None, help="reuse a dataset file (default: temp file)")
+    args = parser.parse_args()
+
+    os.environ["GYM_DB_PATH"] = args.db or os.path.join(tempfile.mkdtemp(), "bench.db")
+    members = datasets.ensure_members(args.members)
+
+    import snapshot as analytics
+    from database import DEFAULT_BRANCH, connection
+    from plans import calculate_expiry
+
+    if not analytics.AVAILABLE:
+        sys.exit("NumPy is not installed")
+
+    today = date.today()
+    result = {"members": members}
+
+    started = time.perf_counter()
+    expected = loop_analytics(connection, calculate_expiry, today, args.days)
+    result["loop_s"] = round(time.perf_counter() - started, 3)
+
+    snap = analytics.for_branch(DEFAULT_BRANCH)
+
+    started = time.perf_counter()
+    snap.refresh()
+    result["snapshot_load_s"] = round(time.perf_counter() - started, 3)
+
+    # Some front-desk traffic, then catch up
+    with connection() as conn:
+        conn.executemany(
+            "UPDATE members SET plan = 'Yearly', expiry_date = date(joined_on, '+365 days') "
+            "WHERE id = ?",
+            [(member_id,) for member_id in range(1, args.writes + 1)]
+        )
+
+    started = time.perf_counter()
+    columns = snap.refresh()
+    result["refresh_s"] = round(time.perf_counter() - started, 4)
+
+    started = time.perf_counter()
+    names = snap.plan_names
+    summary = analytics.plan_summary(columns, names, today.isoformat())
+    months = analytics.join_months(columns, names, today.isoformat())
+    histogram = analytics.expiry_histogram(columns, (today + timedelta(days=1)).isoformat(), args.days)
+    result["vectorized_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    # Same answers? (the loop sees the updated rows too)
+    expected = loop_analytics(connection, calculate_expiry, today, args.days)
+    actual = {
+        "total_members": summary["total_members"],
+        "active_members": summary["active_members"],
+        "months": len(months),
+        "still_active": sum(month["still_active"] for month in months),
+        "expiring": sum(day["expiring"] for day in histogram),
+    }
+    result["matches_loop"] = actual == expected
+    result["speedup"] = round(result["loop_s"] * 1000 / max(result["vectorized_ms"], 0.001))
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# --------------------------------------------------
+# benchmarks/bench_startup.py 🌅
+# --------------------------------------------------
+#
+# STORY:
+# How long from "start the server" until it answers?
+# Every run uses a FRESH Python process (a real cold
+# start), and reports JSON:
+#
+# - import_ms         → `import main`
+# - create_app_ms     → building the app (no database!)
+# - ready_ms          → uvicorn started until GET /
+#                       answers, per case:
+#                         new_db      → schema created on start
+#                         migrated_db → schema already up to date
+# - workers           → processes in the ready_ms runs
+# - slowest_imports   → the modules that cost the most
+#                       (python -X importtime), to see
+#                       what a regression dragged in
+#
+# Numbers are medians over --runs processes.
+#
+# --max-import-ms N makes the script fail (exit 1) when
+# import_ms is above N: handy as a start-up budget.
+#
+# Usage (from backend/gym-backend):
+#   python benchmarks/bench_startup.py --workers 4
+# --------------------------------------------------
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SCRIPT = """
+import time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.create_app()
+print(imported - started, time.perf_counter() - imported)
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def python(args: list, env: dict, **options):
+    return subprocess.run(
+        [sys.executable, *args], cwd=BACKEND, env=env,
+        capture_output=True, text=True, check=True, **options
+    )
+
+
+def time_import(env: dict) -> tuple:
+    imported, created = python(["-c", IMPORT_SCRIPT], env).stdout.split()
+    return float(imported) * 1000, float(created) * 1000
+
+
+def slowest_imports(env: dict, top: int) -> list:
+    # "import time: self [us] | cumulative | imported package",
+    # the package indented by 2 spaces per nesting level
+    lines = python(["-X", "importtime", "-c", "import main"], env).stderr.splitlines()
+    modules = []
+    for line in lines:
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            name = parts[2][1:]
+            if name.startswith("  ") and not name.startswith("    "):  # what main imports
+                modules.append((int(parts[1]) / 1000, name.strip()))
+
+    return [
+        {"module": name, "ms": round(ms, 1)}
+        for ms, name in sorted(modules, reverse=True)[:top]
+    ]
+
+
+def time_ready(env: dict, workers: int, timeout: float = 60) -> float:
+    port = free_port()
+    started = time.perf_counter()
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:create_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND, env=env,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                    return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+
+        raise TimeoutError(f"server did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start of the backend")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list")
+    parser.add_argument("--max-import-ms", type=float, help="fail when import_ms is above this")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ, GYM_DB_PATH=os.path.join(workdir, "gym.db"))
+
+    imports, creates = zip(*(time_import(env) for _ in range(args.runs)))
+
+    new_db = []
+    for run in range(args.runs):
+        new_db.append(time_ready(
+            dict(env, GYM_DB_PATH=os.path.join(workdir, f"new-{run}.db")), args.workers
+        ))
+
+    time_ready(env, 1)  # migrate once
+    migrated_db = [time_ready(env, args.workers) for _ in range(args.runs)]
+
+    result = {
+        "runs": args.runs,
+        "workers": args.workers,
+        "import_ms": round(statistics.median(imports), 1),
+        "create_app_ms": round(statistics.median(creates), 1),
+        "ready_ms": {
+            "new_db": round(statistics.median(new_db), 1),
+            "migrated_db": round(statistics.median(migrated_db), 1),
+        },
+        "slowest_imports": slowest_imports(env, args.top),
+    }
+    print(json.dumps(result, indent=2))
+
+    if args.max_import_ms is not None and result["import_ms"] > args.max_import_ms:
+        sys.exit(f"import_ms {result['import_ms']} is above the budget of {args.max_import_ms}")
+
+
+if __name__ == "__main__":
+    main()
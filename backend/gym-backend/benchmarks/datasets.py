@@ -0,0 +1,129 @@
+# --------------------------------------------------
+# benchmarks/datasets.py 🧪
+# --------------------------------------------------
+#
+# STORY:
+# Benchmarks need a BIG, believable gym.
+#
+# This file fills a database with fake members:
+# - Plan mix like a real gym (mostly Monthly)
+# - Join dates spread over the last few years,
+#   with more recent sign-ups than old ones
+#
+# The schema is created by database.py itself, so the
+# fake gym always matches the real one.
+#
+# Usage:
+#   python benchmarks/datasets.py --members 100000 --db bench.db
+# --------------------------------------------------
+
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PLAN_MIX = {
+    "Monthly": 0.55,
+    "Quarterly": 0.25,
+    "Yearly": 0.20,
+}
+
+FIRST_NAMES = [
+    "Aarav", "Vihaan", "Aditya", "Arjun", "Sai", "Reyansh", "Krishna", "Ishaan",
+    "Ananya", "Diya", "Saanvi", "Aadhya", "Priya", "Kavya", "Meera", "Riya",
+    "James", "Maria", "Chen", "Fatima", "Lucas", "Sofia", "Noah", "Amara",
+]
+
+LAST_NAMES = [
+    "Reddy", "Sharma", "Patel", "Rao", "Iyer", "Nair", "Gupta", "Singh",
+    "Khan", "Das", "Smith", "Garcia", "Wang", "Okafor", "Silva", "Müller",
+]
+
+SIZES = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+}
+
+
+def fake_members(count: int, years: int = 3, seed: int = 42):
+    """
+    STORY:
+    Yield (name, phone, plan, joined_on, expiry_date) rows.
+    Same seed → same gym, so runs are comparable.
+    """
+    from plans import expiry_date
+
+    rng = random.Random(seed)
+    today = date.today()
+    span = years * 365
+    plans = list(PLAN_MIX)
+    weights = list(PLAN_MIX.values())
+
+    for _ in range(count):
+        # Squaring a uniform number skews toward 0 → recent joins are more common
+        days_ago = int(span * rng.random() ** 2)
+        joined_on = (today - timedelta(days=days_ago)).isoformat()
+        plan = rng.choices(plans, weights)[0]
+
+        yield (
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            f"9{rng.randrange(10**9):09d}",
+            plan,
+            joined_on,
+            expiry_date(joined_on, plan),
+        )
+
+
+def populate(conn, count: int, batch: int = 10_000, seed: int = 42):
+    rows = fake_members(count, seed=seed)
+
+    while True:
+        chunk = [row for _, row in zip(range(batch), rows)]
+        if not chunk:
+            break
+
+        conn.executemany(
+            """
+            INSERT INTO members (name, phone, plan, joined_on, expiry_date)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            chunk
+        )
+
+
+def ensure_members(count: int):
+    """
+    STORY:
+    Make the database at GYM_DB_PATH hold at least
+    `count` members (only the missing ones are added).
+    """
+    from database import connection
+
+    with connection() as conn:
+        existing = conn.execute("SELECT COUNT(*) FROM members").fetchone()[0]
+
+    if existing < count:
+        with connection() as conn:
+            populate(conn, count - existing, seed=existing)
+
+    return max(existing, count)
+
+
+def member_count(value: str) -> int:
+    return SIZES.get(value.lower()) or int(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic gym.db")
+    parser.add_argument("--members", type=member_count, default=SIZES["100k"],
+                        help="10k, 100k, 1m or any number")
+    parser.add_argument("--db", default="bench.db")
+    args = parser.parse_args()
+
+    os.environ["GYM_DB_PATH"] = args.db
+    total = ensure_members(args.members)
+    print(f"{args.db}: {total} members")
@@ -0,0 +1,276 @@
+# --------------------------------------------------
+# benchmarks/loadtest.py 🏋️
+# --------------------------------------------------
+#
+# STORY:
+# How does the gym backend cope on a busy evening?
+#
+# This script:
+# 1️⃣ Builds (or reuses) a synthetic gym database
+#    (see datasets.py: 10k / 100k / 1m members)
+# 2️⃣ Runs the REAL app (main.app) in-process
+# 3️⃣ Lets N virtual front-desk clerks hit the routes
+#    at the same time for a fixed duration:
+#    /login, /members, /dashboard/stats,
+#    /dashboard/expiry and member writes
+# 4️⃣ Prints JSON: throughput + p50 / p95 / p99
+#    latency per route
+#
+# Save the JSON per commit and compare runs:
+#
+#   python benchmarks/loadtest.py --members 100k --output before.json
+#   ... change code ...
+#   python benchmarks/loadtest.py --members 100k --compare before.json
+#
+# Requires httpx (the same client FastAPI's TestClient uses).
+# --------------------------------------------------
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datasets  # noqa: E402
+
+USER = {"name": "loadtest", "email": "loadtest@gym.local", "password": "loadtest"}
+
+# route name → share of the traffic
+DEFAULT_MIX = {
+    "login": 5,
+    "members": 35,
+    "dashboard_stats": 20,
+    "dashboard_expiry": 10,
+    "add_member": 15,
+    "update_member": 10,
+    "delete_member": 5,
+}
+
+
+# --------------------------------------------------
+# The scenario: one function per route
+# --------------------------------------------------
+class Scenario:
+    def __init__(self, client, token: str, max_id: int, rng: random.Random):
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.max_id = max_id
+        self.rng = rng
+        self.created = []  # members added by this run (safe to delete)
+
+    async def login(self):
+        return await self.client.post("/login", json=USER)
+
+    async def members(self):
+        params = {"limit": 50}
+        pick = self.rng.random()
+        if pick < 0.3:
+            params["plan"] = self.rng.choice(list(datasets.PLAN_MIX))
+        elif pick < 0.5:
+            params["status"] = self.rng.choice(["active", "expired"])
+        elif pick < 0.7:
+            params["after_id"] = self.rng.randint(1, self.max_id)
+        return await self.client.get("/members", params=params, headers=self.headers)
+
+    async def dashboard_stats(self):
+        return await self.client.get("/dashboard/stats", headers=self.headers)
+
+    async def dashboard_expiry(self):
+        return await self.client.get("/dashboard/expiry", headers=self.headers)
+
+    async def add_member(self):
+        response = await self.client.post("/members", headers=self.headers, json={
+            "name": f"Load Test {self.rng.randrange(10**6)}",
+            "phone": f"8{self.rng.randrange(10**9):09d}",
+            "plan": self.rng.choice(list(datasets.PLAN_MIX)),
+        })
+        if response.status_code == 200:
+            self.created.append(response.json()["id"])
+        return response
+
+    async def update_member(self):
+        member_id = self.rng.randint(1, self.max_id)
+        return await self.client.put(f"/members/{member_id}", headers=self.headers, json={
+            "name": f"Updated {member_id}",
+            "phone": f"7{self.rng.randrange(10**9):09d}",
+            "plan": self.rng.choice(list(datasets.PLAN_MIX)),
+        })
+
+    async def delete_member(self):
+        if not self.created:
+            return await self.add_member()
+        member_id = self.created.pop()
+        return await self.client.delete(f"/members/{member_id}", headers=self.headers)
+
+
+# --------------------------------------------------
+# Numbers
+# --------------------------------------------------
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, duration: float) -> dict:
+    routes = {}
+
+    for route, latencies in sorted(samples.items()):
+        values = sorted(ms for ms, _ in latencies)
+        statuses = defaultdict(int)
+        for _, status in latencies:
+            statuses[str(status)] += 1
+
+        routes[route] = {
+            "requests": len(values),
+            "errors": sum(n for code, n in statuses.items() if not code.startswith(("2", "3"))),
+            "statuses": dict(statuses),
+            "throughput_rps": round(len(values) / duration, 2),
+            "mean_ms": round(sum(values) / len(values), 3),
+            "p50_ms": round(percentile(values, 0.50), 3),
+            "p95_ms": round(percentile(values, 0.95), 3),
+            "p99_ms": round(percentile(values, 0.99), 3),
+            "max_ms": round(values[-1], 3),
+        }
+
+    total = sum(route["requests"] for route in routes.values())
+
+    return {
+        "total_requests": total,
+        "throughput_rps": round(total / duration, 2),
+        "routes": routes,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(baseline: dict, current: dict) -> dict:
+    """
+    STORY:
+    For every route: how much did p50 / p95 / p99 and
+    throughput change compared with the baseline run?
+    (+10.0 means 10% higher)
+    """
+    def change(old, new):
+        return round((new - old) / old * 100, 1) if old else None
+
+    result = {}
+    for route, now in current["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if not before:
+            continue
+        result[route] = {
+            key: change(before[key], now[key])
+            for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+        }
+    return result
+
+
+# --------------------------------------------------
+# The run
+# --------------------------------------------------
+async def run(args) -> dict:
+    import httpx
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        answer = (await client.post("/login", json=USER)).json()
+        if "token" not in answer:
+            await client.post("/register", json=USER)
+            answer = (await client.post("/login", json=USER)).json()
+        token = answer["token"]
+
+        mix = {route: weight for route, weight in DEFAULT_MIX.items() if route in args.routes}
+        routes = list(mix)
+        weights = list(mix.values())
+
+        samples = defaultdict(list)
+        deadline = time.perf_counter() + args.duration
+
+        async def clerk(number: int):
+            rng = random.Random(args.seed + number)
+            scenario = Scenario(client, token, args.members, rng)
+
+            while time.perf_counter() < deadline:
+                route = rng.choices(routes, weights)[0]
+                started = time.perf_counter()
+                try:
+                    status = (await getattr(scenario, route)()).status_code
+                except Exception as error:
+                    status = type(error).__name__
+                samples[route].append(((time.perf_counter() - started) * 1000, status))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(clerk(n) for n in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "members": args.members,
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 2),
+    }
+    report.update(summarize(samples, elapsed))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the gym backend in-process")
+    parser.add_argument("--members", type=datasets.member_count, default=datasets.SIZES["10k"],
+                        help="10k, 100k, 1m or any number")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--routes", default=",".join(DEFAULT_MIX),
+                        help="comma-separated subset of: " + ", ".join(DEFAULT_MIX))
+    parser.add_argument("--db", default=None, help="reuse a dataset file (default: temp file)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    args = parser.parse_args()
+
+    args.routes = [route.strip() for route in args.routes.split(",") if route.strip()]
+    unknown = set(args.routes) - set(DEFAULT_MIX)
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+
+    os.environ["GYM_DB_PATH"] = args.db or os.path.join(tempfile.mkdtemp(), "loadtest.db")
+    # Every virtual clerk logs in from the same address
+    os.environ.setdefault("GYM_LOGIN_RATE_PER_MIN", "0")
+    datasets.ensure_members(args.members)
+
+    report = asyncio.run(run(args))
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            report["compared_to"] = args.compare
+            report["change_pct"] = compare(json.load(baseline), report)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as out:
+            out.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# --------------------------------------------------
+# benchmarks/stress_pool.py 🔀
+# --------------------------------------------------
+#
+# STORY:
+# The gym once shared ONE cursor between all requests:
+# under load a request could read ANOTHER request's
+# rows. The connection pool (database.py) gives every
+# request its own connection. This script checks that
+# it stays that way.
+#
+# Two rounds, both at the same time from many hands:
+#
+# 1️⃣ Pool: --threads threads borrow connections and
+#    write / read rows tagged with their OWN name.
+#    Every row they get back must carry their tag.
+# 2️⃣ App: --clerks virtual clerks add, read back,
+#    edit, search and delete their OWN members through
+#    the real routes (main.app, in-process). Every
+#    answer must match what THAT clerk sent.
+#
+# Prints JSON (checks done, mismatches seen) and exits
+# with 1 if anything came back mixed up.
+#
+# Usage (from backend/gym-backend):
+#   python benchmarks/stress_pool.py --threads 32 --clerks 16
+#
+# Requires httpx (the same client FastAPI's TestClient uses).
+# --------------------------------------------------
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+USER = {"name": "stress", "email": "stress@gym.local", "password": "stress"}
+
+
+# --------------------------------------------------
+# 1️⃣ Pool: raw connections from many threads
+# --------------------------------------------------
+def stress_pool(threads: int, rounds: int) -> dict:
+    from database import connection, read_connection
+
+    checks = 0
+    mismatches = []
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def worker(number: int):
+        nonlocal checks
+        tag = f"pool-{number}"
+        seen = 0
+        wrong = []
+
+        start.wait()  # everybody starts together
+        for step in range(rounds):
+            with connection() as conn:
+                member_id = conn.execute(
+                    "INSERT INTO members (name, phone, plan, joined_on, expiry_date)"
+                    " VALUES (?, ?, 'Monthly', date('now'), date('now', '+1 month'))",
+                    (f"{tag} {step}", f"{number:04d}{step:06d}")
+                ).lastrowid
+                row = conn.execute(
+                    "SELECT name FROM members WHERE id = ?", (member_id,)
+                ).fetchone()
+                seen += 1
+                if row != (f"{tag} {step}",):
+                    wrong.append({"thread": number, "expected": f"{tag} {step}", "got": row})
+
+            with read_connection() as conn:
+                rows = conn.execute(
+                    "SELECT ?, name FROM members WHERE name LIKE ? || ' %'", (tag, tag)
+                ).fetchall()
+                seen += 1
+                if len(rows) != step + 1 or any(
+                    echoed != tag or not name.startswith(tag + " ") for echoed, name in rows
+                ):
+                    wrong.append({"thread": number, "expected": tag, "got": rows[:3]})
+
+        with lock:
+            checks += seen
+            mismatches.extend(wrong)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    return {"threads": threads, "checks": checks, "mismatches": mismatches}
+
+
+# --------------------------------------------------
+# 2️⃣ App: real routes, many clerks at once
+# --------------------------------------------------
+async def stress_app(clerks: int, rounds: int) -> dict:
+    import httpx
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    checks = 0
+    mismatches = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress") as client:
+        await client.post("/register", json=USER)
+        token = (await client.post("/login", json=USER)).json()["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def expect(clerk: int, what: str, expected, got):
+            nonlocal checks
+            checks += 1
+            if expected != got:
+                mismatches.append(
+                    {"clerk": clerk, "check": what, "expected": expected, "got": got}
+                )
+
+        async def read_back(member_id: int) -> dict:
+            answer = await client.get(
+                "/members", params={"after_id": member_id - 1, "limit": 1}, headers=headers
+            )
+            items = answer.json()["items"]
+            return items[0] if items and items[0]["id"] == member_id else None
+
+        async def clerk(number: int):
+            for step in range(rounds):
+                name = f"Clerk{number:03d}x{step:05d}"
+                phone = f"8{number:03d}{step:06d}"
+
+                answer = await client.post(
+                    "/members", json={"name": name, "phone": phone, "plan": "Monthly"},
+                    headers=headers,
+                )
+                member_id = answer.json()["id"]
+
+                member = await read_back(member_id)
+                expect(number, "add", (name, phone), member and (member["name"], member["phone"]))
+
+                phone = f"9{number:03d}{step:06d}"
+                await client.put(
+                    f"/members/{member_id}",
+                    json={"name": name, "phone": phone, "plan": "Yearly"},
+                    headers=headers,
+                )
+                member = await read_back(member_id)
+                expect(number, "update", (name, phone, "Yearly"),
+                       member and (member["name"], member["phone"], member["plan"]))
+
+                found = (await client.get(
+                    "/members/search", params={"q": name}, headers=headers
+                )).json()["items"]
+                expect(number, "search", [member_id], [item["id"] for item in found])
+
+                if step % 3 == 0:
+                    await client.delete(f"/members/{member_id}", headers=headers)
+                    expect(number, "delete", None, await read_back(member_id))
+
+        await asyncio.gather(*(clerk(n) for n in range(clerks)))
+
+    return {"clerks": clerks, "checks": checks, "mismatches": mismatches}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that concurrent requests never see each other's rows")
+    parser.add_argument("--threads", type=int, default=32, help="threads on the raw pool")
+    parser.add_argument("--clerks", type=int, default=16, help="concurrent clerks on the app")
+    parser.add_argument("--rounds", type=int, default=50, help="iterations per thread / clerk")
+    parser.add_argument("--db", default=None, help="database file (default: temp file)")
+    args = parser.parse_args()
+
+    os.environ["GYM_DB_PATH"] = args.db or os.path.join(tempfile.mkdtemp(), "stress.db")
+    os.environ.setdefault("GYM_LOGIN_RATE_PER_MIN", "0")
+    # This script checks answers, not speed: queries wait on
+    # each other on purpose, don't log every one as slow
+    logging.getLogger("gym.sql").setLevel(logging.ERROR)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    started = time.perf_counter()
+    report = {
+        "pool": stress_pool(args.threads, args.rounds),
+        "app": asyncio.run(stress_app(args.clerks, args.rounds)),
+    }
+    report["duration_s"] = round(time.perf_counter() - started, 2)
+
+    mixed = len(report["pool"]["mismatches"]) + len(report["app"]["mismatches"])
+    report["ok"] = mixed == 0
+    print(json.dumps(report, indent=2, default=str))
+
+    if mixed:
+        sys.exit(f"{mixed} answers did not match their own request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# --------------------------------------------------
+# checkins.py 🚪
+# --------------------------------------------------
+#
+# STORY:
+# Every turnstile has a scanner. At peak hours the
+# doors scan THOUSANDS of members an hour.
+#
+# A scanner does not call us once per member: it
+# collects scans and sends them in BATCHES:
+#
+#   POST /checkins
+#   {
+#     "door": "front",
+#     "scans": [
+#       {"member_id": 12, "scanned_at": 1760800000},
+#       {"member_id": 7,  "scanned_at": "2026-10-18T17:05:00+05:30"},
+#       {"member_id": 31}                      ← scanned now
+#     ]
+#   }
+#
+# For every scan we answer whether it counted:
+# - malformed scan (member_id not a valid id, time
+#   not a real moment, too far in the future or past)
+#   → rejected (reported with its position)
+# - unknown member / membership not active that day
+#   → rejected (reported with its position)
+# - the same scan sent again (a scanner retrying after
+#   a timeout) → counted once, reported as duplicate
+#
+# Storing and checking memberships happen in ONE trip
+# to the database per batch (repository.record_checkins).
+#
+# The dashboard shows who is inside right now
+# (dashboard.py, /dashboard/occupancy).
+#
+# Settings:
+# GYM_CHECKIN_MAX_BATCH → most scans in one request
+# GYM_CHECKIN_MAX_AHEAD → seconds a scanner clock may
+#                         run ahead of ours
+# GYM_CHECKIN_MAX_AGE   → seconds a scan may be late
+#                         (a scanner that was offline
+#                         sends its backlog)
+# --------------------------------------------------
+
+import math
+import os
+import time
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException
+
+import repository
+from auth_guard import require_user
+
+router = APIRouter()
+
+MAX_BATCH = int(os.environ.get("GYM_CHECKIN_MAX_BATCH", "5000"))
+MAX_AHEAD = int(os.environ.get("GYM_CHECKIN_MAX_AHEAD", "300"))
+MAX_AGE = int(os.environ.get("GYM_CHECKIN_MAX_AGE", str(7 * 24 * 3600)))
+
+MAX_MEMBER_ID = 2 ** 63 - 1  # largest SQLite integer
+
+# Counters for /metrics
+stats = {"batches": 0, "accepted": 0, "duplicates": 0, "rejected": 0}
+
+
+def scan_time(value, now: float) -> int:
+    """
+    STORY:
+    When was the member scanned?
+    - missing        → now
+    - a number       → unix time (seconds)
+    - "YYYY-MM-DDTHH:MM:SS[+offset]" → that moment
+      (no offset = the gym's local time)
+    """
+    if value is None:
+        return int(now)
+
+    if isinstance(value, bool):
+        raise ValueError("scanned_at must be unix time or an ISO date-time")
+
+    if isinstance(value, (int, float)):
+        scanned_at = value
+    else:
+        try:
+            scanned_at = datetime.fromisoformat(str(value)).timestamp()
+        except (ValueError, OverflowError):
+            raise ValueError("scanned_at must be unix time or an ISO date-time")
+
+    # JSON may carry NaN / Infinity
+    if not math.isfinite(scanned_at):
+        raise ValueError("scanned_at must be unix time or an ISO date-time")
+
+    if scanned_at > now + MAX_AHEAD:
+        raise ValueError("scanned_at is in the future")
+
+    if scanned_at < now - MAX_AGE:
+        raise ValueError("scanned_at is too old")
+
+    return int(scanned_at)
+
+
+def validate_scan(record, default_door, now: float) -> tuple:
+    """
+    STORY:
+    Turn one scan into (member_id, scanned_at, door),
+    or raise ValueError explaining what is wrong.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("expected an object with member_id")
+
+    member_id = record.get("member_id")
+    if isinstance(member_id, bool) or not isinstance(member_id, int):
+        raise ValueError("member_id must be a whole number")
+
+    if not 0 <= member_id <= MAX_MEMBER_ID:
+        raise ValueError("member_id is out of range")
+
+    door = record.get("door", default_door)
+    if door is not None:
+        door = str(door)
+
+    return member_id, scan_time(record.get("scanned_at"), now), door
+
+
+@router.post("/checkins")
+async def record_checkins(data: dict, user: dict = Depends(require_user)):
+    """
+    STORY:
+    - A door scanner sends a batch of scans
+    - Token is checked (the scanner logs in like staff)
+    - Every scan is validated
+    - Memberships are checked for the WHOLE batch at once
+    - Scans that count are stored in one transaction
+    - The rest are reported back with their position
+      ("index", counted from 0)
+    """
+    scans = data.get("scans")
+    if not isinstance(scans, list):
+        raise HTTPException(status_code=400, detail="Expected a list of scans")
+
+    if len(scans) > MAX_BATCH:
+        raise HTTPException(
+            status_code=413, detail=f"At most {MAX_BATCH} scans per batch"
+        )
+
+    now = time.time()
+    door = data.get("door")
+
+    valid = []
+    positions = []  # index in the request of every valid scan
+    errors = []
+
+    for index, record in enumerate(scans):
+        try:
+            valid.append(validate_scan(record, door, now))
+            positions.append(index)
+        except ValueError as error:
+            errors.append({"index": index, "error": str(error)})
+
+    accepted, duplicates, rejected = (
+        await repository.record_checkins(valid) if valid else (0, 0, [])
+    )
+
+    for position, reason in rejected:
+        errors.append({
+            "index": positions[position],
+            "member_id": valid[position][0],
+            "error": reason,
+        })
+    errors.sort(key=lambda error: error["index"])
+
+    stats["batches"] += 1
+    stats["accepted"] += accepted
+    stats["duplicates"] += duplicates
+    stats["rejected"] += len(errors)
+
+    return {
+        "accepted": accepted,
+        "duplicates": duplicates,
+        "rejected": len(errors),
+        "errors": errors,
+    }
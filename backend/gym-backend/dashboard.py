@@ -15,64 +15,95 @@
 # - Which plans are most used?
 # - Whose membership is expiring soon?
 # - Whose membership is already expired?
+# - How did the gym grow, day by day?
+# - Plan mix and retention per join month?
+# - How many people are in the gym right now?
+#
+# Each branch sees its own gym. Head office may ask
+# for ?branch=<id> or ?branch=all (every branch at
+# once, see shards.py) on stats, expiry and occupancy.
 #
 # All logic here is READ-ONLY and ADMIN-ONLY.
 # ==================================================
 
-from fastapi import APIRouter, Request, HTTPException
-from datetime import datetime, timedelta
+import heapq
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from datetime import date, datetime, timedelta
 
-from auth_guard import verify_token
-from database import cursor
+from auth_guard import require_head_office, require_user
+import repository
+import shards
+from database import current_branch, current_shard
+from plans import PLAN_DAYS
+from response_cache import cached_json
+import snapshot as analytics_snapshot
 
 router = APIRouter()
 
+ALL_BRANCHES = "all"
+
+
+# ==================================================
+# WHICH BRANCH? 🏢
+# ==================================================
+async def choose_branch(user: dict, branch: Optional[str]) -> bool:
+    """
+    STORY:
+    - No ?branch          → the user's own branch
+    - ?branch=<id> / all  → head office only
+
+    Returns True for "all branches"; for one branch the
+    request is pointed at that branch's database.
+    """
+    if branch is None:
+        return False
+
+    require_head_office(user)
+
+    if branch == ALL_BRANCHES:
+        return True
+
+    shard = await shards.shard_for(branch)
+    if shard is None:
+        raise HTTPException(status_code=404, detail="Unknown branch")
 
-# --------------------------------------------------
-# HELPER: Calculate expiry date based on plan
-# --------------------------------------------------
-def calculate_expiry(joined_on: str, plan: str) -> datetime:
-    joined_date = datetime.fromisoformat(joined_on)
+    current_shard.set(shard)
+    return False
 
-    if plan == "Monthly":
-        return joined_date + timedelta(days=30)
-    elif plan == "Quarterly":
-        return joined_date + timedelta(days=90)
-    else:  # Yearly
-        return joined_date + timedelta(days=365)
+
+async def all_branches_version() -> str:
+    """Changes whenever ANY branch changes (response_cache.py)."""
+    versions = await shards.fan_out(repository.data_version)
+    return ".".join(str(versions[branch]) for branch in sorted(versions))
 
 
 # ==================================================
 # DASHBOARD STATS 📊
 # ==================================================
-@router.get("/dashboard/stats")
-def dashboard_stats(request: Request):
+async def stats_summary():
     """
     STORY:
-    This endpoint gives HIGH-LEVEL NUMBERS to admin.
+    HIGH-LEVEL NUMBERS for the admin.
     No member details, only summary counts.
     """
 
     # -------------------------------
-    # STEP 1: Verify admin token 🔐
-    # -------------------------------
-    auth = request.headers.get("Authorization")
-    if not auth:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-    token = auth.replace("Bearer ", "")
-    if not verify_token(token):
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    # -------------------------------
-    # STEP 2: Fetch member data
+    # STEP 1: Read the tally sheets
     # -------------------------------
-    cursor.execute("SELECT plan, joined_on FROM members")
-    rows = cursor.fetchall()
-
-    total_members = len(rows)
-    active_members = 0
-    inactive_members = 0
+    #
+    # Triggers in database.py keep per-plan and
+    # per-expiry-day counters, so this is a handful
+    # of rows no matter how big the gym gets.
+    #
+    # A membership is active while its expiry date
+    # is still ahead of today.
+    #
+    plans, active_members = await repository.dashboard_counts(
+        date.today().isoformat()
+    )
 
     plan_count = {
         "Monthly": 0,
@@ -80,23 +111,18 @@ def dashboard_stats(request: Request):
         "Yearly": 0
     }
 
-    today = datetime.now()
-
     # -------------------------------
-    # STEP 3: Calculate stats
+    # STEP 2: Calculate stats
     # -------------------------------
-    for plan, joined_on in rows:
-        expiry_date = calculate_expiry(joined_on, plan)
+    for plan, members in plans:
+        if members:
+            plan_count[plan] = members
 
-        if expiry_date >= today:
-            active_members += 1
-        else:
-            inactive_members += 1
-
-        plan_count[plan] += 1
+    total_members = sum(plan_count.values())
+    inactive_members = total_members - active_members
 
     # -------------------------------
-    # STEP 4: Return summary
+    # STEP 3: Return summary
     # -------------------------------
     return {
         "total_members": total_members,
@@ -106,65 +132,395 @@ def dashboard_stats(request: Request):
     }
 
 
+async def all_branches_stats():
+    """
+    STORY:
+    Every branch counts its own members at the same
+    time; we add the numbers up (and keep each
+    branch's own summary too).
+    """
+    per_branch = await shards.fan_out(stats_summary)
+
+    plans = {plan: 0 for plan in PLAN_DAYS}
+    for summary in per_branch.values():
+        for plan, members in summary["plans"].items():
+            plans[plan] = plans.get(plan, 0) + members
+
+    return {
+        "total_members": sum(s["total_members"] for s in per_branch.values()),
+        "active_members": sum(s["active_members"] for s in per_branch.values()),
+        "inactive_members": sum(s["inactive_members"] for s in per_branch.values()),
+        "plans": plans,
+        "branches": per_branch,
+    }
+
+
+@router.get("/dashboard/stats")
+async def dashboard_stats(
+    request: Request,
+    user: dict = Depends(require_user),
+    branch: Optional[str] = None,
+):
+    """
+    STORY:
+    This endpoint gives HIGH-LEVEL NUMBERS to admin.
+    Between member writes it is answered from
+    response_cache (or as 304 Not Modified).
+
+    ?branch=all → totals over every branch (head office)
+    """
+    if await choose_branch(user, branch):
+        return await cached_json(request, all_branches_stats, version=all_branches_version)
+
+    return await cached_json(request, stats_summary)
+
+
 # ==================================================
 # DASHBOARD EXPIRY ⏰
 # ==================================================
+async def expiry_lists(days: int, limit: int):
+    """
+    STORY:
+    - Who is EXPIRING SOON (next `days` days)
+    - Who is already EXPIRED (most recent first)
+
+    Each list holds at most `limit` members.
+    """
+
+    # -------------------------------
+    # STEP 1: Range scans on expiry_date
+    # -------------------------------
+    #
+    # expiry_date is stored + indexed, so SQLite jumps
+    # straight to the matching members:
+    #
+    # expired       → expiry_date <= today
+    # expiring soon → tomorrow .. today + days
+    #
+    today = date.today()
+    soon_limit = today + timedelta(days=days)
+
+    expiring_rows = await repository.expiring_between(
+        (today + timedelta(days=1)).isoformat(),
+        soon_limit.isoformat(),
+        limit
+    )
+    expired_rows = await repository.expired_by(today.isoformat(), limit)
+
+    # -------------------------------
+    # STEP 2: Shape the response
+    # -------------------------------
+    def member_info(row):
+        member_id, name, plan, expiry_date = row
+        return {
+            "id": member_id,
+            "name": name,
+            "plan": plan,
+            "expiry_date": expiry_date
+        }
+
+    # -------------------------------
+    # STEP 3: Return expiry info
+    # -------------------------------
+    return {
+        "expiring_soon": [member_info(row) for row in expiring_rows],
+        "expired": [member_info(row) for row in expired_rows]
+    }
+
+
+async def all_branches_expiry(days: int, limit: int):
+    """
+    STORY:
+    Every branch finds its own `limit` members at the
+    same time. Each list is already sorted by expiry
+    date, so merging them and keeping the first `limit`
+    gives the right answer for the whole chain.
+    Every member says which branch it belongs to
+    (ids repeat between branches).
+    """
+    per_branch = await shards.fan_out(expiry_lists, days, limit)
+
+    def merged(key: str, newest_first: bool):
+        lists = [
+            [dict(member, branch=branch) for member in lists[key]]
+            for branch, lists in per_branch.items()
+        ]
+        members = heapq.merge(
+            *lists, key=lambda member: member["expiry_date"], reverse=newest_first
+        )
+        return list(members)[:limit]
+
+    return {
+        "expiring_soon": merged("expiring_soon", newest_first=False),
+        "expired": merged("expired", newest_first=True),
+    }
+
+
 @router.get("/dashboard/expiry")
-def dashboard_expiry(request: Request):
+async def dashboard_expiry(
+    request: Request,
+    user: dict = Depends(require_user),
+    days: int = Query(7, ge=0, le=365),
+    limit: int = Query(100, ge=1, le=1000),
+    branch: Optional[str] = None,
+):
     """
     STORY:
     This endpoint tells admin:
-    - Who is EXPIRING SOON (next 7 days)
-    - Who is already EXPIRED
+    - Who is EXPIRING SOON (next `days` days, default 7)
+    - Who is already EXPIRED (most recent first)
+
+    Between member writes it is answered from
+    response_cache (or as 304 Not Modified).
+
+    ?branch=all → the whole chain (head office)
+    """
+    if await choose_branch(user, branch):
+        return await cached_json(
+            request, lambda: all_branches_expiry(days, limit), version=all_branches_version
+        )
+
+    return await cached_json(request, lambda: expiry_lists(days, limit))
+
+
+# ==================================================
+# DASHBOARD TRENDS 📈
+# ==================================================
+#
+# Longest range one request may ask for
+MAX_TREND_DAYS = 3 * 366
+
+
+async def trends(first: date, last: date):
+    """
+    STORY:
+    For every day from `first` to `last`:
+    - how many members JOINED
+    - how many memberships EXPIRED
+    - how many members were ACTIVE
+    overall and per plan.
+
+    Only the daily rollup is read (migrations.py,
+    member_daily): a year is ~365 rows per plan,
+    whatever the size of the gym.
     """
 
     # -------------------------------
-    # STEP 1: Verify admin token 🔐
+    # STEP 1: Read the rollup
     # -------------------------------
-    auth = request.headers.get("Authorization")
-    if not auth:
-        raise HTTPException(status_code=401, detail="Unauthorized")
+    before, rows = await repository.daily_rollup(first.isoformat(), last.isoformat())
+
+    active = {plan: 0 for plan in PLAN_DAYS}
+    for plan, members in before:
+        active[plan] = members
 
-    token = auth.replace("Bearer ", "")
-    if not verify_token(token):
-        raise HTTPException(status_code=401, detail="Invalid token")
+    by_day = {}
+    for day, plan, joins, expirations in rows:
+        by_day.setdefault(day, []).append((plan, joins, expirations))
 
     # -------------------------------
-    # STEP 2: Fetch members
+    # STEP 2: Running totals, day by day
     # -------------------------------
-    cursor.execute(
-        "SELECT id, name, plan, joined_on FROM members"
-    )
-    rows = cursor.fetchall()
+    #
+    # active today = active yesterday + joins − expirations
+    #
+    days = []
+    day = first
+
+    while day <= last:
+        key = day.isoformat()
+        plans = {plan: {"joins": 0, "expirations": 0} for plan in active}
+
+        for plan, joins, expirations in by_day.get(key, ()):
+            counts = plans.setdefault(plan, {"joins": 0, "expirations": 0})
+            counts["joins"] += joins
+            counts["expirations"] += expirations
 
-    today = datetime.now()
-    soon_limit = today + timedelta(days=7)
+        for plan, counts in plans.items():
+            active[plan] = active.get(plan, 0) + counts["joins"] - counts["expirations"]
+            counts["active"] = active[plan]
 
-    expiring_soon = []
-    expired = []
+        days.append({
+            "day": key,
+            "joins": sum(counts["joins"] for counts in plans.values()),
+            "expirations": sum(counts["expirations"] for counts in plans.values()),
+            "active": sum(counts["active"] for counts in plans.values()),
+            "plans": plans,
+        })
+        day += timedelta(days=1)
 
     # -------------------------------
-    # STEP 3: Classify members
+    # STEP 3: Return the series
     # -------------------------------
-    for member_id, name, plan, joined_on in rows:
-        expiry_date = calculate_expiry(joined_on, plan)
+    return {"from": first.isoformat(), "to": last.isoformat(), "days": days}
 
-        member_info = {
-            "id": member_id,
-            "name": name,
-            "plan": plan,
-            "expiry_date": expiry_date.date().isoformat()
+
+@router.get("/dashboard/trends")
+async def dashboard_trends(
+    request: Request,
+    user: dict = Depends(require_user),
+    first: date = Query(None, alias="from"),
+    last: date = Query(None, alias="to"),
+):
+    """
+    STORY:
+    Day-by-day history: /dashboard/trends?from=2026-01-01&to=2026-03-31
+
+    - No `to`   → today
+    - No `from` → 90 days before `to`
+    """
+    last = last or date.today()
+    first = first or last - timedelta(days=89)
+
+    if first > last:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+    if (last - first).days >= MAX_TREND_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range too long (max {MAX_TREND_DAYS} days)"
+        )
+
+    return await cached_json(request, lambda: trends(first, last))
+
+
+# ==================================================
+# DASHBOARD ANALYTICS 🧮
+# ==================================================
+async def analytics(days: int):
+    """
+    STORY:
+    Whole-gym analytics from the in-memory columnar
+    snapshot (snapshot.py):
+
+    - summary          → members / active per plan
+    - join_months      → per join month: plan mix and
+                         how many are still active
+    - expiry_histogram → memberships running out on each
+                         of the next `days` days (from
+                         tomorrow, like /dashboard/expiry)
+
+    Refreshing the snapshot only re-reads members that
+    changed since the last call; the rest is NumPy.
+    """
+    snapshot = analytics_snapshot.for_branch(current_branch())
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Analytics need NumPy installed")
+
+    today = date.today().isoformat()
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+
+    def build():
+        columns = snapshot.refresh()
+        plan_names = list(snapshot.plan_names)
+
+        return {
+            "summary": analytics_snapshot.plan_summary(columns, plan_names, today),
+            "join_months": analytics_snapshot.join_months(columns, plan_names, today),
+            "expiry_histogram": analytics_snapshot.expiry_histogram(columns, tomorrow, days),
         }
 
-        if expiry_date < today:
-            expired.append(member_info)
-        elif today <= expiry_date <= soon_limit:
-            expiring_soon.append(member_info)
+    # NumPy work is blocking too → read-only DB executor
+    return await repository.run_read(build)
+
+
+@router.get("/dashboard/analytics")
+async def dashboard_analytics(
+    request: Request,
+    user: dict = Depends(require_user),
+    days: int = Query(30, ge=1, le=366),
+):
+    """
+    STORY:
+    Charts for the admin: plan mix by join month,
+    cohort retention and upcoming expiries.
+    """
+    return await cached_json(request, lambda: analytics(days))
+
+
+# ==================================================
+# DASHBOARD OCCUPANCY 🚪
+# ==================================================
+#
+# The turnstiles only scan members IN (checkins.py).
+# Whoever came in during the last VISIT_MINUTES counts
+# as inside.
+#
+# GYM_VISIT_MINUTES → how long a usual visit lasts
+#
+VISIT_MINUTES = int(os.environ.get("GYM_VISIT_MINUTES", "90"))
+
+HOUR_FORMAT = "%Y-%m-%d %H:00"  # same as checkin_hourly.hour
+
+
+async def occupancy(hours: int):
+    """
+    STORY:
+    - inside → people in the gym now
+    - hours  → check-ins per hour, the last `hours`
+               hours up to the current one (quiet
+               hours included, as 0)
+
+    Only the scans of the last VISIT_MINUTES and
+    `hours` rows of the hourly rollup are read.
+    """
+    now = datetime.now()
+    first = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+
+    inside, rows = await repository.occupancy(
+        int(now.timestamp()) - VISIT_MINUTES * 60,
+        first.strftime(HOUR_FORMAT)
+    )
+    checkins = dict(rows)
+
+    series = []
+    for step in range(hours):
+        hour = (first + timedelta(hours=step)).strftime(HOUR_FORMAT)
+        series.append({"hour": hour, "checkins": checkins.get(hour, 0)})
 
-    # -------------------------------
-    # STEP 4: Return expiry info
-    # -------------------------------
     return {
-        "expiring_soon": expiring_soon,
-        "expired": expired
+        "inside": inside,
+        "visit_minutes": VISIT_MINUTES,
+        "as_of": now.isoformat(timespec="seconds"),
+        "hours": series,
     }
+
+
+async def all_branches_occupancy(hours: int):
+    """Every branch counts its own doors; we add them up."""
+    per_branch = await shards.fan_out(occupancy, hours)
+    answers = list(per_branch.values())
+
+    hours_total = [dict(hour) for hour in answers[0]["hours"]]
+    for answer in answers[1:]:
+        for total, hour in zip(hours_total, answer["hours"]):
+            total["checkins"] += hour["checkins"]
+
+    return {
+        "inside": sum(answer["inside"] for answer in answers),
+        "visit_minutes": VISIT_MINUTES,
+        "as_of": answers[0]["as_of"],
+        "hours": hours_total,
+        "branches": {branch: answer["inside"] for branch, answer in per_branch.items()},
+    }
+
+
+@router.get("/dashboard/occupancy")
+async def dashboard_occupancy(
+    user: dict = Depends(require_user),
+    hours: int = Query(12, ge=1, le=48),
+    branch: Optional[str] = None,
+):
+    """
+    STORY:
+    The "people in the gym now" widget (it polls this).
+
+    Not cached: the answer changes with the clock, and
+    it is two small reads.
+
+    ?branch=all → the whole chain (head office)
+    """
+    if await choose_branch(user, branch):
+        return await all_branches_occupancy(hours)
+
+    return await occupancy(hours)
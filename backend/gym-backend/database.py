@@ -14,84 +14,323 @@
 # - Members (gym members)
 #
 # This file:
-# ✅ Connects to the database
-# ✅ Creates tables if they don't exist
+# ✅ Connects to the database (through a connection pool)
+# ✅ Knows which branch's database a request works on
+# ✅ Keeps the schema up to date (migrations.py)
 # ❌ Does NOT contain API logic
 # ❌ Does NOT contain authentication logic
 # --------------------------------------------------
 
+import contextvars
+import os
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from migrations import migrate
+from sql_profiler import PROFILE_SQL, ProfiledConnection
 
 # --------------------------------------------------
-# STEP 1️⃣: Connect to the database
+# STEP 1️⃣: Settings
 # --------------------------------------------------
 #
 # STORY:
-# If "gym.db" does not exist → SQLite creates it
-# If it exists → SQLite opens it
+# Every knob can be changed with an environment
+# variable, so production can tune the storage room
+# without touching the code.
 #
-# check_same_thread=False allows FastAPI
-# to use the same DB connection across requests
+# GYM_DB_PATH            → database file
+# GYM_DB_POOL_SIZE       → max open connections
+# GYM_DB_READ_POOL_SIZE  → max open read-only connections
+# GYM_DB_POOL_TIMEOUT    → seconds to wait for a free connection
+# GYM_DB_BUSY_TIMEOUT_MS → how long SQLite waits on a locked file
+# GYM_DB_CACHE_SIZE_KB   → page cache per connection
+# GYM_DB_MMAP_SIZE       → bytes of the file to memory-map
+# GYM_DB_STATEMENT_CACHE → prepared statements kept per connection
 #
-conn = sqlite3.connect("gym.db", check_same_thread=False)
+DB_PATH = os.environ.get("GYM_DB_PATH", "gym.db")
+POOL_SIZE = int(os.environ.get("GYM_DB_POOL_SIZE", "8"))
+READ_POOL_SIZE = int(os.environ.get("GYM_DB_READ_POOL_SIZE", str(POOL_SIZE)))
+POOL_TIMEOUT = float(os.environ.get("GYM_DB_POOL_TIMEOUT", "30"))
+BUSY_TIMEOUT_MS = int(os.environ.get("GYM_DB_BUSY_TIMEOUT_MS", "5000"))
+CACHE_SIZE_KB = int(os.environ.get("GYM_DB_CACHE_SIZE_KB", "16384"))
+MMAP_SIZE = int(os.environ.get("GYM_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+STATEMENT_CACHE_SIZE = int(os.environ.get("GYM_DB_STATEMENT_CACHE", "256"))
 
-# Cursor is like a PEN ✏️
-# We use it to write/read data in the DB
-cursor = conn.cursor()
 
 # --------------------------------------------------
-# STEP 2️⃣: USERS table (Admin / Login users)
+# STEP 2️⃣: Connection pool
 # --------------------------------------------------
 #
 # STORY:
-# This table stores people who can LOGIN
-# (not gym members, but system users)
+# Before, the whole gym shared ONE pen ✏️ (a global
+# cursor). Two clerks writing at the same time could
+# read each other's notes.
+#
+# Now there is a DRAWER of pens:
+# - Each request borrows its OWN connection
+# - Nobody else can touch it until it is returned
+# - The drawer never holds more than POOL_SIZE pens
+#
+# WAL journal mode lets readers keep reading while
+# one writer is writing.
+#
+# readonly=True opens the file with mode=ro: such a
+# connection can never write, so it never takes the
+# write lock (see STEP 2️⃣➕).
 #
-# Password is stored as HASH (never plain text)
+# Nothing is opened up front: the first borrow opens
+# the first connection, in the process that uses it.
+# setup() (if given) runs before every new connection
+# and must be cheap once done (see init_schema).
 #
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT NOT NULL,
-    email TEXT UNIQUE NOT NULL,
-    password TEXT NOT NULL
-)
-""")
+class ConnectionPool:
+    def __init__(self, path: str, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT,
+                 readonly: bool = False, setup=None):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.readonly = readonly
+        self.setup = setup
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._all = []
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.setup is not None:
+            self.setup()
+
+        conn = sqlite3.connect(
+            f"{Path(self.path).absolute().as_uri()}?mode=ro" if self.readonly else self.path,
+            uri=self.readonly,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,  # a pooled connection moves between worker threads
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=ProfiledConnection if PROFILE_SQL else sqlite3.Connection,
+        )
+        if not self.readonly:
+            conn.execute("PRAGMA journal_mode=WAL")  # stored in the file: writers set it
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        conn = self._connect()
+
+        with self._lock:
+            self._all.append(conn)
+
+        return conn
+
+    @contextmanager
+    def dedicated(self):
+        """
+        STORY:
+        A connection of its OWN, not from the drawer:
+        for work that keeps a connection for as long as
+        a client likes (an export download). Closed when
+        the block ends; nothing is committed.
+        """
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """
+        STORY:
+        - Borrow a connection (wait if all are busy)
+        - If the block succeeds → commit
+        - If it fails → roll back
+        - Always put the connection back in the drawer
+        """
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError("database connection pool exhausted")
+
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+
+        self._idle = queue.LifoQueue()
+
+
+# The HOME database: users, the branch registry, and
+# the members of the default branch.
+# Its schema is brought up to date before the first
+# connection is opened (STEP 3️⃣).
+def _home_setup():
+    init_schema()
+
+
+pool = ConnectionPool(DB_PATH, setup=_home_setup)
+read_pool = ConnectionPool(DB_PATH, READ_POOL_SIZE, readonly=True, setup=_home_setup)
+
 
 # --------------------------------------------------
-# STEP 3️⃣: MEMBERS table (Gym Members)
+# STEP 2️⃣➕: Which branch are we working for?
 # --------------------------------------------------
 #
 # STORY:
-# This is the GYM REGISTER BOOK 📒
-#
-# Each row = one gym member
-#
-# id        → unique member number
-# name      → member name
-# phone     → contact number
-# plan      → Monthly / Quarterly / Yearly
-# joined_on → date they joined the gym
-#
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS members (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT NOT NULL,
-    phone TEXT NOT NULL,
-    plan TEXT NOT NULL,
-    joined_on TEXT NOT NULL
-)
-""")
+# Every branch keeps its members in its OWN database
+# file (see shards.py). The guard (auth_guard.py)
+# reads the branch from the token and puts that
+# branch's shard in current_shard for the rest of the
+# request; connection() then hands out a connection
+# to THAT file.
+#
+# It is a context variable, so it follows the request
+# into the DB executor threads (repository.run) and
+# two requests never see each other's branch.
+#
+# GYM_DEFAULT_BRANCH → branch of the home database
+#
+DEFAULT_BRANCH = os.environ.get("GYM_DEFAULT_BRANCH", "main")
+
+current_shard = contextvars.ContextVar("gym_shard", default=None)  # None → home database
+
+
+def current_branch() -> str:
+    shard = current_shard.get()
+    return shard.branch if shard else DEFAULT_BRANCH
+
+
+def current_pool() -> ConnectionPool:
+    shard = current_shard.get()
+    return shard.pool if shard else pool
+
+
+def connection():
+    """
+    STORY:
+    Shortcut used by the rest of the app:
+
+        with connection() as conn:
+            conn.execute(...)
+
+    The connection belongs to the current branch.
+    It may read AND write.
+    """
+    return current_pool().connection()
+
+
+# --------------------------------------------------
+# STEP 2️⃣➕➕: Read-only connections
+# --------------------------------------------------
+#
+# STORY:
+# A big dashboard count or a full export used to
+# borrow the same connections as the front desk.
+#
+# Now they borrow from a SEPARATE drawer of read-only
+# connections (mode=ro):
+# - they never take the write lock, so add_member
+#   never waits for them
+# - in a transaction (BEGIN ... COMMIT) they read ONE
+#   WAL snapshot: writes committed meanwhile are not
+#   half-seen
+#
+# Routing is explicit: code that only reads asks for
+#
+#     with read_connection() as conn:
+#
+# everything else uses connection().
+#
+def read_connection():
+    shard = current_shard.get()
+    return (shard.read_pool if shard else read_pool).connection()
+
+
+def export_connection():
+    """
+    STORY:
+    A full export holds its connection while the client
+    downloads, at the client's pace. Taken from the
+    drawer, two slow downloads could leave no connection
+    for the dashboard. So an export opens a read-only
+    connection of its own (repository.py caps how many
+    exports run at once).
+    """
+    shard = current_shard.get()
+    return (shard.read_pool if shard else read_pool).dedicated()
+
 
 # --------------------------------------------------
-# STEP 4️⃣: Save changes
+# STEP 3️⃣: Schema
 # --------------------------------------------------
 #
 # STORY:
-# conn.commit() means:
-# "Okay, database, save everything permanently 💾"
+# Tables, indexes, triggers and data fixes are
+# numbered migrations (see migrations.py).
+#
+# Importing this file touches NO database. The schema
+# is brought up to date ONCE per process:
+# - on start (main.py's lifespan), or
+# - at the latest right before the first connection
+#
+# With several worker processes only one of them
+# migrates, the others wait for it (migrations.migrate
+# takes a lock). On an up-to-date database this costs
+# a few tiny queries.
 #
-conn.commit()
+# A big register is better migrated BEFORE the new
+# server starts (old servers keep serving meanwhile):
+#
+#   python migrations.py
+#
+# GYM_AUTO_MIGRATE=0 → never migrate on start
+#
+AUTO_MIGRATE = os.environ.get("GYM_AUTO_MIGRATE", "1") != "0"
+
+
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+def init_schema():
+    global _schema_ready
+
+    if _schema_ready:
+        return
+
+    with _schema_lock:
+        if not _schema_ready:
+            if AUTO_MIGRATE:
+                migrate(DB_PATH, BUSY_TIMEOUT_MS)
+            _schema_ready = True
+
+
+def close_pools():
+    """Close the home database's connections (server shutdown)."""
+    pool.close()
+    read_pool.close()
 
 # --------------------------------------------------
 # FINAL STORY SUMMARY 📖
@@ -99,8 +338,8 @@ conn.commit()
 # database.py = Storage Room 🗄️
 #
 # Responsibilities:
-# ✅ Connect to DB
-# ✅ Create tables
+# ✅ Hand out one connection per request (pool)
+# ✅ Keep the schema up to date (migrations)
 # ✅ Keep data safe
 #
 # NOT responsible for:
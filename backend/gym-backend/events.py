@@ -0,0 +1,133 @@
+# --------------------------------------------------
+# events.py 📣
+# --------------------------------------------------
+#
+# STORY:
+# Three front-desk terminals are open. One of them
+# adds a member. Before, EVERY terminal downloaded
+# the whole member list again to notice.
+#
+# Now the backend has a LOUDSPEAKER:
+#
+# 1️⃣ Every open member page listens on
+#    GET /members/events (Server-Sent Events)
+# 2️⃣ After a member write is committed, members.py
+#    announces it: created / updated / deleted,
+#    with the member itself
+# 3️⃣ Each terminal patches its own list
+#
+# Backpressure:
+# - Every listener has its OWN small mailbox
+#   (EVENT_QUEUE_SIZE events)
+# - A listener too slow to keep up never slows down
+#   the writers or the other listeners: its mailbox is
+#   emptied and replaced by ONE "resync" event
+#   → that terminal reloads its list once
+#
+# Listeners only hear writes made by THIS server
+# process, to their own branch.
+#
+# Settings:
+# GYM_EVENT_QUEUE_SIZE → events buffered per listener
+# GYM_EVENT_KEEPALIVE  → seconds between keep-alive pings
+# --------------------------------------------------
+
+import asyncio
+import itertools
+import json
+import os
+from collections import defaultdict
+
+EVENT_QUEUE_SIZE = int(os.environ.get("GYM_EVENT_QUEUE_SIZE", "256"))
+KEEPALIVE_SECONDS = float(os.environ.get("GYM_EVENT_KEEPALIVE", "15"))
+
+
+class Listener:
+    def __init__(self, size: int):
+        self.queue = asyncio.Queue(maxsize=size)
+        self.dropped = 0
+
+
+class Broadcaster:
+    """
+    Lives on the event loop: publish() and listen() must
+    be called from async code (the routes).
+    """
+
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.listeners = set()
+        self._ids = itertools.count(1)
+
+        self.published = 0
+        self.resyncs = 0
+
+    def publish(self, kind: str, **data):
+        event = (next(self._ids), kind, data)
+        self.published += 1
+
+        for listener in self.listeners:
+            try:
+                listener.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._overflow(listener, event[0])
+
+    def _overflow(self, listener: Listener, event_id: int):
+        # Forget what is waiting; one "resync" says it all
+        while not listener.queue.empty():
+            listener.queue.get_nowait()
+            listener.dropped += 1
+
+        listener.queue.put_nowait((event_id, "resync", {}))
+        self.resyncs += 1
+
+    async def listen(self, resync: bool = False):
+        """
+        STORY:
+        Yield SSE text for one listener until it disconnects.
+        resync=True starts with a "resync" event (a browser
+        reconnecting may have missed something).
+        """
+        listener = Listener(self.queue_size)
+        self.listeners.add(listener)
+
+        try:
+            yield "retry: 3000\n\n"
+
+            if resync:
+                yield format_event(0, "resync", {})
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(listener.queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                yield format_event(*event)
+        finally:
+            self.listeners.discard(listener)
+
+    def stats(self) -> dict:
+        return {
+            "listeners": len(self.listeners),
+            "published": self.published,
+            "resyncs": self.resyncs,
+        }
+
+
+def format_event(event_id: int, kind: str, data: dict) -> str:
+    return f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
+
+
+# One loudspeaker per branch (shards.py): a terminal
+# only hears about its own branch's members
+broadcasters = defaultdict(Broadcaster)
+
+
+def stats() -> dict:
+    totals = {"listeners": 0, "published": 0, "resyncs": 0}
+    for broadcaster in list(broadcasters.values()):
+        for key, value in broadcaster.stats().items():
+            totals[key] += value
+    return totals
@@ -0,0 +1,195 @@
+# --------------------------------------------------
+# group_commit.py 📮
+# --------------------------------------------------
+#
+# STORY:
+# Every commit is a trip to the safe (an fsync).
+# At the evening rush, 50 clerks each walked to the
+# safe with ONE form. The safe, not SQLite, was the
+# bottleneck.
+#
+# With group commit there is ONE runner:
+#
+# 1️⃣ Clerks drop their write in a tray (a queue)
+#    and wait for a receipt (a Future)
+# 2️⃣ The runner picks up everything in the tray
+#    (waiting at most WINDOW for more, taking at most
+#    MAX_BATCH writes)
+# 3️⃣ Each write runs in its own SAVEPOINT: if one
+#    fails, only that one is rolled back
+# 4️⃣ ONE commit (one fsync) for the whole batch
+# 5️⃣ Only THEN does every clerk get a receipt:
+#    success = the data is on disk
+#
+# Settings (tradeoff: latency ↔ throughput):
+# GYM_GROUP_COMMIT           → 1 turns it on (default off)
+# GYM_GROUP_COMMIT_WINDOW_MS → max wait for more writes
+#                              (0 = only take what is
+#                              already queued)
+# GYM_GROUP_COMMIT_MAX_BATCH → max writes per commit
+#
+# Every branch database (shards.py) has its own writer.
+# --------------------------------------------------
+
+import contextvars
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from database import pool
+
+GROUP_COMMIT = os.environ.get("GYM_GROUP_COMMIT", "0") == "1"
+WINDOW_MS = float(os.environ.get("GYM_GROUP_COMMIT_WINDOW_MS", "1"))
+MAX_BATCH = int(os.environ.get("GYM_GROUP_COMMIT_MAX_BATCH", "128"))
+
+log = logging.getLogger("gym.group_commit")
+
+
+class GroupCommitWriter:
+    def __init__(self, pool, window_ms: float = WINDOW_MS, max_batch: int = MAX_BATCH):
+        self.pool = pool
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.writes = 0
+
+    def submit(self, fn, *args) -> Future:
+        """
+        fn(conn, *args) runs on the writer thread inside the
+        shared transaction. The Future resolves after COMMIT.
+        """
+        self._start()
+
+        future = Future()
+        self._queue.put((contextvars.copy_context(), fn, args, future))
+        return future
+
+    def _start(self):
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="gym-group-commit", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self):
+        """Finish everything already queued, then stop the thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    # ----------------------------------------------
+    # The runner
+    # ----------------------------------------------
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.window
+
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if job is None:
+                self._queue.put(None)  # stop after this batch
+                break
+            batch.append(job)
+
+        return batch
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            self._commit(self._collect(first))
+
+    def _commit(self, batch: list):
+        # A caller that gave up (cancelled) is skipped; after
+        # this point nobody can cancel any more.
+        batch = [job for job in batch if job[3].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        results = []
+
+        try:
+            with self.pool.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+
+                for context, fn, args, future in batch:
+                    conn.execute("SAVEPOINT write")
+                    try:
+                        results.append((future, context.run(fn, conn, *args), None))
+                        conn.execute("RELEASE write")
+                    except Exception as error:
+                        conn.execute("ROLLBACK TO write")
+                        conn.execute("RELEASE write")
+                        results.append((future, None, error))
+                # leaving the block = ONE commit for the whole batch
+
+        except Exception as error:
+            log.warning("group commit of %d writes failed: %s", len(batch), error)
+            for _, _, _, future in batch:
+                future.set_exception(error)
+            return
+
+        self.batches += 1
+        self.writes += len(batch)
+
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "writes": self.writes,
+            "queued": self._queue.qsize(),
+        }
+
+
+# The home database's writer; other branches get their
+# own, with the same settings, on their first write
+writer = GroupCommitWriter(pool) if GROUP_COMMIT else None
+branch_writers = {}  # pool → GroupCommitWriter
+_writers_lock = threading.Lock()
+
+
+def writer_for(branch_pool):
+    """None when group commit is off."""
+    if writer is None:
+        return None
+    if branch_pool is writer.pool:
+        return writer
+
+    found = branch_writers.get(branch_pool)
+    if found is None:
+        with _writers_lock:
+            found = branch_writers.setdefault(
+                branch_pool, GroupCommitWriter(branch_pool, writer.window * 1000, writer.max_batch)
+            )
+    return found
+
+
+def all_writers() -> list:
+    return ([writer] if writer is not None else []) + list(branch_writers.values())
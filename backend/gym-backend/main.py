@@ -14,6 +14,32 @@
 #
 # If frontend is the FACE 🙂
 # then this file is the BRAIN 🧠
+#
+# HOW TO RUN:
+#
+#   uvicorn main:app --reload                      → development
+#   uvicorn main:create_app --factory --workers 4  → production
+#
+# With --factory every worker process builds its OWN
+# app (create_app), with its own connections and
+# threads; nothing is shared between processes except
+# the database files. On start only one worker
+# migrates the schema, the others wait for it.
+#
+# Kept PER WORKER (not shared):
+# - caches (tokens, responses, analytics snapshot)
+# - admission limits (admission.py): each worker lets
+#   in its own LIMIT per door
+# - the live stream (/members/events): a terminal
+#   only hears about changes made through ITS worker.
+#   The members page also catches up (/members/changes,
+#   see members.py) after loading, after each of its
+#   own writes and every 15 seconds, so changes made
+#   through the other workers show up by then
+# - logout: a revoked token is refused by the worker
+#   that revoked it, the others keep trusting it until
+#   their token cache expires it (GYM_TOKEN_CACHE_TTL)
+#   or the token itself runs out
 # =================================================
 
 
@@ -21,56 +47,156 @@
 # IMPORTS
 # -------------------------
 
-from fastapi import FastAPI, Depends
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
 
 # Our own modules (our team members 👥)
-from database import cursor, conn
-from security import hash_password, verify_password, create_token
-from auth_guard import verify_token
+import database
+import group_commit
+import repository
+import shards
+from database import DEFAULT_BRANCH
+from security import (
+    create_token, hash_password_async, needs_rehash, verify_password_async,
+)
+from auth_guard import (
+    HEAD_OFFICE, require_head_office, require_user, bearer_token, token_cache,
+)
 from members import router as members_router
 from dashboard import router as dashboard_router
+from checkins import router as checkins_router
+from metrics import MetricsMiddleware, metrics_response
+from sql_profiler import QueryProfileMiddleware, profiler
+from admission import AdmissionMiddleware
 
 
+# The routes of this file (the rest live in members.py
+# and dashboard.py)
+router = APIRouter()
 
 
 # -------------------------
-# CREATE FASTAPI APP
+# 🌅 OPENING & CLOSING TIME (lifespan)
 # -------------------------
 
-# This creates the backend application
-# Think of it as "opening the office"
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    STORY:
+    Opening: bring the schema up to date (once per
+    process, see database.py), off the event loop.
+    Connections are still opened only when needed.
+
+    Closing: let the background jobs finish, commit
+    what the group-commit writers still hold, and
+    close every connection.
+    """
+    await repository.run(database.init_schema)
+
+    yield
+
+    await repository.wait_for_compactions()
+
+    for writer in group_commit.all_writers():
+        await repository.run(writer.stop)
+
+    shards.registry.close()
+    database.close_pools()
 
 
 # -------------------------
-# 🌍 CORS SECURITY GATE
+# CREATE FASTAPI APP
 # -------------------------
-#
-# STORY:
-# Browser is very strict.
-# It will NOT allow frontend (React) to talk to backend
-# unless backend says: "Yes, I trust you"
-#
-# This block tells browser:
-# "Allow requests from my frontend"
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:5173"],  # React app address
-    allow_credentials=True,
-    allow_methods=["*"],  # GET, POST, PUT, DELETE...
-    allow_headers=["*"],
-)
 
-app.include_router(members_router)
-app.include_router(dashboard_router)
+def create_app() -> FastAPI:
+    """
+    STORY:
+    This creates the backend application.
+    Think of it as "opening the office".
+
+    Building it touches no database: that happens in
+    lifespan() once the server runs, so the server can
+    bind its port right away.
+    """
+    app = FastAPI(lifespan=lifespan)
+
+    # -------------------------
+    # 🚦 DOORMAN (admission control)
+    # -------------------------
+    #
+    # Too busy? Answer 503 + Retry-After right away
+    # instead of letting requests pile up (admission.py).
+    # Added FIRST, so it sits inside CORS: the browser
+    # can still read a 503.
+    app.add_middleware(AdmissionMiddleware)
+
+    # -------------------------
+    # 🌍 CORS SECURITY GATE
+    # -------------------------
+    #
+    # STORY:
+    # Browser is very strict.
+    # It will NOT allow frontend (React) to talk to backend
+    # unless backend says: "Yes, I trust you"
+    #
+    # This block tells browser:
+    # "Allow requests from my frontend"
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:5173"],  # React app address
+        allow_credentials=True,
+        allow_methods=["*"],  # GET, POST, PUT, DELETE...
+        allow_headers=["*"],
+    )
+
+    # -------------------------
+    # ⏱️ SQL STOPWATCH
+    # -------------------------
+    #
+    # Counts the queries of each request; answers to
+    # head office get a Server-Timing header (db vs
+    # app time).
+    app.add_middleware(QueryProfileMiddleware)
+
+    # -------------------------
+    # 🎥 METRICS (CCTV)
+    # -------------------------
+    #
+    # Added LAST so it wraps everything (CORS included)
+    # and times the full request.
+    app.add_middleware(MetricsMiddleware)
+
+    app.include_router(router)
+    app.include_router(members_router)
+    app.include_router(dashboard_router)
+    app.include_router(checkins_router)
+
+    return app
+
+
+def __getattr__(name: str):
+    """
+    STORY:
+    `uvicorn main:app` and `from main import app` keep
+    working: the app is built the first time someone
+    asks for it, not when this file is imported.
+    """
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # -------------------------
 # 🏥 HEALTH CHECK API
 # -------------------------
 
-@app.get("/")
+@router.get("/")
 def home():
     """
     STORY:
@@ -85,6 +211,53 @@ def home():
     return {"message": "Backend is alive 🚀"}
 
 
+# -------------------------
+# 📈 METRICS API
+# -------------------------
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    STORY:
+    Prometheus comes by and reads the CCTV notes:
+    latency histograms, in-flight requests, thread
+    pool usage, response sizes and cache hit rates.
+    """
+    return metrics_response()
+
+
+# -------------------------
+# ⏱️ SQL PROFILE API
+# -------------------------
+
+@router.get("/debug/sql", include_in_schema=False)
+async def debug_sql(
+    user=Depends(require_user),
+    top: int = Query(20, ge=1, le=500),
+    order: str = Query("total", pattern="^(total|count|max)$"),
+    reset: bool = False,
+):
+    """
+    STORY:
+    Which SQL statements cost the most?
+
+    Statements are grouped by shape (values → "?").
+    ?order=total | count | max, ?reset=true starts over.
+
+    Head office only: the numbers cover every branch,
+    and a reset wipes them for everyone.
+    """
+    require_head_office(user)
+
+    statements = profiler.top(top, order)
+    flagged = profiler.flagged_requests
+
+    if reset:
+        profiler.reset()
+
+    return {"statements": statements, "flagged_requests": flagged}
+
+
 # =================================================
 # 🔐 AUTHENTICATION SECTION
 # =================================================
@@ -93,8 +266,8 @@ def home():
 # 📝 REGISTER API
 # -------------------------
 
-@app.post("/register")
-def register(data: dict):
+@router.post("/register")
+async def register(data: dict, request: Request):
     """
     STORY:
     A new user comes to the gym 🏋️
@@ -104,24 +277,44 @@ def register(data: dict):
     - email
     - password
 
+    and work for the default branch, as plain staff.
+
+    Only head office (logged in) may sign someone up
+    for another branch, or as head office:
+    - branch (optional)
+    - role   (optional: "head_office")
+
     What we do:
-    1. Hide (hash) the password 🔒
-    2. Save user safely in database 🗄️
+    1. Branch / role asked for? Check the caller is
+       head office, and the branch exists (shards.py)
+    2. Hide (hash) the password 🔒
+    3. Save user safely in database 🗄️
+
+    Hashing is slow on purpose, so it runs on the
+    hashing pool (security.py), never on the event loop.
     """
 
     name = data.get("name")
     email = data.get("email")
     password = data.get("password")
+    branch = data.get("branch") or DEFAULT_BRANCH
+    role = data.get("role") or None
 
-    # Step 1: Convert password into unreadable format
-    hashed_password = hash_password(password)
+    # Step 1: Only head office hands out branches and roles
+    if branch != DEFAULT_BRANCH or role is not None:
+        require_head_office(await require_user(request))
 
-    # Step 2: Save user in database
-    cursor.execute(
-        "INSERT INTO users (name, email, password) VALUES (?, ?, ?)",
-        (name, email, hashed_password)
-    )
-    conn.commit()
+        if role not in (None, HEAD_OFFICE):
+            raise HTTPException(status_code=400, detail="Unknown role")
+
+        if await shards.shard_for(branch) is None:
+            raise HTTPException(status_code=400, detail="Unknown branch")
+
+    # Step 2: Convert password into unreadable format
+    hashed_password = await hash_password_async(password)
+
+    # Step 3: Save user in database
+    await repository.add_user(name, email, hashed_password, branch, role)
 
     return {"message": "User registered successfully 🎉"}
 
@@ -130,8 +323,8 @@ def register(data: dict):
 # 🔑 LOGIN API
 # -------------------------
 
-@app.post("/login")
-def login(data: dict):
+@router.post("/login")
+async def login(data: dict):
     """
     STORY:
     User comes to login desk 🪪
@@ -142,41 +335,68 @@ def login(data: dict):
 
     What we do:
     1. Find user in database
-    2. Verify password
-    3. Generate JWT token (digital ID card 🎫)
+    2. Verify password (on the hashing pool)
+    3. Hash made with older cost settings? Re-hash it
+       now, while we know the password
+    4. Generate JWT token (digital ID card 🎫),
+       stamped with the user's branch and role
     """
 
     email = data.get("email")
     password = data.get("password")
 
     # Step 1: Find user by email
-    cursor.execute(
-        "SELECT name, email, password FROM users WHERE email=?",
-        (email,)
-    )
-    user = cursor.fetchone()
+    user = await repository.find_user(email)
 
     # If user not found
     if not user:
         return {"status": "error", "message": "User not found ❌"}
 
     # Step 2: Verify password
-    if not verify_password(password, user[2]):
+    if not await verify_password_async(password, user[2]):
         return {"status": "error", "message": "Wrong password ❌"}
 
-    # Step 3: Create JWT token
-    token = create_token({"email": user[1]})
+    # Step 3: Upgrade an old hash
+    if needs_rehash(user[2]):
+        new_hash = await hash_password_async(password)
+        await repository.replace_password_hash(user[1], user[2], new_hash)
+
+    # Step 4: Create JWT token
+    branch = user[3] or DEFAULT_BRANCH
+    token = create_token({"email": user[1]}, branch, user[4])
 
     return {
         "status": "success",
         "user": {
             "name": user[0],
-            "email": user[1]
+            "email": user[1],
+            "branch": branch,
+            "role": user[4]
         },
         "token": token
     }
 
 
+# -------------------------
+# 🚪 LOGOUT API
+# -------------------------
+
+@router.post("/logout")
+async def logout(request: Request, user=Depends(require_user)):
+    """
+    STORY:
+    User hands their ID card back 🎫
+
+    The guard remembers this card as REVOKED,
+    so it stops working right away (even though
+    its signature is still valid).
+    """
+
+    token_cache.revoke(bearer_token(request))
+
+    return {"message": "Logged out 👋"}
+
+
 # =================================================
 # 🔒 PROTECTED ROUTES
 # =================================================
@@ -185,8 +405,8 @@ def login(data: dict):
 # 🏠 DASHBOARD (PRIVATE)
 # -------------------------
 
-@app.get("/dashboard")
-def dashboard(user=Depends(verify_token)):
+@router.get("/dashboard")
+def dashboard(user=Depends(require_user)):
     """
     STORY:
     This is a PRIVATE room 🔐
@@ -195,7 +415,7 @@ def dashboard(user=Depends(verify_token)):
     - valid JWT token
     can enter.
 
-    Security guard (verify_token) checks ID 🎫
+    Security guard (require_user) checks ID 🎫
     """
 
     return {
@@ -207,114 +427,19 @@ def dashboard(user=Depends(verify_token)):
 # =================================================
 # 🏋️ MEMBERS MANAGEMENT (CRUD)
 # =================================================
+#
+# STORY:
+# Member routes live in members.py (members_router).
+# They are plugged in above with app.include_router().
+# =================================================
 
-# -------------------------
-# ➕ ADD MEMBER
-# -------------------------
-
-@app.post("/members")
-def add_member(data: dict, user=Depends(verify_token)):
-    """
-    STORY:
-    Gym staff adds a new member 🏋️
-
-    Steps:
-    1. Take member details
-    2. Save them in members table
-    """
-
-    name = data.get("name")
-    phone = data.get("phone")
-    plan = data.get("plan")
-
-    join_date = datetime.now().strftime("%Y-%m-%d")
-
-    cursor.execute(
-        "INSERT INTO members (name, phone, plan, join_date) VALUES (?, ?, ?, ?)",
-        (name, phone, plan, join_date)
-    )
-    conn.commit()
-
-    return {"message": "Member added successfully ✅"}
-
-
-# -------------------------
-# 📄 GET ALL MEMBERS
-# -------------------------
-
-@app.get("/members")
-def get_members(user=Depends(verify_token)):
-    """
-    STORY:
-    Gym owner wants to see all members 👀
-
-    We:
-    - Read members table
-    - Convert rows into JSON
-    """
-
-    cursor.execute("SELECT * FROM members")
-    rows = cursor.fetchall()
-
-    members = []
-
-    for row in rows:
-        members.append({
-            "id": row[0],
-            "name": row[1],
-            "phone": row[2],
-            "plan": row[3],
-            "join_date": row[4]
-        })
-
-    return members
-
-
-# -------------------------
-# ✏️ UPDATE MEMBER
-# -------------------------
-
-@app.put("/members/{member_id}")
-def update_member(member_id: int, data: dict, user=Depends(verify_token)):
-    """
-    STORY:
-    Member wants to update details ✍️
-    (phone number / plan change)
-    """
-
-    cursor.execute(
-        "UPDATE members SET name=?, phone=?, plan=? WHERE id=?",
-        (
-            data.get("name"),
-            data.get("phone"),
-            data.get("plan"),
-            member_id
-        )
-    )
-    conn.commit()
-
-    return {"message": "Member updated successfully ✨"}
-
-
-# -------------------------
-# 🗑 DELETE MEMBER
-# -------------------------
-
-@app.delete("/members/{member_id}")
-def delete_member(member_id: int, user=Depends(verify_token)):
-    """
-    STORY:
-    Member leaves the gym ❌
-
-    We:
-    - Find member by ID
-    - Remove from database
-    """
-
-    cursor.execute(
-        "DELETE FROM members WHERE id=?",
-        (member_id,)
-    )
-    conn.commit()
 
-    return {"message": "Member deleted successfully 🗑️"}
+# =================================================
+# 🚪 CHECK-INS (door scanners)
+# =================================================
+#
+# STORY:
+# Turnstile scans arrive in batches at POST /checkins
+# (checkins.py, checkins_router); the dashboard shows
+# who is inside (/dashboard/occupancy).
+# =================================================
@@ -6,20 +6,38 @@
 # This file manages GYM MEMBERS.
 #
 # Only LOGGED-IN users (with valid token)
-# are allowed to:
-# - View members
-# - Add members
+# are allowed to (auth_guard.require_user checks):
+# - View members (one page at a time)
+# - Search members by name / phone
+# - Export every member (streamed)
+# - Add members (one by one, or a bulk import)
+# - Listen for member changes (Server-Sent Events)
+# - Catch up on member changes since a seq (delta sync)
 #
 # This file:
 # ✅ Defines API routes related to members
 # ❌ Does NOT start the server
 # --------------------------------------------------
 
-from fastapi import APIRouter, Request, HTTPException
+import base64
+import codecs
+import collections
+import csv
+import io
+import json
+import sqlite3
 from datetime import date
+from typing import Literal, Optional
 
-from database import cursor, conn
-from auth_guard import verify_token
+from fastapi import APIRouter, Depends, Request, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+import repository
+from auth_guard import require_user, require_stream_user
+from database import current_branch
+from events import broadcasters
+from plans import PLAN_DAYS, expiry_date
+from response_cache import cached_json
 
 # --------------------------------------------------
 # STEP 1️⃣: Create a router
@@ -34,37 +52,358 @@ router = APIRouter()
 # --------------------------------------------------
 # STEP 2️⃣: GET all members (PROTECTED)
 # --------------------------------------------------
+def encode_cursor(member: dict, sort: str) -> str:
+    """
+    STORY:
+    A cursor is a BOOKMARK 🔖 for the last member of a page:
+    its sort value + its id, packed into a URL-safe string.
+    """
+    raw = json.dumps([member[sort], member["id"]])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("utf-8")
+
+
+MAX_ID = 2 ** 63 - 1  # largest SQLite integer
+
+
+def is_id(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= MAX_ID
+
+
+def decode_cursor(cursor: str, sort: str):
+    """
+    STORY:
+    A cursor comes back from the client, so it is
+    checked before it reaches SQL: exactly
+    [sort value, member id], the sort value of the
+    right type for the sort column (id → number,
+    name / dates → text).
+    """
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if not (isinstance(decoded, list) and len(decoded) == 2):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    value, member_id = decoded
+    valid_value = is_id(value) if sort == "id" else isinstance(value, str)
+
+    if not (valid_value and is_id(member_id)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return value, member_id
+
+
 @router.get("/members")
-def get_members(request: Request):
+async def get_members(
+    request: Request,
+    user: dict = Depends(require_user),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    after_id: Optional[int] = Query(None, ge=0, le=MAX_ID),
+    plan: Optional[str] = None,
+    joined_from: Optional[date] = None,
+    joined_to: Optional[date] = None,
+    status: Optional[Literal["active", "expired"]] = None,
+    sort: Literal[
+        "id", "-id",
+        "name", "-name",
+        "joined_on", "-joined_on",
+        "expiry_date", "-expiry_date",
+    ] = "id",
+):
     """
     STORY:
-    - User asks: "Show me all gym members"
+    - User asks: "Show me gym members"
     - We first check their TOKEN
-    - If token is valid → return members list
+    - If token is valid → return ONE PAGE of members
     - If not → deny access
+
+    Paging:
+    - limit     → members per page
+    - cursor    → `next_cursor` from the previous page
+    - after_id  → shortcut for "members after this id" (id order)
+
+    Filters:
+    - plan, joined_from, joined_to, status (active / expired)
+
+    Sorting:
+    - sort=name, joined_on, expiry_date or id
+    - prefix with "-" for newest / Z→A first
+
+    Answers carry an ETag; until the next member write
+    the same page is served from response_cache (or as
+    304 Not Modified) without touching the database.
+    """
+
+    descending = sort.startswith("-")
+    sort_column = sort.lstrip("-")
+
+    after = None
+    if cursor:
+        after = decode_cursor(cursor, sort_column)
+    elif after_id is not None:
+        if sort_column != "id":
+            raise HTTPException(
+                status_code=400, detail="after_id only works with sort=id"
+            )
+        after = (after_id, after_id)
+
+    async def build_page():
+        members = await repository.list_members(
+            limit,
+            after=after,
+            sort=sort_column,
+            descending=descending,
+            plan=plan,
+            joined_from=joined_from.isoformat() if joined_from else None,
+            joined_to=joined_to.isoformat() if joined_to else None,
+            status=status,
+            today=date.today().isoformat(),
+        )
+
+        # We asked for one extra row: if it came back,
+        # there is another page after this one.
+        next_cursor = None
+        if len(members) > limit:
+            members = members[:limit]
+            next_cursor = encode_cursor(members[-1], sort_column)
+
+        return {
+            "items": members,
+            "next_cursor": next_cursor
+        }
+
+    return await cached_json(request, build_page)
+
+
+# --------------------------------------------------
+# STEP 2️⃣🔎: SEARCH members (PROTECTED)
+# --------------------------------------------------
+@router.get("/members/search")
+async def search_members(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    user: dict = Depends(require_user),
+):
+    """
+    STORY:
+    - Front desk types part of a name or phone number
+    - Token is checked
+    - We look it up in the members_fts search index
+      and return the best matches first
+
+    Every word must match somewhere in name or phone.
+    At least one word needs 3+ characters (the index
+    works on 3-letter slices).
+    """
+
+    words = q.split()
+    long_words = [word for word in words if len(word) >= 3]
+    short_words = [word for word in words if len(word) < 3]
+
+    if not long_words:
+        raise HTTPException(
+            status_code=400, detail="Type at least 3 characters to search"
+        )
+
+    members = await repository.search_members(
+        long_words, short_words, q.strip(), limit
+    )
+
+    return {"items": members}
+
+
+# --------------------------------------------------
+# STEP 2️⃣➕: EXPORT all members (PROTECTED)
+# --------------------------------------------------
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def export_format(request: Request, format: Optional[str]) -> str:
     """
+    STORY:
+    ?format=csv / ?format=ndjson wins.
+    Otherwise we look at the Accept header.
+    NDJSON is the default.
+    """
+    if format:
+        return format
+
+    accept = request.headers.get("Accept", "")
+    if "text/csv" in accept:
+        return "csv"
+
+    return "ndjson"
+
+
+class ExportResponse(StreamingResponse):
+    """
+    Hands the export slot back (repository.end_export)
+    however the download ends: finished, failed, or the
+    client went away before the first byte.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            repository.end_export()
+
+
+async def ndjson_chunks():
+    async for rows in repository.stream_members():
+        yield "".join(
+            json.dumps(repository.member_dict(row)) + "\n" for row in rows
+        ).encode("utf-8")
+
+
+async def csv_chunks():
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(repository.MEMBER_COLUMNS)
+
+    async for rows in repository.stream_members():
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Empty register → still send the header line
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+@router.get("/members/export")
+async def export_members(
+    request: Request,
+    user: dict = Depends(require_user),
+    format: Optional[Literal["ndjson", "csv"]] = None,
+):
+    """
+    STORY:
+    - Accountant asks: "Give me EVERY member"
+    - Token is checked
+    - Members are STREAMED out batch by batch 🚰
+      (NDJSON: one JSON object per line, or CSV)
+
+    The response starts flowing right away and the
+    server never holds the full register in memory.
+
+    Only GYM_EXPORT_LIMIT exports run at once; one more
+    is told 503 + Retry-After.
+    """
+
+    chosen = export_format(request, format)
 
-    auth_header = request.headers.get("Authorization")
+    if not repository.start_export():
+        raise HTTPException(
+            status_code=503,
+            detail="Too many exports running, please retry shortly",
+            headers={"Retry-After": "30"},
+        )
+
+    chunks = csv_chunks() if chosen == "csv" else ndjson_chunks()
+
+    return ExportResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[chosen],
+        headers={
+            "Content-Disposition": f'attachment; filename="members.{chosen}"'
+        },
+    )
+
+
+# --------------------------------------------------
+# STEP 2️⃣📣: LIVE member changes (PROTECTED)
+# --------------------------------------------------
+#
+# STORY:
+# The member page keeps this connection open and
+# patches its list as events arrive (events.py):
+#
+#   event: created  data: {member}
+#   event: updated  data: {member}
+#   event: deleted  data: {"id": 7}
+#   event: resync   data: {}   → reload the list
+#
+@router.get("/members/events")
+async def member_events(request: Request, user: dict = Depends(require_stream_user)):
+    """
+    STORY:
+    - EventSource cannot send headers → ?token=... works too
+    - A browser that RE-connects (Last-Event-ID) may have
+      missed events while away, so it starts with "resync"
+    """
+    resync = "last-event-id" in request.headers
 
-    if not auth_header:
-        raise HTTPException(status_code=401, detail="Unauthorized")
+    return StreamingResponse(
+        broadcasters[current_branch()].listen(resync=resync),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # no proxy buffering (nginx)
+        },
+    )
 
-    token = auth_header.replace("Bearer ", "")
 
-    if not verify_token(token):
-        raise HTTPException(status_code=401, detail="Invalid token")
+# --------------------------------------------------
+# STEP 2️⃣🔁: Member changes since a seq (PROTECTED)
+# --------------------------------------------------
+#
+# STORY:
+# A terminal that was offline for an hour should not
+# download the whole register again. It asks:
+#
+#   GET /members/changes?since=1234
+#
+# and gets only what changed after seq 1234:
+#
+#   {"changes": [
+#       {"seq": 1240, "op": "upsert", "member": {...}},
+#       {"seq": 1241, "op": "delete", "id": 7}
+#    ],
+#    "next_since": 1241,   → ask with this next time
+#    "has_more": false,    → true: ask again right away
+#    "reset": false}       → true: too old, reload the
+#                            list, then continue from
+#                            next_since
+#
+# Without `since` it only answers next_since: ask that
+# BEFORE loading the list, then sync from there.
+#
+@router.get("/members/changes")
+async def member_changes(
+    request: Request,
+    user: dict = Depends(require_user),
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(1000, ge=1, le=10_000),
+):
+    """
+    STORY:
+    - Token is checked
+    - Every member changed after `since` comes back ONCE,
+      as it is now (or as deleted)
+    - At most `limit` log lines are read per call
+    """
 
-    cursor.execute("SELECT * FROM members")
-    members = cursor.fetchall()
+    async def build_changes():
+        return await repository.changes_since(since, limit)
 
-    return members
+    return await cached_json(request, build_changes)
 
 
 # --------------------------------------------------
 # STEP 3️⃣: ADD a new member (PROTECTED)
 # --------------------------------------------------
 @router.post("/members")
-def add_member(data: dict, request: Request):
+async def add_member(data: dict, user: dict = Depends(require_user)):
     """
     STORY:
     - Admin adds a new gym member
@@ -72,37 +411,394 @@ def add_member(data: dict, request: Request):
     - Member is saved in database
     """
 
-    auth_header = request.headers.get("Authorization")
+    member = await repository.add_member(
+        data["name"], data["phone"], data["plan"]
+    )
+    broadcasters[current_branch()].publish("created", **member)
+
+    return {"message": "Member added successfully 💪", "id": member["id"]}
+
+
+# --------------------------------------------------
+# STEP 3️⃣➕: BULK IMPORT members (PROTECTED)
+# --------------------------------------------------
+#
+# STORY:
+# A new branch opens with thousands of members.
+# Instead of one POST /members (and one commit) per
+# member, the whole list is uploaded once:
+#
+# - text/csv             → header row + one member per line
+# - application/x-ndjson → one JSON object per line
+#                          (the same format /members/export gives)
+# - application/json     → one JSON array of objects
+#
+# Fields: name, phone, plan, joined_on (optional, YYYY-MM-DD)
+#
+# Every format is read AS IT ARRIVES: each record is
+# checked right away, and valid rows are saved in
+# batches of `chunk_size` with executemany (one short
+# transaction per batch). chunk_size=0 saves every
+# valid row in ONE transaction at the end.
+#
+# Errors name their "row": the line a record starts on
+# (CSV, NDJSON) or its position in the array (JSON).
+#
+MAX_REPORTED_ERRORS = 1000
+
+
+def validate_member_row(record) -> tuple:
+    """
+    STORY:
+    Turn one uploaded record into a row ready for INSERT,
+    or raise ValueError explaining what is wrong.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("expected an object with name, phone, plan")
+
+    name = str(record.get("name") or "").strip()
+    phone = str(record.get("phone") or "").strip()
+    plan = str(record.get("plan") or "").strip()
+    joined_on = str(record.get("joined_on") or "").strip()
 
-    if not auth_header:
-        raise HTTPException(status_code=401, detail="Unauthorized")
+    if not name:
+        raise ValueError("name is required")
+    if not phone:
+        raise ValueError("phone is required")
+    if plan not in PLAN_DAYS:
+        raise ValueError(f"plan must be one of {', '.join(PLAN_DAYS)}")
 
-    token = auth_header.replace("Bearer ", "")
+    if joined_on:
+        try:
+            joined_on = date.fromisoformat(joined_on).isoformat()
+        except ValueError:
+            raise ValueError("joined_on must be a YYYY-MM-DD date")
+    else:
+        joined_on = date.today().isoformat()
 
-    if not verify_token(token):
-        raise HTTPException(status_code=401, detail="Invalid token")
+    return name, phone, plan, joined_on, expiry_date(joined_on, plan)
 
-    cursor.execute(
-        """
-        INSERT INTO members (name, phone, plan, joined_on)
-        VALUES (?, ?, ?, ?)
-        """,
-        (
-            data["name"],
-            data["phone"],
-            data["plan"],
-            date.today().isoformat()
-        )
-    )
 
-    conn.commit()
+async def body_lines(request: Request):
+    """
+    STORY:
+    Yield the uploaded body line by line while it is
+    still arriving (we never hold the whole file).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def quoted_after(line: str, quoted: bool) -> bool:
+    """
+    STORY:
+    Is a quoted CSV value still open at the end of
+    this line? (it then goes on on the next line)
+    Follows csv's default dialect: a value is quoted
+    only if it STARTS with ", and "" inside it is a
+    quote, not the end.
+    """
+    if '"' not in line:
+        return quoted
+
+    field_start = not quoted
+    closed = False  # just read the " that may end the value
+
+    for char in line:
+        if quoted:
+            if char == '"':
+                quoted, closed = False, True
+            continue
+
+        if closed and char == '"':
+            quoted, closed = True, False  # "" → a quote
+            continue
+
+        closed = False
+        if char == ",":
+            field_start = True
+        elif char == '"' and field_start:
+            quoted, field_start = True, False
+        else:
+            field_start = False
+
+    return quoted
+
+
+class LineFeed:
+    """Lines handed to csv.reader as they arrive."""
+
+    def __init__(self):
+        self.lines = collections.deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def csv_records(request: Request):
+    """
+    STORY:
+    ONE csv.reader reads the whole upload, so a quoted
+    value may hold commas and even line breaks.
+
+    Lines wait in the feed until no quoted value is
+    open any more; then the reader takes every record
+    they hold. Yields (line the record starts on,
+    record); the header is line 1.
+
+    A record with more or fewer values than the header
+    is reported, not guessed at.
+    """
+    feed = LineFeed()
+    reader = csv.reader(feed)
+    header = None
+    quoted = False
+
+    def ready():
+        nonlocal header
 
-    return {"message": "Member added successfully 💪"}
+        while feed.lines:
+            row_number = reader.line_num + 1
+            try:
+                values = next(reader, None)
+            except csv.Error as error:
+                yield row_number, ValueError(f"not valid CSV: {error}")
+                continue
+
+            if values is None:
+                return
+            if len(values) <= 1 and not "".join(values).strip():
+                continue  # blank line
+
+            if header is None:
+                header = [column.strip().lower() for column in values]
+            elif len(values) != len(header):
+                yield row_number, ValueError(
+                    f"expected {len(header)} values, got {len(values)}"
+                )
+            else:
+                yield row_number, dict(zip(header, values))
+
+    async for line in body_lines(request):
+        feed.lines.append(line + "\n")
+        quoted = quoted_after(line, quoted)
+
+        if not quoted:
+            for row in ready():
+                yield row
+
+    for row in ready():  # a quote left open at the end
+        yield row
+
+
+async def ndjson_records(request: Request):
+    """Yields (line number, record)."""
+    row_number = 0
+
+    async for line in body_lines(request):
+        row_number += 1
+        if not line.strip():
+            continue
+
+        try:
+            yield row_number, json.loads(line)
+        except ValueError:
+            yield row_number, ValueError("line is not valid JSON")
+
+
+# A single array element bigger than this is refused
+# (we would have to hold it whole to decode it).
+MAX_JSON_RECORD = 1024 * 1024
+
+
+async def json_records(request: Request):
+    """
+    STORY:
+    The array is read AS IT ARRIVES too: every element
+    is decoded (raw_decode) as soon as it is complete,
+    so only the current member is held in memory.
+
+    Yields (position in the array counted from 1,
+    record). Broken JSON before the first member → 400;
+    later on it is reported at that position and the
+    rest of the body is ignored (it cannot be read).
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8-sig")()
+    chunks = request.stream().__aiter__()
+
+    buffer = ""
+    at = 0
+    finished = False
+    state = "start"  # start → first → (value → after)* → end
+    row_number = 0
+
+    async def more() -> bool:
+        nonlocal buffer, at, finished
+        if finished:
+            return False
+        try:
+            chunk = await chunks.__anext__()
+        except StopAsyncIteration:
+            chunk, finished = b"", True
+        buffer = buffer[at:] + text.decode(chunk, final=finished)
+        at = 0
+        return True
+
+    def broken(message="Body is not valid JSON"):
+        if row_number == 0:
+            raise HTTPException(status_code=400, detail=message)
+        return row_number + 1, ValueError(message)
+
+    while True:
+        while at < len(buffer) and buffer[at] in " \t\r\n":
+            at += 1
+
+        if at == len(buffer):
+            if await more():
+                continue
+            break
+
+        char = buffer[at]
+
+        if state == "start":
+            if char != "[":
+                raise HTTPException(status_code=400, detail="Expected a JSON array")
+            state, at = "first", at + 1
+
+        elif state == "first" and char == "]":
+            state, at = "end", at + 1
+
+        elif state in ("first", "value"):
+            try:
+                record, end = decoder.raw_decode(buffer, at)
+            except ValueError:
+                record, end = None, None
+
+            # Incomplete (or a number that may go on): wait for more
+            if (end is None or end == len(buffer)) and not finished:
+                if len(buffer) - at > MAX_JSON_RECORD:
+                    yield broken("array element is too large")
+                    return
+                await more()
+                continue
+
+            if end is None:
+                yield broken()
+                return
+
+            row_number += 1
+            yield row_number, record
+            state, at = "after", end
+
+        elif state == "after" and char in ",]":
+            state, at = ("value" if char == "," else "end"), at + 1
+
+        else:
+            yield broken()
+            return
+
+    if state != "end":
+        yield broken()
+
+
+@router.post("/members/import")
+async def import_members(
+    request: Request,
+    user: dict = Depends(require_user),
+    chunk_size: int = Query(5000, ge=0, le=100_000),
+):
+    """
+    STORY:
+    - Admin uploads many members at once
+    - Token is checked
+    - Every row is validated
+    - Valid rows are saved with executemany
+    - Bad rows are reported back with their row number
+    """
+
+    content_type = request.headers.get("Content-Type", "")
+    if "csv" in content_type:
+        records = csv_records(request)
+    elif "ndjson" in content_type:
+        records = ndjson_records(request)
+    else:
+        records = json_records(request)
+
+    imported = 0
+    failed = 0
+    errors = []
+    batch = []
+    batch_start = 1
+
+    def report(row_number, message, to_row=None, rows=1):
+        nonlocal failed
+        failed += rows
+
+        if len(errors) < MAX_REPORTED_ERRORS:
+            error = {"row": row_number, "error": message}
+            if to_row is not None:
+                error["to_row"] = to_row
+            errors.append(error)
+
+    async def flush(last_row):
+        nonlocal imported, batch, batch_start
+        if batch:
+            try:
+                imported += await repository.insert_members(batch)
+            except sqlite3.Error as error:
+                # The whole batch was rolled back together
+                report(batch_start, str(error), to_row=last_row, rows=len(batch))
+        batch = []
+        batch_start = last_row + 1
+
+    row_number = 0
+    async for row_number, record in records:
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            batch.append(validate_member_row(record))
+        except ValueError as error:
+            report(row_number, str(error))
+            continue
+
+        if chunk_size and len(batch) >= chunk_size:
+            await flush(row_number)
+
+    await flush(row_number)
+
+    # Too many rows to announce one by one
+    if imported:
+        broadcasters[current_branch()].publish("resync")
+
+    return {
+        "imported": imported,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors)
+    }
 # -----------------------------------
 # UPDATE MEMBER ✏️
 # -----------------------------------
 @router.put("/members/{member_id}")
-def update_member(member_id: int, data: dict, request: Request):
+async def update_member(
+    member_id: int, data: dict, user: dict = Depends(require_user)
+):
     """
     STORY:
     - Admin edits a member
@@ -110,23 +806,11 @@ def update_member(member_id: int, data: dict, request: Request):
     - Member details are updated
     """
 
-    auth_header = request.headers.get("Authorization")
-    if not auth_header:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-    token = auth_header.replace("Bearer ", "")
-    if not verify_token(token):
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    cursor.execute(
-        """
-        UPDATE members
-        SET name = ?, phone = ?, plan = ?
-        WHERE id = ?
-        """,
-        (data["name"], data["phone"], data["plan"], member_id)
+    member = await repository.update_member(
+        member_id, data["name"], data["phone"], data["plan"]
     )
-    conn.commit()
+    if member:
+        broadcasters[current_branch()].publish("updated", **member)
 
     return {"message": "Member updated successfully ✏️"}
 
@@ -135,7 +819,7 @@ def update_member(member_id: int, data: dict, request: Request):
 # DELETE MEMBER 🗑️
 # -----------------------------------
 @router.delete("/members/{member_id}")
-def delete_member(member_id: int, request: Request):
+async def delete_member(member_id: int, user: dict = Depends(require_user)):
     """
     STORY:
     - Admin removes a member
@@ -143,15 +827,7 @@ def delete_member(member_id: int, request: Request):
     - Member is deleted from DB
     """
 
-    auth_header = request.headers.get("Authorization")
-    if not auth_header:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-    token = auth_header.replace("Bearer ", "")
-    if not verify_token(token):
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    cursor.execute("DELETE FROM members WHERE id = ?", (member_id,))
-    conn.commit()
+    if await repository.delete_member(member_id):
+        broadcasters[current_branch()].publish("deleted", id=member_id)
 
     return {"message": "Member deleted successfully 🗑️"}
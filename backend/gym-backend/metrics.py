@@ -0,0 +1,261 @@
+# --------------------------------------------------
+# metrics.py 📈
+# --------------------------------------------------
+#
+# STORY:
+# This file is the GYM'S CCTV 🎥
+#
+# It quietly watches every request and writes down:
+# - how long it took (per route + status, as a histogram)
+# - how big the answer was
+# - how many requests are inside RIGHT NOW
+# - how busy the worker threads are
+#
+# GET /metrics shows it all in Prometheus text format,
+# so a Prometheus server (or a human) can scrape it.
+#
+# Cheap enough to leave on all the time:
+# - all counters are plain Python numbers
+# - they are only touched from the event loop thread,
+#   so no locks are needed
+# --------------------------------------------------
+
+import bisect
+import time
+from collections import defaultdict
+
+import anyio.to_thread
+from fastapi import Response
+
+import admission
+import checkins
+import events
+import group_commit
+import repository
+from auth_guard import token_cache
+from response_cache import response_cache
+from security import hashing_stats
+
+# Upper bounds (seconds / bytes) of the histogram buckets
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+SIZE_BUCKETS = (
+    100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000,
+)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+# --------------------------------------------------
+# The numbers we keep
+# --------------------------------------------------
+latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))  # (method, route, status)
+response_size = defaultdict(lambda: Histogram(SIZE_BUCKETS))  # (method, route)
+in_flight = defaultdict(int)  # method
+started_at = time.time()
+
+
+def route_label(scope) -> str:
+    """
+    STORY:
+    Use the route TEMPLATE ("/members/{member_id}"),
+    never the raw path, so one member = one series,
+    not one series per member id.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+# --------------------------------------------------
+# The middleware (pure ASGI, no extra tasks)
+# --------------------------------------------------
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def watch(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_flight[method] += 1
+        try:
+            await self.app(scope, receive, watch)
+        finally:
+            in_flight[method] -= 1
+
+            route = route_label(scope)
+            latency[(method, route, str(status))].observe(time.perf_counter() - started)
+            response_size[(method, route)].observe(size)
+
+
+# --------------------------------------------------
+# Prometheus text format
+# --------------------------------------------------
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render() -> str:
+    lines = []
+
+    def metric(name, kind, help_text):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    metric("gym_http_request_duration_seconds", "histogram",
+           "Request latency by route and status.")
+    for (method, route, status), histogram in sorted(latency.items()):
+        labels = f'method="{method}",route="{escape(route)}",status="{status}"'
+        lines.extend(histogram.lines("gym_http_request_duration_seconds", labels))
+
+    metric("gym_http_response_size_bytes", "histogram",
+           "Response body size by route.")
+    for (method, route), histogram in sorted(response_size.items()):
+        labels = f'method="{method}",route="{escape(route)}"'
+        lines.extend(histogram.lines("gym_http_response_size_bytes", labels))
+
+    metric("gym_http_requests_in_flight", "gauge",
+           "Requests currently being handled.")
+    for method, count in sorted(in_flight.items()):
+        lines.append(f'gym_http_requests_in_flight{{method="{method}"}} {count}')
+
+    # Generic AnyIO threadpool (sync routes, sync dependencies)
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    metric("gym_threadpool_busy", "gauge", "AnyIO threadpool tokens in use.")
+    lines.append(f"gym_threadpool_busy {limiter.borrowed_tokens}")
+    metric("gym_threadpool_size", "gauge", "AnyIO threadpool size.")
+    lines.append(f"gym_threadpool_size {limiter.total_tokens}")
+
+    # Dedicated DB executor (repository.py)
+    db = repository.executor_stats()
+    metric("gym_db_executor_busy", "gauge", "DB executor threads running a call.")
+    lines.append(f"gym_db_executor_busy {db['busy']}")
+    metric("gym_db_executor_queued", "gauge", "DB calls waiting for a free DB thread.")
+    lines.append(f"gym_db_executor_queued {db['queued']}")
+    metric("gym_db_executor_size", "gauge", "DB executor threads.")
+    lines.append(f"gym_db_executor_size {db['workers']}")
+
+    db = repository.executor_stats("read")
+    metric("gym_db_read_executor_busy", "gauge", "Read-only DB executor threads running a call.")
+    lines.append(f"gym_db_read_executor_busy {db['busy']}")
+    metric("gym_db_read_executor_queued", "gauge", "Read calls waiting for a free read-only DB thread.")
+    lines.append(f"gym_db_read_executor_queued {db['queued']}")
+    metric("gym_db_read_executor_size", "gauge", "Read-only DB executor threads.")
+    lines.append(f"gym_db_read_executor_size {db['workers']}")
+
+    # Password hashing pool (security.py)
+    hashing = hashing_stats()
+    metric("gym_password_hash_busy", "gauge", "Hashing threads computing a password hash.")
+    lines.append(f"gym_password_hash_busy {hashing['busy']}")
+    metric("gym_password_hash_queued", "gauge", "Password hashes waiting for a hashing thread.")
+    lines.append(f"gym_password_hash_queued {hashing['queued']}")
+    metric("gym_password_hash_workers", "gauge", "Hashing threads.")
+    lines.append(f"gym_password_hash_workers {hashing['workers']}")
+
+    # Group-commit writers (group_commit.py, all branches), when turned on
+    if group_commit.writer is not None:
+        writes = {"batches": 0, "writes": 0, "queued": 0}
+        for writer in group_commit.all_writers():
+            for key, value in writer.stats().items():
+                writes[key] += value
+        metric("gym_group_commit_batches_total", "counter", "Commits made by the group-commit writer.")
+        lines.append(f"gym_group_commit_batches_total {writes['batches']}")
+        metric("gym_group_commit_writes_total", "counter", "Writes committed by the group-commit writer.")
+        lines.append(f"gym_group_commit_writes_total {writes['writes']}")
+        metric("gym_group_commit_queued", "gauge", "Writes waiting for the group-commit writer.")
+        lines.append(f"gym_group_commit_queued {writes['queued']}")
+
+    # Live member events (events.py)
+    listeners = events.stats()
+    metric("gym_event_listeners", "gauge", "Open /members/events connections.")
+    lines.append(f"gym_event_listeners {listeners['listeners']}")
+    metric("gym_events_published_total", "counter", "Member change events published.")
+    lines.append(f"gym_events_published_total {listeners['published']}")
+    metric("gym_event_resyncs_total", "counter", "Listeners told to resync after falling behind.")
+    lines.append(f"gym_event_resyncs_total {listeners['resyncs']}")
+
+    # Doorman (admission.py)
+    doors = admission.stats()
+    metric("gym_admission_limit", "gauge", "Requests allowed in at once, per route class.")
+    for name, door in doors.items():
+        lines.append(f'gym_admission_limit{{class="{name}"}} {door["limit"]}')
+    metric("gym_admission_active", "gauge", "Requests let in and still running, per route class.")
+    for name, door in doors.items():
+        lines.append(f'gym_admission_active{{class="{name}"}} {door["active"]}')
+    metric("gym_admission_queued", "gauge", "Requests waiting to be let in, per route class.")
+    for name, door in doors.items():
+        lines.append(f'gym_admission_queued{{class="{name}"}} {door["queued"]}')
+    metric("gym_admission_admitted_total", "counter", "Requests let in, per route class.")
+    for name, door in doors.items():
+        lines.append(f'gym_admission_admitted_total{{class="{name}"}} {door["admitted"]}')
+    metric("gym_admission_shed_total", "counter", "Requests turned away with 503, per route class and reason.")
+    for name, door in doors.items():
+        for reason, count in door["shed"].items():
+            lines.append(f'gym_admission_shed_total{{class="{name}",reason="{reason}"}} {count}')
+    metric("gym_login_throttled_total", "counter", "Login attempts refused with 429.")
+    lines.append(f"gym_login_throttled_total {admission.login_throttle.throttled}")
+
+    # Door scanners
+    metric("gym_checkin_batches_total", "counter", "Check-in batches received from door scanners.")
+    lines.append(f"gym_checkin_batches_total {checkins.stats['batches']}")
+    metric("gym_checkin_scans_total", "counter", "Scans received, per outcome.")
+    for outcome in ("accepted", "duplicates", "rejected"):
+        lines.append(f'gym_checkin_scans_total{{outcome="{outcome}"}} {checkins.stats[outcome]}')
+
+    # Caches
+    tokens = token_cache.stats()
+    metric("gym_token_cache_lookups_total", "counter", "Verified-token cache lookups.")
+    lines.append(f'gym_token_cache_lookups_total{{result="hit"}} {tokens["hits"]}')
+    lines.append(f'gym_token_cache_lookups_total{{result="miss"}} {tokens["misses"]}')
+
+    responses = response_cache.stats()
+    metric("gym_response_cache_lookups_total", "counter", "Response cache lookups.")
+    lines.append(f'gym_response_cache_lookups_total{{result="hit"}} {responses["hits"]}')
+    lines.append(f'gym_response_cache_lookups_total{{result="miss"}} {responses["misses"]}')
+    lines.append(
+        f'gym_response_cache_lookups_total{{result="not_modified"}} {responses["not_modified"]}'
+    )
+
+    metric("gym_process_start_time_seconds", "gauge", "Unix time the process started.")
+    lines.append(f"gym_process_start_time_seconds {started_at}")
+
+    return "\n".join(lines) + "\n"
+
+
+def metrics_response() -> Response:
+    return Response(render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,1068 @@
+# --------------------------------------------------
+# migrations.py 🧱
+# --------------------------------------------------
+#
+# STORY:
+# The storage room gets rebuilt now and then:
+# a new column, a new tally sheet, a new index.
+#
+# Before, every start just ran "CREATE ... IF NOT EXISTS"
+# and hoped for the best. An old gym.db (with join_date
+# instead of joined_on) simply broke.
+#
+# Now every change is a numbered MIGRATION:
+#
+# 1️⃣ schema_migrations remembers which numbers are done
+#    → the schema version is MAX(version)
+# 2️⃣ Only the missing ones run, in order
+# 3️⃣ Big data fixes (backfills) run in small BATCHES,
+#    one short transaction each, so the front desk can
+#    keep writing in between
+# 4️⃣ A backfill remembers how far it got
+#    (schema_backfill), so a stopped migration carries
+#    on where it left off
+# 5️⃣ Progress is logged ("gym.migrations")
+#
+# Usage:
+#   python migrations.py                  → migrate, with progress
+#   python migrations.py status           → show versions only
+#   python migrations.py --batch-size N   → rows per transaction
+#   python migrations.py --branch north   → a branch's own file
+#   python migrations.py --branch all     → every branch (shards.py)
+#
+# Without --branch only the home database (GYM_DB_PATH)
+# is touched. With it, the home database is migrated
+# first: it holds the branch registry.
+#
+# Settings:
+# GYM_MIGRATION_BATCH    → rows per backfill transaction
+# GYM_MIGRATION_PAUSE_MS → rest between two batches
+# GYM_MIGRATION_LOCK_WAIT → longest wait (seconds) for
+#                           another process's migration
+#
+# Every migration must be safe to run AGAIN from the
+# top: a crash may stop it half way.
+# --------------------------------------------------
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from plans import PLAN_DAYS, DEFAULT_DAYS
+
+BATCH_SIZE = int(os.environ.get("GYM_MIGRATION_BATCH", "5000"))
+BATCH_PAUSE_MS = float(os.environ.get("GYM_MIGRATION_PAUSE_MS", "20"))
+LOCK_WAIT = float(os.environ.get("GYM_MIGRATION_LOCK_WAIT", "600"))
+
+log = logging.getLogger("gym.migrations")
+
+MIGRATIONS = []  # (version, name, function), filled by @migration
+
+
+def migration(version: int, name: str):
+    def register(fn):
+        MIGRATIONS.append((version, name, fn))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return fn
+
+    return register
+
+
+# --------------------------------------------------
+# STEP 1️⃣: The migration connection
+# --------------------------------------------------
+def split_sql(script: str):
+    """
+    STORY:
+    executescript() always COMMITs first, which would
+    break our own transactions. Split the script into
+    single statements instead (trigger bodies included).
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            yield statement.strip()
+            statement = ""
+
+    if statement.strip():
+        yield statement.strip()
+
+
+class Migrator:
+    """
+    One autocommit connection. Every transaction is
+    explicit (BEGIN IMMEDIATE … COMMIT) and short.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000,
+                 batch_size: int = BATCH_SIZE, pause_ms: float = BATCH_PAUSE_MS):
+        self.conn = sqlite3.connect(path, timeout=busy_timeout_ms / 1000, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+
+        self.batch_size = batch_size
+        self.pause = pause_ms / 1000
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def transaction(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def script(self, sql: str, parameters=()):
+        for statement in split_sql(sql):
+            self.conn.execute(statement, parameters)
+
+    def exists(self, name: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+        ).fetchone() is not None
+
+    def columns(self, table: str) -> list:
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+
+    # ----------------------------------------------
+    # Schema version
+    # ----------------------------------------------
+    def ensure_version_table(self):
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+        """)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_backfill (
+            name TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            upto INTEGER NOT NULL
+        )
+        """)
+
+    def applied(self) -> set:
+        return {row[0] for row in self.conn.execute("SELECT version FROM schema_migrations")}
+
+    def record(self, version: int, name: str):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+            (version, name, datetime.now(timezone.utc).isoformat(timespec="seconds")),
+        )
+
+    # ----------------------------------------------
+    # Batched backfills over members.id
+    # ----------------------------------------------
+    #
+    # STORY:
+    # A backfill walks the members table in id order,
+    # batch_size rows per transaction:
+    #
+    #   (position, next id]  → run batch_sql  → position moves up
+    #
+    # "upto" is the highest id when the backfill started.
+    # Rows added after that are handled by triggers, not
+    # by the backfill.
+    #
+    def pending(self, name: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM schema_backfill WHERE name = ?", (name,)
+        ).fetchone() is not None
+
+    def start_backfill(self, name: str):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO schema_backfill (name, position, upto) "
+            "SELECT ?, 0, COALESCE(MAX(id), 0) FROM members",
+            (name,),
+        )
+
+    def backfill(self, name: str, batch_sql: str, label: str):
+        """
+        batch_sql gets :low and :high and must only touch
+        members with low < id <= high.
+        """
+        position, upto = self.conn.execute(
+            "SELECT position, upto FROM schema_backfill WHERE name = ?", (name,)
+        ).fetchone()
+
+        total = self.conn.execute(
+            "SELECT COUNT(*) FROM members WHERE id <= ?", (upto,)
+        ).fetchone()[0]
+        done = self.conn.execute(
+            "SELECT COUNT(*) FROM members WHERE id <= ?", (position,)
+        ).fetchone()[0]
+
+        if position:
+            log.info("%s: resuming after id %d", label, position)
+
+        reported = time.monotonic()
+
+        while position < upto:
+            with self.transaction():
+                high, rows = self.conn.execute(
+                    "SELECT MAX(id), COUNT(*) FROM ("
+                    "  SELECT id FROM members WHERE id > ? AND id <= ? ORDER BY id LIMIT ?"
+                    ")",
+                    (position, upto, self.batch_size),
+                ).fetchone()
+                high = upto if high is None else high
+
+                self.script(batch_sql, {"low": position, "high": high})
+                self.conn.execute(
+                    "UPDATE schema_backfill SET position = ? WHERE name = ?", (high, name)
+                )
+
+            position = high
+            done += rows
+
+            if time.monotonic() - reported >= 1 or position >= upto:
+                reported = time.monotonic()
+                log.info("%s: %d/%d rows (%.0f%%)", label, done, total,
+                         100 * done / total if total else 100)
+
+            # Let front-desk writers grab the lock between batches
+            if self.pause and position < upto:
+                time.sleep(self.pause)
+
+    def gate(self, name: str, row: str) -> str:
+        """
+        STORY:
+        While a backfill is running, a trigger must skip
+        rows the backfill has not reached yet (it will
+        read their latest state when it gets there).
+        """
+        return (
+            f"WHEN NOT EXISTS (SELECT 1 FROM schema_backfill WHERE name = '{name}' "
+            f"AND {row}.id > position AND {row}.id <= upto)"
+        )
+
+
+# --------------------------------------------------
+# STEP 2️⃣: Running migrations
+# --------------------------------------------------
+def latest_version() -> int:
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+@contextmanager
+def migration_lock(path: str):
+    """
+    STORY:
+    Several server processes (uvicorn --workers N) start
+    at the same time. Only ONE may migrate; the others
+    wait, then find nothing left to do.
+
+    The lock is an EXCLUSIVE transaction on a tiny side
+    file next to the database: SQLite's own file
+    locking, so it works on every OS, and a process
+    that crashes lets go of it.
+    """
+    lock = sqlite3.connect(f"{path}-migrate.lock", timeout=0, isolation_level=None)
+    try:
+        try:
+            lock.execute("BEGIN EXCLUSIVE")
+        except sqlite3.OperationalError:
+            log.info("%s: another process is migrating, waiting", path)
+            lock.execute(f"PRAGMA busy_timeout={int(LOCK_WAIT * 1000)}")
+            lock.execute("BEGIN EXCLUSIVE")
+
+        yield
+    finally:
+        lock.close()  # ends the transaction → lock released
+
+
+def migrate(path: str, busy_timeout_ms: int = 5000, **options) -> int:
+    """
+    STORY:
+    Bring the database at `path` up to the latest
+    version. Returns the version it ends at.
+
+    An up-to-date database is only READ (no lock, no
+    write), so every process may call this on start.
+    """
+    db = Migrator(path, busy_timeout_ms, **options)
+    try:
+        applied = db.applied() if db.exists("schema_migrations") else set()
+        if applied >= {version for version, _, _ in MIGRATIONS}:
+            return max(applied, default=0)
+
+        with migration_lock(path):
+            return _upgrade(db)
+    finally:
+        db.close()
+
+
+def _upgrade(db: Migrator) -> int:
+    db.ensure_version_table()
+    applied = db.applied()
+
+    for version, name, fn in MIGRATIONS:
+        if version in applied:
+            continue
+
+        label = f"{version:04d} {name}"
+        log.info("%s: applying", label)
+        started = time.perf_counter()
+
+        fn(db, label)
+
+        with db.transaction():
+            db.record(version, name)
+
+        log.info("%s: done in %.2fs", label, time.perf_counter() - started)
+
+    return max(db.applied(), default=0)
+
+
+def status(path: str) -> list:
+    """[(version, name, applied_at or None)] for every known migration."""
+    db = Migrator(path)
+    try:
+        db.ensure_version_table()
+        applied = dict(
+            (row[0], row[1]) for row in
+            db.conn.execute("SELECT version, applied_at FROM schema_migrations")
+        )
+        return [(version, name, applied.get(version)) for version, name, _ in MIGRATIONS]
+    finally:
+        db.close()
+
+
+# --------------------------------------------------
+# STEP 3️⃣: SQL shared with reconcile.py
+# --------------------------------------------------
+def expiry_sql() -> str:
+    """
+    STORY:
+    SQL twin of plans.calculate_expiry(), used to
+    backfill rows written before expiry_date existed.
+    """
+    cases = " ".join(
+        f"WHEN '{plan}' THEN '+{days} days'" for plan, days in PLAN_DAYS.items()
+    )
+    return f"date(joined_on, CASE plan {cases} ELSE '+{DEFAULT_DAYS} days' END)"
+
+
+def _tally(row: str, delta: int) -> str:
+    return f"""
+        INSERT INTO member_plan_counts (plan, members)
+        VALUES ({row}plan, {delta})
+        ON CONFLICT(plan) DO UPDATE SET members = members + ({delta});
+
+        INSERT INTO member_expiry_counts (expiry_date, members)
+        VALUES ({row}expiry_date, {delta})
+        ON CONFLICT(expiry_date) DO UPDATE SET members = members + ({delta});
+
+        DELETE FROM member_expiry_counts
+        WHERE expiry_date = {row}expiry_date AND members <= 0;
+    """
+
+
+def tally_triggers(gate=lambda row: "") -> str:
+    return f"""
+    DROP TRIGGER IF EXISTS members_tally_insert;
+    DROP TRIGGER IF EXISTS members_tally_delete;
+    DROP TRIGGER IF EXISTS members_tally_update;
+
+    CREATE TRIGGER members_tally_insert
+    AFTER INSERT ON members
+    {gate("NEW")}
+    BEGIN
+        {_tally("NEW.", 1)}
+    END;
+
+    CREATE TRIGGER members_tally_delete
+    AFTER DELETE ON members
+    {gate("OLD")}
+    BEGIN
+        {_tally("OLD.", -1)}
+    END;
+
+    CREATE TRIGGER members_tally_update
+    AFTER UPDATE OF plan, expiry_date ON members
+    {gate("NEW")}
+    BEGIN
+        {_tally("OLD.", -1)}
+        {_tally("NEW.", 1)}
+    END;
+    """
+
+
+def rebuild_aggregates(conn):
+    """
+    STORY:
+    Throw the tally sheets away and count everything again.
+    Used by `python reconcile.py --repair`.
+    """
+    conn.execute("DELETE FROM member_plan_counts")
+    conn.execute("DELETE FROM member_expiry_counts")
+
+    conn.execute("""
+        INSERT INTO member_plan_counts (plan, members)
+        SELECT plan, COUNT(*) FROM members GROUP BY plan
+    """)
+    conn.execute("""
+        INSERT INTO member_expiry_counts (expiry_date, members)
+        SELECT expiry_date, COUNT(*) FROM members GROUP BY expiry_date
+    """)
+
+
+def search_triggers(gate=lambda row: "") -> str:
+    return f"""
+    DROP TRIGGER IF EXISTS members_fts_insert;
+    DROP TRIGGER IF EXISTS members_fts_delete;
+    DROP TRIGGER IF EXISTS members_fts_update;
+
+    CREATE TRIGGER members_fts_insert
+    AFTER INSERT ON members
+    {gate("NEW")}
+    BEGIN
+        INSERT INTO members_fts (rowid, name, phone)
+        VALUES (NEW.id, NEW.name, NEW.phone);
+    END;
+
+    CREATE TRIGGER members_fts_delete
+    AFTER DELETE ON members
+    {gate("OLD")}
+    BEGIN
+        INSERT INTO members_fts (members_fts, rowid, name, phone)
+        VALUES ('delete', OLD.id, OLD.name, OLD.phone);
+    END;
+
+    CREATE TRIGGER members_fts_update
+    AFTER UPDATE OF name, phone ON members
+    {gate("NEW")}
+    BEGIN
+        INSERT INTO members_fts (members_fts, rowid, name, phone)
+        VALUES ('delete', OLD.id, OLD.name, OLD.phone);
+
+        INSERT INTO members_fts (rowid, name, phone)
+        VALUES (NEW.id, NEW.name, NEW.phone);
+    END;
+    """
+
+
+def gated_backfill(db: Migrator, name: str, label: str, table: str,
+                   setup_sql, batch_sql: str, triggers):
+    """
+    STORY:
+    Build a trigger-maintained table next to a LIVE
+    members table:
+
+    1. Create it, with triggers that skip rows the
+       backfill has not reached yet
+    2. Fill it batch by batch
+    3. Swap in the normal (ungated) triggers
+
+    `table` already there and no backfill pending →
+    it was filled before (by an earlier run, or by a
+    gym.db older than migrations): only the triggers
+    are refreshed.
+    """
+    if db.exists(table) and not db.pending(name):
+        with db.transaction():
+            db.script(triggers())
+        return
+
+    if not db.pending(name):
+        with db.transaction():
+            db.start_backfill(name)
+            db.script(setup_sql)
+            db.script(triggers(lambda row: db.gate(name, row)))
+
+    db.backfill(name, batch_sql, label)
+
+    with db.transaction():
+        db.script(triggers())
+        db.conn.execute("DELETE FROM schema_backfill WHERE name = ?", (name,))
+
+
+# --------------------------------------------------
+# STEP 4️⃣: The migrations
+# --------------------------------------------------
+
+@migration(1, "users and members tables")
+def base_tables(db, label):
+    """
+    STORY:
+    users   → people who can LOGIN (password stored as HASH)
+    members → the GYM REGISTER BOOK 📒, one row per member
+
+    The very first gym.db called the join column
+    join_date. Renaming a column is instant in SQLite
+    (no table copy), so it is done in place.
+    """
+    with db.transaction():
+        if "join_date" in db.columns("members") and "joined_on" not in db.columns("members"):
+            db.conn.execute("ALTER TABLE members RENAME COLUMN join_date TO joined_on")
+
+        db.script("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS members (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            plan TEXT NOT NULL,
+            joined_on TEXT NOT NULL
+        );
+        """)
+
+
+@migration(2, "members.expiry_date")
+def expiry_column(db, label):
+    """
+    STORY:
+    expiry_date = the day the plan runs out, worked out
+    once when the member is written.
+
+    Adding the column is instant; filling it in for an
+    existing register is done in batches. The index is
+    built last, once every row has a value.
+    """
+    with db.transaction():
+        if "expiry_date" not in db.columns("members"):
+            db.conn.execute("ALTER TABLE members ADD COLUMN expiry_date TEXT")
+
+        missing = db.conn.execute(
+            "SELECT 1 FROM members WHERE expiry_date IS NULL LIMIT 1"
+        ).fetchone()
+        if missing:
+            db.start_backfill("expiry_date")
+
+    if not db.pending("expiry_date"):
+        with db.transaction():
+            db.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_members_expiry_date ON members (expiry_date)"
+            )
+        return
+
+    db.backfill(
+        "expiry_date",
+        f"""
+        UPDATE members SET expiry_date = {expiry_sql()}
+        WHERE id > :low AND id <= :high AND expiry_date IS NULL;
+        """,
+        label,
+    )
+
+    with db.transaction():
+        # Rows written meanwhile by an older server without expiry_date
+        db.conn.execute(
+            f"UPDATE members SET expiry_date = {expiry_sql()} WHERE expiry_date IS NULL"
+        )
+        db.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_members_expiry_date ON members (expiry_date)"
+        )
+        db.conn.execute("DELETE FROM schema_backfill WHERE name = 'expiry_date'")
+
+
+@migration(3, "dashboard tally tables")
+def dashboard_tallies(db, label):
+    """
+    STORY:
+    The dashboard only wants COUNTERS:
+
+    member_plan_counts   → plan        | members
+    member_expiry_counts → expiry_date | members
+
+    SQLite TRIGGERS keep them up to date on every
+    INSERT / UPDATE / DELETE of a member, in the SAME
+    transaction, so they can never drift on a crash.
+    """
+    gated_backfill(
+        db, "tallies", label, "member_expiry_counts",
+        setup_sql="""
+        CREATE TABLE IF NOT EXISTS member_plan_counts (
+            plan TEXT PRIMARY KEY,
+            members INTEGER NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS member_expiry_counts (
+            expiry_date TEXT PRIMARY KEY,
+            members INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        """,
+        batch_sql="""
+        INSERT INTO member_plan_counts (plan, members)
+        SELECT plan, COUNT(*) FROM members
+        WHERE id > :low AND id <= :high GROUP BY plan
+        ON CONFLICT(plan) DO UPDATE SET members = members + excluded.members;
+
+        INSERT INTO member_expiry_counts (expiry_date, members)
+        SELECT expiry_date, COUNT(*) FROM members
+        WHERE id > :low AND id <= :high GROUP BY expiry_date
+        ON CONFLICT(expiry_date) DO UPDATE SET members = members + excluded.members;
+        """,
+        triggers=tally_triggers,
+    )
+
+
+@migration(4, "members list indexes")
+def list_indexes(db, label):
+    """
+    STORY:
+    Indexes for GET /members filters and sorting.
+
+    Every index also stores the row id, so an index on
+    (plan) is really (plan, id): just what keyset
+    pagination needs to resume a page.
+
+    SQLite builds an index in one go; one index per
+    transaction keeps each lock as short as it can be.
+    """
+    for sql in (
+        "CREATE INDEX IF NOT EXISTS idx_members_plan ON members (plan)",
+        "CREATE INDEX IF NOT EXISTS idx_members_joined_on ON members (joined_on)",
+        "CREATE INDEX IF NOT EXISTS idx_members_name ON members (name)",
+    ):
+        with db.transaction():
+            db.conn.execute(sql)
+
+
+@migration(5, "member search index")
+def search_index(db, label):
+    """
+    STORY:
+    members_fts is a full-text index over name + phone.
+    The "trigram" tokenizer indexes every 3-letter slice,
+    so ANY part of a name or phone number can be found.
+
+    It is an "external content" index: it stores only the
+    index, the text itself stays in members.
+    """
+    gated_backfill(
+        db, "search", label, "members_fts",
+        setup_sql="""
+        CREATE VIRTUAL TABLE IF NOT EXISTS members_fts USING fts5(
+            name,
+            phone,
+            content = 'members',
+            content_rowid = 'id',
+            tokenize = 'trigram'
+        );
+        """,
+        batch_sql="""
+        INSERT INTO members_fts (rowid, name, phone)
+        SELECT id, name, phone FROM members WHERE id > :low AND id <= :high;
+        """,
+        triggers=search_triggers,
+    )
+
+
+@migration(6, "data version counter")
+def data_version(db, label):
+    """
+    STORY:
+    A single number that goes UP every time any member
+    is added, changed or removed (see response_cache.py).
+    """
+    with db.transaction():
+        db.script("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        );
+
+        INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0);
+
+        CREATE TRIGGER IF NOT EXISTS members_version_insert
+        AFTER INSERT ON members
+        BEGIN
+            UPDATE data_version SET version = version + 1 WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS members_version_update
+        AFTER UPDATE ON members
+        BEGIN
+            UPDATE data_version SET version = version + 1 WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS members_version_delete
+        AFTER DELETE ON members
+        BEGIN
+            UPDATE data_version SET version = version + 1 WHERE id = 1;
+        END;
+        """)
+
+
+def _daily(row: str, delta: int) -> str:
+    return f"""
+        INSERT INTO member_daily (day, plan, joins, expirations)
+        VALUES ({row}joined_on, {row}plan, {delta}, 0)
+        ON CONFLICT(day, plan) DO UPDATE SET joins = joins + ({delta});
+
+        INSERT INTO member_daily (day, plan, joins, expirations)
+        VALUES ({row}expiry_date, {row}plan, 0, {delta})
+        ON CONFLICT(day, plan) DO UPDATE SET expirations = expirations + ({delta});
+    """
+
+
+def daily_triggers(gate=lambda row: "") -> str:
+    return f"""
+    DROP TRIGGER IF EXISTS members_daily_insert;
+    DROP TRIGGER IF EXISTS members_daily_delete;
+    DROP TRIGGER IF EXISTS members_daily_update;
+
+    CREATE TRIGGER members_daily_insert
+    AFTER INSERT ON members
+    {gate("NEW")}
+    BEGIN
+        {_daily("NEW.", 1)}
+    END;
+
+    CREATE TRIGGER members_daily_delete
+    AFTER DELETE ON members
+    {gate("OLD")}
+    BEGIN
+        {_daily("OLD.", -1)}
+    END;
+
+    CREATE TRIGGER members_daily_update
+    AFTER UPDATE OF plan, joined_on, expiry_date ON members
+    {gate("NEW")}
+    BEGIN
+        {_daily("OLD.", -1)}
+        {_daily("NEW.", 1)}
+    END;
+    """
+
+
+def rebuild_daily(conn):
+    """
+    STORY:
+    Count the daily rollup again from scratch.
+    Used by `python reconcile.py --repair`.
+    """
+    conn.execute("DELETE FROM member_daily")
+    conn.execute("""
+        INSERT INTO member_daily (day, plan, joins, expirations)
+        SELECT day, plan, SUM(joins), SUM(expirations) FROM (
+            SELECT joined_on AS day, plan, 1 AS joins, 0 AS expirations FROM members
+            UNION ALL
+            SELECT expiry_date, plan, 0, 1 FROM members
+        )
+        GROUP BY day, plan
+    """)
+
+
+@migration(7, "daily membership rollup")
+def daily_rollup(db, label):
+    """
+    STORY:
+    One row per (day, plan):
+
+    member_daily → day | plan | joins | expirations
+
+    A member is active on day D while
+    joined_on <= D < expiry_date, so
+
+        active(D) = all joins up to D − all expirations up to D
+
+    and a year of history is ~365 rows per plan instead
+    of replaying every member for every day.
+
+    The backfill below is the history job: it walks the
+    existing register in batches.
+    """
+    gated_backfill(
+        db, "daily", label, "member_daily",
+        setup_sql="""
+        CREATE TABLE IF NOT EXISTS member_daily (
+            day TEXT NOT NULL,
+            plan TEXT NOT NULL,
+            joins INTEGER NOT NULL,
+            expirations INTEGER NOT NULL,
+            PRIMARY KEY (day, plan)
+        ) WITHOUT ROWID;
+        """,
+        batch_sql="""
+        INSERT INTO member_daily (day, plan, joins, expirations)
+        SELECT joined_on, plan, COUNT(*), 0 FROM members
+        WHERE id > :low AND id <= :high GROUP BY joined_on, plan
+        ON CONFLICT(day, plan) DO UPDATE SET joins = joins + excluded.joins;
+
+        INSERT INTO member_daily (day, plan, joins, expirations)
+        SELECT expiry_date, plan, 0, COUNT(*) FROM members
+        WHERE id > :low AND id <= :high GROUP BY expiry_date, plan
+        ON CONFLICT(day, plan) DO UPDATE SET expirations = expirations + excluded.expirations;
+        """,
+        triggers=daily_triggers,
+    )
+
+
+@migration(8, "member change log")
+def change_log(db, label):
+    """
+    STORY:
+    member_changes → seq | member_id | op
+
+    Every INSERT / UPDATE / DELETE of a member adds one
+    line. Whoever keeps a copy of the members (the
+    analytics snapshot in snapshot.py) remembers the last
+    seq it has seen and only re-reads the members that
+    changed after it.
+    """
+    with db.transaction():
+        db.script("""
+        CREATE TABLE IF NOT EXISTS member_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            member_id INTEGER NOT NULL,
+            op TEXT NOT NULL
+        );
+
+        CREATE TRIGGER IF NOT EXISTS members_change_insert
+        AFTER INSERT ON members
+        BEGIN
+            INSERT INTO member_changes (member_id, op) VALUES (NEW.id, 'insert');
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS members_change_update
+        AFTER UPDATE ON members
+        BEGIN
+            INSERT INTO member_changes (member_id, op) VALUES (NEW.id, 'update');
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS members_change_delete
+        AFTER DELETE ON members
+        BEGIN
+            INSERT INTO member_changes (member_id, op) VALUES (OLD.id, 'delete');
+        END;
+        """)
+
+
+@migration(9, "change log timestamps")
+def change_log_compaction(db, label):
+    """
+    STORY:
+    member_changes grows with every write, so old lines
+    are thrown away (repository.compact_changes):
+
+    - changed_at        → unix time of each line, to know
+                          which ones are old
+    - change_log_state  → compacted_through = the highest
+                          seq already thrown away
+
+    A reader who last saw a seq below compacted_through
+    has missed lines for good and must reload everything.
+    Lines written before this migration have no
+    changed_at and go first.
+    """
+    with db.transaction():
+        if "changed_at" not in db.columns("member_changes"):
+            db.script("ALTER TABLE member_changes ADD COLUMN changed_at INTEGER")
+
+        db.script("""
+        CREATE TABLE IF NOT EXISTS change_log_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            compacted_through INTEGER NOT NULL
+        );
+
+        INSERT OR IGNORE INTO change_log_state (id, compacted_through) VALUES (1, 0);
+
+        DROP TRIGGER IF EXISTS members_change_insert;
+        DROP TRIGGER IF EXISTS members_change_update;
+        DROP TRIGGER IF EXISTS members_change_delete;
+
+        CREATE TRIGGER members_change_insert
+        AFTER INSERT ON members
+        BEGIN
+            INSERT INTO member_changes (member_id, op, changed_at)
+            VALUES (NEW.id, 'insert', CAST(strftime('%s', 'now') AS INTEGER));
+        END;
+
+        CREATE TRIGGER members_change_update
+        AFTER UPDATE ON members
+        BEGIN
+            INSERT INTO member_changes (member_id, op, changed_at)
+            VALUES (NEW.id, 'update', CAST(strftime('%s', 'now') AS INTEGER));
+        END;
+
+        CREATE TRIGGER members_change_delete
+        AFTER DELETE ON members
+        BEGIN
+            INSERT INTO member_changes (member_id, op, changed_at)
+            VALUES (OLD.id, 'delete', CAST(strftime('%s', 'now') AS INTEGER));
+        END;
+        """)
+
+
+@migration(10, "branch registry")
+def branch_registry(db, label):
+    """
+    STORY:
+    branches    → id | name | path
+    users.branch → the branch a user works for
+
+    Only the HOME database uses these (shards.py): it
+    lists every branch and where its database file is.
+    A NULL path, or a NULL users.branch, means the
+    default branch, whose members live in the home
+    database itself.
+    """
+    with db.transaction():
+        if "branch" not in db.columns("users"):
+            db.script("ALTER TABLE users ADD COLUMN branch TEXT")
+
+        db.script("""
+        CREATE TABLE IF NOT EXISTS branches (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            path TEXT
+        );
+        """)
+
+
+@migration(11, "member check-ins")
+def member_checkins(db, label):
+    """
+    STORY:
+    The turnstiles scan thousands of members an hour:
+
+    checkins       → scanned_at | member_id | door
+    checkin_hourly → hour | checkins   (kept by a trigger)
+
+    - The key starts with scanned_at (unix time): scans
+      arrive in time order, so every batch is appended
+      at the END of the table, and "scans of the last
+      90 minutes" is one short range read
+    - (scanned_at, member_id) is unique: a scanner that
+      sends the same batch twice changes nothing
+    - hour is LOCAL time ("2026-10-18 17:00"), the hours
+      the gym actually opens; a day of history is 24
+      rows however busy the door was
+    - No foreign key and no trigger on delete: old scans
+      can be archived while the hourly history stays
+    """
+    with db.transaction():
+        db.script("""
+        CREATE TABLE IF NOT EXISTS checkins (
+            scanned_at INTEGER NOT NULL,
+            member_id INTEGER NOT NULL,
+            door TEXT,
+            PRIMARY KEY (scanned_at, member_id)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS checkin_hourly (
+            hour TEXT PRIMARY KEY,
+            checkins INTEGER NOT NULL
+        ) WITHOUT ROWID;
+
+        DROP TRIGGER IF EXISTS checkins_hourly_insert;
+
+        CREATE TRIGGER checkins_hourly_insert
+        AFTER INSERT ON checkins
+        BEGIN
+            INSERT INTO checkin_hourly (hour, checkins)
+            VALUES (strftime('%Y-%m-%d %H:00', NEW.scanned_at, 'unixepoch', 'localtime'), 1)
+            ON CONFLICT(hour) DO UPDATE SET checkins = checkins + 1;
+        END;
+        """)
+
+
+@migration(12, "user roles")
+def user_roles(db, label):
+    """
+    STORY:
+    users.role → NULL (branch staff) or 'head_office'
+
+    Head office may see every branch (dashboard.py).
+    It used to be "whoever works for the default
+    branch", and anyone could sign up there. Now it is
+    given on purpose, to named users only:
+
+        python shards.py head-office <email>
+
+    Nobody gets it from this migration.
+    """
+    with db.transaction():
+        if "role" not in db.columns("users"):
+            db.script("ALTER TABLE users ADD COLUMN role TEXT")
+
+
+@migration(13, "prefix search indexes")
+def prefix_search_indexes(db, label):
+    """
+    STORY:
+    The search index (migration 5) finds a word
+    ANYWHERE in a name; a very common slice matches far
+    more members than get ranked. "Starts with" matches
+    are the ones the front desk wants, so search looks
+    them up directly (repository._search_members):
+
+    - names case-insensitively (LIKE is, too)
+    - phone numbers as typed
+
+    One index per transaction, as in migration 4.
+    """
+    for sql in (
+        "CREATE INDEX IF NOT EXISTS idx_members_name_nocase ON members (name COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_members_phone ON members (phone)",
+    ):
+        with db.transaction():
+            db.conn.execute(sql)
+
+
+# --------------------------------------------------
+# CLI
+# --------------------------------------------------
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    parser = argparse.ArgumentParser(description="Bring the gym databases up to date")
+    parser.add_argument("command", nargs="?", choices=["migrate", "status"], default="migrate")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="rows per backfill transaction")
+    parser.add_argument("--branch", help="a branch id, or all (default: the home database)")
+    args = parser.parse_args()
+
+    path = os.environ.get("GYM_DB_PATH", "gym.db")
+    migrating = args.command == "migrate"
+
+    if migrating:
+        migrate(path, batch_size=args.batch_size)
+
+    targets = [(None, path)]
+    if args.branch:
+        os.environ["GYM_AUTO_MIGRATE"] = "0"  # each file is migrated below, with our options
+        from shards import registry
+
+        try:
+            shards = registry.all() if args.branch == "all" else [registry.get(args.branch)]
+        except sqlite3.OperationalError:
+            sys.exit("the home database has no branch registry yet: migrate it first")
+        if None in shards:
+            sys.exit(f"unknown branch {args.branch}")
+
+        targets = [(shard.branch, shard.path) for shard in shards]
+
+    for branch, db_path in targets:
+        if branch is not None:
+            print(f"== {branch} ({db_path})")
+        if migrating and db_path != path:
+            migrate(db_path, batch_size=args.batch_size)
+
+        versions = status(db_path)
+        for version, name, applied_at in versions:
+            mark = f"✅ {applied_at}" if applied_at else "⏳ pending"
+            print(f"{version:04d} {name:<28} {mark}")
+
+        current = max((version for version, _, applied_at in versions if applied_at), default=0)
+        print(f"schema version {current} / {latest_version()}")
@@ -0,0 +1,55 @@
+# --------------------------------------------------
+# plans.py 🗓️
+# --------------------------------------------------
+#
+# STORY:
+# This file is the PRICE BOARD of the gym.
+#
+# It knows how long each membership plan lasts,
+# and therefore WHEN a membership runs out.
+#
+# Both the API (members.py, dashboard.py) and the
+# storage room (repository.py) read this board, so
+# the rule lives in exactly ONE place.
+# --------------------------------------------------
+
+from datetime import datetime, timedelta
+
+PLAN_DAYS = {
+    "Monthly": 30,
+    "Quarterly": 90,
+    "Yearly": 365,
+}
+
+# Unknown plans have always been treated as Yearly
+DEFAULT_DAYS = PLAN_DAYS["Yearly"]
+
+
+def plan_days(plan: str) -> int:
+    return PLAN_DAYS.get(plan, DEFAULT_DAYS)
+
+
+# --------------------------------------------------
+# HELPER: Calculate expiry date based on plan
+# --------------------------------------------------
+def calculate_expiry(joined_on: str, plan: str) -> datetime:
+    joined_date = datetime.fromisoformat(joined_on)
+    return joined_date + timedelta(days=plan_days(plan))
+
+
+def expiry_date(joined_on: str, plan: str) -> str:
+    """
+    STORY:
+    Same as calculate_expiry(), but as the "YYYY-MM-DD"
+    text we store in members.expiry_date.
+    """
+    return calculate_expiry(joined_on, plan).date().isoformat()
+
+
+def expiry_modifier(plan: str) -> str:
+    """
+    STORY:
+    SQLite version of the same rule, for use as
+    date(joined_on, ?) inside SQL.
+    """
+    return f"+{plan_days(plan)} days"
@@ -0,0 +1,156 @@
+# --------------------------------------------------
+# reconcile.py 🧮
+# --------------------------------------------------
+#
+# STORY:
+# The dashboard trusts the tally sheets kept by the
+# triggers in database.py.
+#
+# This little command is the AUDITOR:
+# - It counts every member again, the slow way,
+#   using plans.calculate_expiry()
+# - It compares the result with the stored
+#   members.expiry_date, the tally sheets and the
+#   daily rollup
+# - With --repair it fixes expiry dates and
+#   rebuilds the tally sheets
+#
+# Usage:
+#   python reconcile.py                   → check only
+#   python reconcile.py --repair          → check + rebuild
+#   python reconcile.py --branch north    → a branch's own file
+#   python reconcile.py --branch all      → every branch
+#
+# Without --branch the home database is audited (the
+# default branch's members).
+#
+# Exit code 0 = tallies match, 1 = mismatch found.
+# --------------------------------------------------
+
+import argparse
+import sys
+from collections import Counter
+
+from database import connection, current_shard
+from migrations import expiry_sql, rebuild_aggregates, rebuild_daily
+from plans import calculate_expiry
+
+
+def recompute(conn):
+    plans = Counter()
+    expiries = Counter()
+    daily = Counter()
+    wrong_expiry = []
+
+    rows = conn.execute("SELECT id, plan, joined_on, expiry_date FROM members")
+
+    for member_id, plan, joined_on, stored_expiry in rows:
+        expiry = calculate_expiry(joined_on, plan).date().isoformat()
+
+        plans[plan] += 1
+        expiries[expiry] += 1
+        daily[(joined_on, plan, "joins")] += 1
+        daily[(expiry, plan, "expirations")] += 1
+
+        if stored_expiry != expiry:
+            wrong_expiry.append(member_id)
+
+    return plans, expiries, daily, wrong_expiry
+
+
+def stored(conn):
+    plans = Counter(dict(conn.execute(
+        "SELECT plan, members FROM member_plan_counts WHERE members != 0"
+    )))
+    expiries = Counter(dict(conn.execute(
+        "SELECT expiry_date, members FROM member_expiry_counts WHERE members != 0"
+    )))
+    daily = Counter()
+    for day, plan, joins, expirations in conn.execute(
+        "SELECT day, plan, joins, expirations FROM member_daily"
+    ):
+        daily[(day, plan, "joins")] += joins
+        daily[(day, plan, "expirations")] += expirations
+
+    return plans, expiries, Counter({key: count for key, count in daily.items() if count})
+
+
+def diff(name, expected, actual):
+    problems = []
+    for key in sorted(set(expected) | set(actual)):
+        if expected[key] != actual[key]:
+            problems.append(
+                f"{name}[{key}]: expected {expected[key]}, stored {actual[key]}"
+            )
+    return problems
+
+
+def reconcile(repair: bool = False):
+    with connection() as conn:
+        conn.execute("BEGIN")  # count and compare one consistent snapshot
+
+        expected_plans, expected_expiries, expected_daily, wrong_expiry = recompute(conn)
+        stored_plans, stored_expiries, stored_daily = stored(conn)
+
+        problems = [
+            f"member[{member_id}]: expiry_date does not match plan"
+            for member_id in wrong_expiry
+        ]
+        problems += (
+            diff("plan", expected_plans, stored_plans)
+            + diff("expiry", expected_expiries, stored_expiries)
+            + diff("daily", expected_daily, stored_daily)
+        )
+
+        if problems and repair:
+            conn.execute(
+                f"UPDATE members SET expiry_date = {expiry_sql()} "
+                f"WHERE expiry_date IS NOT {expiry_sql()}"
+            )
+            rebuild_aggregates(conn)
+            rebuild_daily(conn)
+
+    return problems
+
+
+def report(problems, repair: bool, where: str = ""):
+    for line in problems:
+        print(f"{where}{line}")
+
+    if not problems:
+        print(f"{where}Dashboard tallies match the members table ✅")
+    elif repair:
+        print(f"{where}{len(problems)} mismatches found, tallies rebuilt 🔧")
+    else:
+        print(f"{where}{len(problems)} mismatches found ❌ (run with --repair)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check (and repair) the dashboard tallies")
+    parser.add_argument("--repair", action="store_true", help="fix expiry dates, rebuild tallies")
+    parser.add_argument("--branch", help="a branch id, or all (default: the home database)")
+    args = parser.parse_args()
+
+    if not args.branch:
+        problems = reconcile(args.repair)
+        report(problems, args.repair)
+        sys.exit(1 if problems and not args.repair else 0)
+
+    from shards import registry
+
+    shards = registry.all() if args.branch == "all" else [registry.get(args.branch)]
+    if None in shards:
+        sys.exit(f"unknown branch {args.branch}")
+
+    mismatched = False
+    for shard in shards:
+        token = current_shard.set(shard)  # connection() now opens this branch's file
+        try:
+            problems = reconcile(args.repair)
+        finally:
+            current_shard.reset(token)
+
+        report(problems, args.repair, f"[{shard.branch}] ")
+        mismatched = mismatched or bool(problems)
+
+    sys.exit(1 if mismatched and not args.repair else 0)
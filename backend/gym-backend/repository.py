@@ -0,0 +1,976 @@
+# --------------------------------------------------
+# repository.py 📚
+# --------------------------------------------------
+#
+# STORY:
+# This file is the LIBRARIAN of the storage room.
+#
+# Routes never open the database themselves.
+# They ask the librarian:
+#   "Bring me all members"
+#   "Add this member"
+#
+# and simply WAIT (await) for the answer.
+#
+# SQLite itself is blocking, so the librarian does the
+# actual work on its OWN team of helper threads
+# (the DB executor). That team is separate from the
+# generic FastAPI threadpool, so a slow query never
+# steals a thread from health checks or token checks.
+#
+# This file:
+# ✅ Holds every SQL statement the routes need
+# ✅ Exposes async functions routes can await
+# ❌ Does NOT know about HTTP or tokens
+# --------------------------------------------------
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import group_commit
+from database import (
+    connection, current_branch, current_pool, export_connection, read_connection,
+    pool as home_pool, POOL_SIZE, READ_POOL_SIZE,
+)
+from plans import expiry_date, expiry_modifier
+
+# --------------------------------------------------
+# STEP 1️⃣: The DB executors
+# --------------------------------------------------
+#
+# STORY:
+# One helper thread per pooled connection is enough:
+# more threads would only queue up waiting for a
+# connection anyway.
+#
+# Read-only work (dashboard, export) has its OWN team
+# and its own read-only connections (database.py):
+# a long report can never keep a front-desk write
+# waiting for a thread or a connection.
+#
+#   run(fn)       → may write  → connection()
+#   run_read(fn)  → only reads → read_connection()
+#
+# GYM_DB_WORKERS      → number of helper threads
+# GYM_DB_READ_WORKERS → number of read-only helper threads
+#
+DB_WORKERS = int(os.environ.get("GYM_DB_WORKERS", str(POOL_SIZE)))
+DB_READ_WORKERS = int(os.environ.get("GYM_DB_READ_WORKERS", str(READ_POOL_SIZE)))
+
+executor = ThreadPoolExecutor(
+    max_workers=DB_WORKERS,
+    thread_name_prefix="gym-db",
+)
+read_executor = ThreadPoolExecutor(
+    max_workers=DB_READ_WORKERS,
+    thread_name_prefix="gym-db-read",
+)
+
+
+# Calls handed to each executor and not finished yet
+# (running + waiting). Only touched from the event loop.
+in_flight = {"write": 0, "read": 0}
+
+
+async def _run_on(kind: str, pool_executor, fn, *args):
+    loop = asyncio.get_running_loop()
+
+    in_flight[kind] += 1
+    try:
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(pool_executor, context.run, fn, *args)
+    finally:
+        in_flight[kind] -= 1
+
+
+async def run(fn, *args):
+    """
+    STORY:
+    Hand a blocking function to the helper team
+    and wait for it without blocking the event loop.
+
+    The caller's context travels along, so the SQL
+    profiler counts the queries against the right request
+    (and the right branch is used, see database.py).
+    """
+    return await _run_on("write", executor, fn, *args)
+
+
+async def run_read(fn, *args):
+    """Same as run(), on the read-only team."""
+    return await _run_on("read", read_executor, fn, *args)
+
+
+def executor_stats(kind: str = "write") -> dict:
+    workers = DB_WORKERS if kind == "write" else DB_READ_WORKERS
+    return {
+        "workers": workers,
+        "busy": min(in_flight[kind], workers),
+        "queued": max(0, in_flight[kind] - workers),
+    }
+
+
+# --------------------------------------------------
+# STEP 2️⃣: Members
+# --------------------------------------------------
+MEMBER_COLUMNS = ("id", "name", "phone", "plan", "joined_on", "expiry_date")
+
+# Columns GET /members may sort by.
+# Every one of them is indexed (see database.py), and SQLite
+# indexes always end with the row id, so (column, id) is
+# exactly the order the index is already stored in.
+SORT_COLUMNS = ("id", "name", "joined_on", "expiry_date")
+
+
+def member_dict(row) -> dict:
+    return dict(zip(MEMBER_COLUMNS, row))
+
+
+def _list_members(
+    limit: int,
+    after=None,
+    sort: str = "id",
+    descending: bool = False,
+    plan: str = None,
+    joined_from: str = None,
+    joined_to: str = None,
+    status: str = None,
+    today: str = None,
+):
+    """
+    STORY:
+    Keyset pagination 📑
+
+    Instead of OFFSET (which re-reads every skipped row),
+    we remember WHERE the last page ended:
+
+        after = (last sort value, last id)
+
+    and ask only for rows that come after it.
+    Page 1000 costs the same as page 1.
+
+    Returns limit + 1 rows so the caller can tell
+    whether another page exists.
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"cannot sort by {sort}")
+
+    where = []
+    params = []
+
+    if plan:
+        where.append("plan = ?")
+        params.append(plan)
+
+    if joined_from:
+        where.append("joined_on >= ?")
+        params.append(joined_from)
+
+    if joined_to:
+        where.append("joined_on <= ?")
+        params.append(joined_to)
+
+    if status == "active":
+        where.append("expiry_date > ?")
+        params.append(today)
+    elif status == "expired":
+        where.append("expiry_date <= ?")
+        params.append(today)
+
+    direction = "DESC" if descending else "ASC"
+    compare = "<" if descending else ">"
+
+    if after is not None:
+        if sort == "id":
+            where.append(f"id {compare} ?")
+            params.append(after[1])
+        else:
+            where.append(f"({sort}, id) {compare} (?, ?)")
+            params.extend(after)
+
+    order = "id" if sort == "id" else f"{sort} {direction}, id"
+
+    sql = f"SELECT {', '.join(MEMBER_COLUMNS)} FROM members"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order} {direction} LIMIT ?"
+    params.append(limit + 1)
+
+    with connection() as conn:
+        return [member_dict(row) for row in conn.execute(sql, params)]
+
+
+def _add_member(conn, name: str, phone: str, plan: str):
+    joined_on = date.today().isoformat()
+
+    row = conn.execute(
+        f"""
+        INSERT INTO members (name, phone, plan, joined_on, expiry_date)
+        VALUES (?, ?, ?, ?, ?)
+        RETURNING {', '.join(MEMBER_COLUMNS)}
+        """,
+        (name, phone, plan, joined_on, expiry_date(joined_on, plan))
+    ).fetchone()
+    return member_dict(row)
+
+
+def _insert_members(rows):
+    """
+    STORY:
+    Many members, ONE transaction, ONE commit (one fsync).
+    rows = [(name, phone, plan, joined_on, expiry_date), ...]
+    """
+    with connection() as conn:
+        conn.executemany(
+            """
+            INSERT INTO members (name, phone, plan, joined_on, expiry_date)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            rows
+        )
+    return len(rows)
+
+
+def _update_member(conn, member_id: int, name: str, phone: str, plan: str):
+    row = conn.execute(
+        f"""
+        UPDATE members
+        SET name = ?, phone = ?, plan = ?,
+            expiry_date = date(joined_on, ?)
+        WHERE id = ?
+        RETURNING {', '.join(MEMBER_COLUMNS)}
+        """,
+        (name, phone, plan, expiry_modifier(plan), member_id)
+    ).fetchone()
+    return member_dict(row) if row else None
+
+
+def _delete_member(conn, member_id: int):
+    return conn.execute("DELETE FROM members WHERE id = ?", (member_id,)).rowcount > 0
+
+
+def _in_transaction(fn, *args):
+    with connection() as conn:
+        return fn(conn, *args)
+
+
+async def write(fn, *args):
+    """
+    STORY:
+    Single-member writes go through here.
+
+    - Group commit on  → queue it for the writer thread,
+                         shared commit (group_commit.py)
+    - Group commit off → own transaction, own commit
+
+    Either way the answer only comes back once the
+    change is committed.
+    """
+    schedule_compaction()
+
+    writer = group_commit.writer_for(current_pool())
+    if writer is not None:
+        return await asyncio.wrap_future(writer.submit(fn, *args))
+
+    return await run(_in_transaction, fn, *args)
+
+
+async def list_members(limit: int, **filters):
+    return await run(functools.partial(_list_members, limit, **filters))
+
+
+async def add_member(name: str, phone: str, plan: str):
+    return await write(_add_member, name, phone, plan)
+
+
+async def insert_members(rows):
+    schedule_compaction()
+    return await run(_insert_members, rows)
+
+
+async def update_member(member_id: int, name: str, phone: str, plan: str):
+    return await write(_update_member, member_id, name, phone, plan)
+
+
+async def delete_member(member_id: int):
+    return await write(_delete_member, member_id)
+
+
+# A very common name can match tens of thousands of members.
+# Ranking all of them costs far more than the front desk needs,
+# so only the first SEARCH_CANDIDATES matches are ranked.
+# "Starts with" matches are looked up on their own, through an
+# index, so they are never among the ones left out.
+SEARCH_CANDIDATES = 500
+
+
+def like_escape(text: str) -> str:
+    """% and _ typed at the front desk are letters, not wildcards."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def prefix_range(text: str) -> tuple:
+    """
+    Every text that starts with `text` sorts in [low, high):
+    "pat" → ("pat", "pau"). An index finds that range
+    without reading anything else.
+    """
+    return text, text[:-1] + chr(ord(text[-1]) + 1)
+
+
+def _search_members(words, short_words, query: str, limit: int):
+    """
+    STORY:
+    words       → slices of 3+ letters, looked up in members_fts
+    short_words → 1-2 letter slices, too short for the trigram
+                  index, checked on the rows that already matched
+    query       → the whole search text
+
+    Ranking:
+    1. name/phone STARTS WITH the query, alphabetically
+       (idx_members_name_nocase / idx_members_phone)
+    2. the other matches: shortest name + phone first
+       (the closest fit), then member id
+
+    Every candidate contains every word, so FTS5's
+    bm25() would rank them by length too, but it first
+    counts ALL rows matching each word: ~17 ms for a
+    common surname at 1M members, against ~1 ms for
+    the candidates themselves.
+    """
+    prefix = like_escape(query) + "%"
+    name_low, name_high = prefix_range(query.lower())  # names: COLLATE NOCASE
+    phone_low, phone_high = prefix_range(query)
+
+    columns = ", ".join(MEMBER_COLUMNS)
+    member_columns = ", ".join(f"m.{column}" for column in MEMBER_COLUMNS)
+
+    with connection() as conn:
+        # Step 1: "starts with" matches (they contain every word)
+        rows = conn.execute(
+            f"""
+            SELECT {columns}
+            FROM members
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id FROM members
+                    WHERE name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE
+                      AND name LIKE ? ESCAPE '\\'
+                    ORDER BY name COLLATE NOCASE, id
+                    LIMIT ?
+                )
+                UNION
+                SELECT id FROM (
+                    SELECT id FROM members
+                    WHERE phone >= ? AND phone < ? AND phone LIKE ? ESCAPE '\\'
+                    ORDER BY phone, id
+                    LIMIT ?
+                )
+            )
+            ORDER BY name COLLATE NOCASE, id
+            LIMIT ?
+            """,
+            [name_low, name_high, prefix, limit,
+             phone_low, phone_high, prefix, limit, limit]
+        ).fetchall()
+
+        if len(rows) == limit:
+            return [member_dict(row) for row in rows]
+
+        # Step 2: the rest, closest fit first
+        match = " AND ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+        where = ["members_fts MATCH ?"]
+        params = [match]
+
+        for word in short_words:
+            where.append("(m.name LIKE ? ESCAPE '\\' OR m.phone LIKE ? ESCAPE '\\')")
+            params += [f"%{like_escape(word)}%"] * 2
+
+        if rows:
+            where.append(f"m.id NOT IN ({', '.join('?' * len(rows))})")
+            params += [row[0] for row in rows]
+
+        params += [SEARCH_CANDIDATES, limit - len(rows)]
+
+        rows += conn.execute(
+            f"""
+            SELECT {columns}
+            FROM (
+                SELECT {member_columns}
+                FROM members_fts
+                JOIN members AS m ON m.id = members_fts.rowid
+                WHERE {" AND ".join(where)}
+                LIMIT ?
+            )
+            ORDER BY length(name) + length(phone), id
+            LIMIT ?
+            """,
+            params
+        ).fetchall()
+
+    return [member_dict(row) for row in rows]
+
+
+async def search_members(words, short_words, query: str, limit: int):
+    return await run(_search_members, words, short_words, query, limit)
+
+
+# Exports running at once (per process). Each holds its
+# own connection (database.export_connection) for as
+# long as the download lasts, so they are capped.
+#
+# GYM_EXPORT_LIMIT → exports allowed at the same time
+#
+EXPORT_LIMIT = int(os.environ.get("GYM_EXPORT_LIMIT", "2"))
+
+active_exports = 0  # only touched from the event loop
+
+
+def start_export() -> bool:
+    """True → go ahead (call end_export() when done)."""
+    global active_exports
+
+    if active_exports >= EXPORT_LIMIT:
+        return False
+
+    active_exports += 1
+    return True
+
+
+def end_export():
+    global active_exports
+    active_exports -= 1
+
+
+async def stream_members(chunk_size: int = 1000):
+    """
+    STORY:
+    The ACCOUNTANT wants the whole register 📒
+
+    Instead of copying every member into one huge list,
+    we keep one connection open and hand rows out in
+    small batches (fetchmany). Memory stays the same
+    whether the gym has 100 or 1,000,000 members.
+
+    Every fetch runs on the read-only team with a
+    read-only connection of the export's own: the event
+    loop is never blocked, and however long the export
+    takes, neither writers nor dashboard reads wait for
+    it. The one SELECT reads one snapshot, so the export
+    never shows half a write.
+    """
+    borrowed = export_connection()
+    conn = await run_read(borrowed.__enter__)
+
+    try:
+        cur = await run_read(
+            conn.execute,
+            f"SELECT {', '.join(MEMBER_COLUMNS)} FROM members ORDER BY id"
+        )
+
+        while True:
+            rows = await run_read(cur.fetchmany, chunk_size)
+            if not rows:
+                break
+            yield rows
+
+    finally:
+        await run_read(borrowed.__exit__, None, None, None)
+
+
+def _data_version():
+    with read_connection() as conn:
+        return conn.execute(
+            "SELECT version FROM data_version WHERE id = 1"
+        ).fetchone()[0]
+
+
+async def data_version():
+    return await run_read(_data_version)
+
+
+# --------------------------------------------------
+# STEP 2️⃣🔁: Change log (delta sync)
+# --------------------------------------------------
+#
+# STORY:
+# member_changes (migrations.py) gets one line, with a
+# growing seq, in the SAME transaction as every member
+# write.
+#
+# A client remembers the last seq it has seen and asks
+# only for what happened after it: the current version
+# of each member changed since, or "deleted".
+#
+# Old lines are thrown away (compaction):
+# - lines older than CHANGE_LOG_RETENTION_HOURS
+# - beyond the newest CHANGE_LOG_MAX_ROWS lines
+# A client whose seq is older than that gets
+# "reset": it reloads the list once, then syncs again.
+#
+# GYM_CHANGE_LOG_RETENTION_HOURS → keep lines this long
+# GYM_CHANGE_LOG_MAX_ROWS        → keep at most this many
+# GYM_CHANGE_LOG_COMPACT_EVERY   → seconds between automatic
+#                                  compactions (0 = never)
+#
+CHANGE_LOG_RETENTION_HOURS = float(os.environ.get("GYM_CHANGE_LOG_RETENTION_HOURS", "168"))
+CHANGE_LOG_MAX_ROWS = int(os.environ.get("GYM_CHANGE_LOG_MAX_ROWS", "1000000"))
+CHANGE_LOG_COMPACT_EVERY = float(os.environ.get("GYM_CHANGE_LOG_COMPACT_EVERY", "600"))
+COMPACT_BATCH = 10_000
+
+log = logging.getLogger("gym.repository")
+
+
+def change_log_head(conn):
+    """
+    (head, compacted_through)
+
+    head is the newest seq handed out; the log may be
+    empty after a compaction, so the marker counts too.
+    """
+    return conn.execute(
+        "SELECT MAX(compacted_through, "
+        "           (SELECT COALESCE(MAX(seq), 0) FROM member_changes)), "
+        "       compacted_through "
+        "FROM change_log_state WHERE id = 1"
+    ).fetchone()
+
+
+def _changes_since(since, limit: int) -> dict:
+    with connection() as conn:
+        conn.execute("BEGIN")  # log + members from one snapshot
+
+        head, compacted = change_log_head(conn)
+        answer = {"changes": [], "next_since": head, "has_more": False, "reset": False}
+
+        if since is None:
+            return answer  # "where is the log now?"
+
+        if since < compacted or since > head:
+            answer["reset"] = True  # lines were thrown away (or a foreign seq)
+            return answer
+
+        rows = conn.execute(
+            "SELECT seq, member_id FROM member_changes WHERE seq > ? ORDER BY seq LIMIT ?",
+            (since, limit + 1)
+        ).fetchall()
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            answer["has_more"] = True
+
+        if not rows:
+            answer["next_since"] = since
+            return answer
+
+        # A member changed five times is sent once,
+        # at the position of its last change
+        last_seq = {}
+        for seq, member_id in rows:
+            last_seq.pop(member_id, None)
+            last_seq[member_id] = seq
+
+        high = rows[-1][0]
+        current = {
+            row[0]: member_dict(row)
+            for row in conn.execute(
+                f"SELECT {', '.join(MEMBER_COLUMNS)} FROM members WHERE id IN "
+                "(SELECT member_id FROM member_changes WHERE seq > ? AND seq <= ?)",
+                (since, high)
+            )
+        }
+
+        for member_id, seq in last_seq.items():
+            member = current.get(member_id)
+            if member is None:
+                answer["changes"].append({"seq": seq, "op": "delete", "id": member_id})
+            else:
+                answer["changes"].append({"seq": seq, "op": "upsert", "member": member})
+
+        answer["next_since"] = high
+        return answer
+
+
+def _compact_changes(
+    retention_hours: float = CHANGE_LOG_RETENTION_HOURS,
+    max_rows: int = CHANGE_LOG_MAX_ROWS,
+    batch_size: int = COMPACT_BATCH,
+) -> int:
+    """
+    STORY:
+    Throw away old change log lines, oldest first,
+    batch_size lines per short transaction (writers can
+    slip in between). Returns how many were removed.
+    """
+    cutoff = int(time.time() - retention_hours * 3600)
+    removed = 0
+
+    while True:
+        with connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+
+            head, compacted = change_log_head(conn)
+
+            # changed_at grows with seq, so the lines to drop
+            # are the start of the log
+            high = conn.execute(
+                """
+                SELECT MAX(seq) FROM (
+                    SELECT seq, changed_at FROM member_changes
+                    WHERE seq > ? ORDER BY seq LIMIT ?
+                )
+                WHERE changed_at IS NULL OR changed_at < ? OR seq <= ?
+                """,
+                (compacted, batch_size, cutoff, head - max_rows)
+            ).fetchone()[0]
+
+            if high is None:
+                return removed
+
+            deleted = conn.execute(
+                "DELETE FROM member_changes WHERE seq > ? AND seq <= ?", (compacted, high)
+            ).rowcount
+            conn.execute(
+                "UPDATE change_log_state SET compacted_through = ? WHERE id = 1", (high,)
+            )
+            # Cached /members/changes answers may now be wrong
+            conn.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+
+        removed += deleted
+        if deleted < batch_size:
+            return removed
+
+
+async def changes_since(since, limit: int) -> dict:
+    return await run(_changes_since, since, limit)
+
+
+async def compact_changes(**policy) -> int:
+    return await run(functools.partial(_compact_changes, **policy))
+
+
+# Only touched from the event loop
+_last_compaction = {}  # branch → monotonic time
+_compaction_tasks = set()
+
+
+def schedule_compaction():
+    """
+    STORY:
+    Called on every member write: at most once every
+    CHANGE_LOG_COMPACT_EVERY seconds per branch it
+    starts a compaction in the background (the write
+    never waits for it).
+    """
+    if CHANGE_LOG_COMPACT_EVERY <= 0:
+        return
+
+    branch = current_branch()
+    now = time.monotonic()
+    last = _last_compaction.get(branch)
+    if last is not None and now - last < CHANGE_LOG_COMPACT_EVERY:
+        return
+
+    _last_compaction[branch] = now
+    task = asyncio.ensure_future(_compact_in_background())
+    _compaction_tasks.add(task)
+    task.add_done_callback(_compaction_tasks.discard)
+
+
+async def wait_for_compactions():
+    """Let compactions already running finish (server shutdown)."""
+    await asyncio.gather(*list(_compaction_tasks), return_exceptions=True)
+
+
+async def _compact_in_background():
+    try:
+        removed = await compact_changes()
+    except Exception as error:
+        log.warning("change log compaction failed: %s", error)
+        return
+
+    if removed:
+        log.info("change log compaction removed %d lines", removed)
+
+
+# --------------------------------------------------
+# STEP 3️⃣: Dashboard reads
+# --------------------------------------------------
+#
+# All on the read-only side (STEP 1️⃣): the reads in
+# one transaction see one snapshot, and never hold
+# up a writer.
+#
+def _dashboard_counts(today: str):
+    """
+    STORY:
+    Read the tally sheets kept by the triggers in database.py.
+    Only plan rows + expiry days after today are touched,
+    never the members table itself.
+    """
+    with read_connection() as conn:
+        conn.execute("BEGIN")  # both reads see the same snapshot
+
+        plans = conn.execute(
+            "SELECT plan, members FROM member_plan_counts"
+        ).fetchall()
+
+        active = conn.execute(
+            """
+            SELECT COALESCE(SUM(members), 0)
+            FROM member_expiry_counts
+            WHERE expiry_date > ?
+            """,
+            (today,)
+        ).fetchone()[0]
+
+    return plans, active
+
+
+def _expiring_between(first_day: str, last_day: str, limit: int):
+    with read_connection() as conn:
+        return conn.execute(
+            """
+            SELECT id, name, plan, expiry_date
+            FROM members
+            WHERE expiry_date BETWEEN ? AND ?
+            ORDER BY expiry_date, id
+            LIMIT ?
+            """,
+            (first_day, last_day, limit)
+        ).fetchall()
+
+
+def _expired_by(last_day: str, limit: int):
+    with read_connection() as conn:
+        return conn.execute(
+            """
+            SELECT id, name, plan, expiry_date
+            FROM members
+            WHERE expiry_date <= ?
+            ORDER BY expiry_date DESC, id
+            LIMIT ?
+            """,
+            (last_day, limit)
+        ).fetchall()
+
+
+def _daily_rollup(first_day: str, last_day: str):
+    """
+    STORY:
+    Read the daily rollup (member_daily, kept by triggers):
+
+    - before → per plan, everyone who joined minus everyone
+               who expired BEFORE first_day (the starting
+               number of active members)
+    - days   → the (day, plan, joins, expirations) rows
+               inside the range
+    """
+    with read_connection() as conn:
+        conn.execute("BEGIN")  # both reads see the same snapshot
+
+        before = conn.execute(
+            """
+            SELECT plan, SUM(joins) - SUM(expirations)
+            FROM member_daily
+            WHERE day < ?
+            GROUP BY plan
+            """,
+            (first_day,)
+        ).fetchall()
+
+        days = conn.execute(
+            """
+            SELECT day, plan, joins, expirations
+            FROM member_daily
+            WHERE day BETWEEN ? AND ?
+            ORDER BY day
+            """,
+            (first_day, last_day)
+        ).fetchall()
+
+    return before, days
+
+
+async def dashboard_counts(today: str):
+    return await run_read(_dashboard_counts, today)
+
+
+async def expiring_between(first_day: str, last_day: str, limit: int):
+    return await run_read(_expiring_between, first_day, last_day, limit)
+
+
+async def expired_by(last_day: str, limit: int):
+    return await run_read(_expired_by, last_day, limit)
+
+
+async def daily_rollup(first_day: str, last_day: str):
+    return await run_read(_daily_rollup, first_day, last_day)
+
+
+# --------------------------------------------------
+# STEP 4️⃣: Users (login desk)
+# --------------------------------------------------
+#
+# Users of EVERY branch live in the home database
+# (shards.py), whatever branch the request is on.
+#
+def _find_user(email: str):
+    with home_pool.connection() as conn:
+        return conn.execute(
+            "SELECT name, email, password, branch, role FROM users WHERE email = ?",
+            (email,)
+        ).fetchone()
+
+
+def _add_user(name: str, email: str, password_hash: str, branch: str, role: str = None):
+    with home_pool.connection() as conn:
+        conn.execute(
+            "INSERT INTO users (name, email, password, branch, role) VALUES (?, ?, ?, ?, ?)",
+            (name, email, password_hash, branch, role)
+        )
+
+
+def set_user_role(email: str, role: str) -> bool:
+    """Blocking (CLI): give a user a role, None = plain staff."""
+    with home_pool.connection() as conn:
+        return conn.execute(
+            "UPDATE users SET role = ? WHERE email = ?", (role, email)
+        ).rowcount > 0
+
+
+def _replace_password_hash(email: str, old_hash: str, new_hash: str):
+    # Only if nobody changed it in between
+    with home_pool.connection() as conn:
+        conn.execute(
+            "UPDATE users SET password = ? WHERE email = ? AND password = ?",
+            (new_hash, email, old_hash)
+        )
+
+
+async def find_user(email: str):
+    return await run(_find_user, email)
+
+
+async def add_user(name: str, email: str, password_hash: str, branch: str, role: str = None):
+    return await run(_add_user, name, email, password_hash, branch, role)
+
+
+async def replace_password_hash(email: str, old_hash: str, new_hash: str):
+    return await run(_replace_password_hash, email, old_hash, new_hash)
+
+
+# --------------------------------------------------
+# STEP 5️⃣: Check-ins (turnstiles)
+# --------------------------------------------------
+#
+# STORY:
+# A door scanner sends its scans in BATCHES. One batch
+# is one trip to the librarian and ONE transaction:
+#
+# 1️⃣ Every member in the batch is looked up AT ONCE
+#    (id IN (...)), never one lookup per scan
+# 2️⃣ A scan counts when the membership is active on
+#    the day of the scan: joined_on <= day < expiry_date
+#    (the same rule as the dashboard, see plans.py)
+# 3️⃣ The scans that count are appended with one
+#    executemany; a scan sent twice is skipped
+#
+# SQLite accepts 999 "?" per statement on old builds,
+# so a huge batch is looked up in slices of that size.
+#
+MAX_SQL_VARIABLES = 999
+
+
+def _memberships(conn, member_ids: list) -> dict:
+    """{member_id: (joined_on, expiry_date)} for the members that exist."""
+    found = {}
+
+    for start in range(0, len(member_ids), MAX_SQL_VARIABLES):
+        chunk = member_ids[start:start + MAX_SQL_VARIABLES]
+        rows = conn.execute(
+            "SELECT id, joined_on, expiry_date FROM members "
+            f"WHERE id IN ({', '.join('?' * len(chunk))})",
+            chunk
+        )
+        found.update((member_id, (joined_on, expiry)) for member_id, joined_on, expiry in rows)
+
+    return found
+
+
+def _record_checkins(scans):
+    """
+    scans = [(member_id, scanned_at, door), ...]
+    Returns (accepted, duplicates, rejected) where
+    rejected = [(position in scans, reason), ...]
+    """
+    with connection() as conn:
+        memberships = _memberships(conn, sorted({scan[0] for scan in scans}))
+
+        rows = []
+        rejected = []
+
+        for position, (member_id, scanned_at, door) in enumerate(scans):
+            membership = memberships.get(member_id)
+            if membership is None:
+                rejected.append((position, "unknown member"))
+                continue
+
+            joined_on, expiry = membership
+            try:
+                day = date.fromtimestamp(scanned_at).isoformat()
+            except (ValueError, OverflowError, OSError):
+                rejected.append((position, "scanned_at out of range"))
+                continue
+
+            if day < joined_on:
+                rejected.append((position, "membership not started"))
+            elif day >= expiry:
+                rejected.append((position, "membership expired"))
+            else:
+                rows.append((scanned_at, member_id, door))
+
+        accepted = conn.executemany(
+            "INSERT OR IGNORE INTO checkins (scanned_at, member_id, door) VALUES (?, ?, ?)",
+            rows
+        ).rowcount if rows else 0
+
+    return accepted, len(rows) - accepted, rejected
+
+
+def _occupancy(inside_since: int, first_hour: str):
+    """
+    STORY:
+    - inside → members who came in after inside_since
+               (a short range read on the key)
+    - hours  → the hourly rollup from first_hour on
+    """
+    with read_connection() as conn:
+        conn.execute("BEGIN")  # both reads see the same snapshot
+
+        inside = conn.execute(
+            "SELECT COUNT(DISTINCT member_id) FROM checkins WHERE scanned_at > ?",
+            (inside_since,)
+        ).fetchone()[0]
+
+        hours = conn.execute(
+            "SELECT hour, checkins FROM checkin_hourly WHERE hour >= ? ORDER BY hour",
+            (first_hour,)
+        ).fetchall()
+
+    return inside, hours
+
+
+async def record_checkins(scans):
+    return await run(_record_checkins, scans)
+
+
+async def occupancy(inside_since: int, first_hour: str):
+    return await run_read(_occupancy, inside_since, first_hour)
@@ -0,0 +1,171 @@
+# --------------------------------------------------
+# response_cache.py 🧊
+# --------------------------------------------------
+#
+# STORY:
+# The member list and the dashboard are asked for
+# again and again, but they only CHANGE when a member
+# is written.
+#
+# database.py keeps a data_version number that goes up
+# on every member write. This file uses it twice:
+#
+# 1️⃣ ETag / 304
+#    Every answer carries an ETag built from
+#    (data version + route + query + today's date).
+#    A browser that already has that answer sends
+#    If-None-Match and gets "304 Not Modified" —
+#    no body, no query.
+#
+# 2️⃣ In-process cache
+#    The rendered JSON body is kept under that same
+#    ETag, so another client asking the same question
+#    before the next write skips the query too.
+#
+# This file:
+# ✅ Builds ETags and answers 304s
+# ✅ Keeps a small LRU of rendered responses
+# ❌ Does NOT know any SQL (asks repository.py)
+# --------------------------------------------------
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+import repository
+from database import current_branch
+
+RESPONSE_CACHE_SIZE = int(os.environ.get("GYM_RESPONSE_CACHE_SIZE", "512"))
+
+
+class ResponseCache:
+    def __init__(self, size: int = RESPONSE_CACHE_SIZE):
+        self.size = size
+
+        self._entries = OrderedDict()  # etag → body bytes
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, etag: str):
+        with self._lock:
+            body = self._entries.get(etag)
+
+            if body is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(etag)
+            self.hits += 1
+            return body
+
+    def put(self, etag: str, body: bytes):
+        with self._lock:
+            self._entries[etag] = body
+            self._entries.move_to_end(etag)
+
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def count_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
+
+
+response_cache = ResponseCache()
+
+
+def make_etag(version: int, request: Request) -> str:
+    """
+    STORY:
+    Same data version + same question (+ same day,
+    because "active" / "expired" depend on today,
+    + same branch, because every branch counts its
+    own versions) → same ETag.
+    """
+    question = json.dumps([
+        current_branch(),
+        request.url.path,
+        sorted(request.query_params.multi_items()),
+        date.today().isoformat(),
+    ])
+    digest = hashlib.sha1(question.encode("utf-8")).hexdigest()[:16]
+
+    return f'"v{version}-{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+
+    if header.strip() == "*":
+        return True
+
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+async def cached_json(request: Request, build, version=None):
+    """
+    STORY:
+    Wrap a read endpoint:
+
+        return await cached_json(request, lambda: build_answer())
+
+    build is an async function returning the JSON data.
+    It only runs when neither the client nor our cache
+    already holds the answer for the current data version.
+
+    version: async function giving the data version
+    (default: the current branch's data_version).
+    """
+
+    # Version is read BEFORE building: if a write sneaks in
+    # meanwhile, the newer data is filed under the older
+    # version, which nobody will ask for again.
+    version = await (version or repository.data_version)()
+    etag = make_etag(version, request)
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",  # browser must re-check with us
+    }
+
+    if etag_matches(request, etag):
+        response_cache.count_not_modified()
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(etag)
+
+    if body is None:
+        data = await build()
+        body = json.dumps(
+            jsonable_encoder(data),
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        response_cache.put(etag, body)
+
+    return Response(body, media_type="application/json", headers=headers)
@@ -3,41 +3,193 @@
 # This file is the "security guard" of our app
 # -------------------------------------------------
 
+import asyncio
 import hashlib
 import hmac
+import os
+import secrets
 import time
 import base64
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 # A secret key known only to the server
 # (like a private stamp the server uses)
 SECRET_KEY = "gym_super_secret_key"
 
 
+# -------------------------------------------------
+# 🔒 Password hashing
+# -------------------------------------------------
+#
+# STORY:
+# A password hash must be SLOW to compute, so a
+# stolen users table cannot be guessed through
+# quickly. Every password gets its own random salt.
+#
+# The stored hash says HOW it was made:
+#
+#   scrypt$16384$8$1$<salt>$<hash>        (n, r, p)
+#   pbkdf2_sha256$600000$<salt>$<hash>    (iterations)
+#   <64 hex characters>                   old unsalted SHA-256
+#
+# so the cost can be raised later: old hashes still
+# verify, and are re-made with the new cost the next
+# time their owner logs in (needs_rehash).
+#
+# Settings:
+# GYM_PASSWORD_SCHEME    → scrypt (default) or pbkdf2_sha256
+# GYM_SCRYPT_N / _R / _P → scrypt cost (memory and CPU)
+# GYM_PBKDF2_ITERATIONS  → pbkdf2 cost
+#
+PASSWORD_SCHEME = os.environ.get("GYM_PASSWORD_SCHEME", "scrypt")
+SCRYPT_N = int(os.environ.get("GYM_SCRYPT_N", "16384"))
+SCRYPT_R = int(os.environ.get("GYM_SCRYPT_R", "8"))
+SCRYPT_P = int(os.environ.get("GYM_SCRYPT_P", "1"))
+PBKDF2_ITERATIONS = int(os.environ.get("GYM_PBKDF2_ITERATIONS", "600000"))
+
+SALT_BYTES = 16
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+        maxmem=128 * r * (n + p + 2) + 1024 * 1024,  # what OpenSSL needs, plus slack
+        dklen=32,
+    )
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+
+
+def _current_prefix() -> str:
+    if PASSWORD_SCHEME == "pbkdf2_sha256":
+        return f"pbkdf2_sha256${PBKDF2_ITERATIONS}$"
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$"
+
+
 def hash_password(password: str) -> str:
     """
     STORY:
     User gives us a plain password (1234).
     We NEVER store it directly.
-    We convert it into a scrambled version (hash).
+    We convert it into a scrambled version (hash),
+    with a fresh salt and today's cost settings.
+
+    Slow on purpose: from async code use
+    hash_password_async().
     """
-    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+    salt = secrets.token_bytes(SALT_BYTES)
+
+    if PASSWORD_SCHEME == "pbkdf2_sha256":
+        digest = _pbkdf2(password, salt, PBKDF2_ITERATIONS)
+    else:
+        digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+    return f"{_current_prefix()}{salt.hex()}${digest.hex()}"
 
 
 def verify_password(plain: str, hashed: str) -> bool:
     """
     STORY:
     - User tries to login
-    - We hash the entered password again
+    - We read HOW the stored hash was made
+    - Hash the entered password the same way
     - Compare it with stored hash
+
+    Slow on purpose: from async code use
+    verify_password_async().
     """
-    return hmac.compare_digest(
-        hash_password(plain),
-        hashed
-    )
+    parts = hashed.split("$")
+
+    try:
+        if parts[0] == "scrypt" and len(parts) == 6:
+            n, r, p = (int(value) for value in parts[1:4])
+            digest = _scrypt(plain, bytes.fromhex(parts[4]), n, r, p)
+            expected = bytes.fromhex(parts[5])
+        elif parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            digest = _pbkdf2(plain, bytes.fromhex(parts[2]), int(parts[1]))
+            expected = bytes.fromhex(parts[3])
+        elif len(parts) == 1:
+            # Users registered before salted hashes
+            digest = hashlib.sha256(plain.encode("utf-8")).hexdigest().encode("ascii")
+            expected = hashed.encode("ascii")
+        else:
+            return False
+    except ValueError:
+        return False  # damaged hash: nobody can log in with it
+
+    return hmac.compare_digest(digest, expected)
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True when the hash was made with other settings than today's."""
+    return not hashed.startswith(_current_prefix())
+
+
+# -------------------------------------------------
+# 🧵 The hashing pool
+# -------------------------------------------------
+#
+# STORY:
+# One hash takes tens of milliseconds of CPU. Done on
+# the event loop, a burst of logins would freeze every
+# other request; done on the shared threadpools, it
+# would take all their threads.
+#
+# So hashing gets its OWN small team of threads.
+# hashlib lets go of the GIL while hashing, so the
+# threads really run side by side, and at most
+# HASH_WORKERS cores are ever busy hashing: the rest
+# of the app keeps its CPU.
+#
+# GYM_HASH_WORKERS → threads that may hash at once
+#
+HASH_WORKERS = int(os.environ.get("GYM_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+hashing_executor = ThreadPoolExecutor(
+    max_workers=HASH_WORKERS,
+    thread_name_prefix="gym-hash",
+)
+
+# Hashes handed to the pool and not finished yet.
+# Only touched from the event loop.
+hashing_in_flight = 0
+
+
+async def _in_hashing_pool(fn, *args):
+    global hashing_in_flight
+
+    hashing_in_flight += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(hashing_executor, fn, *args)
+    finally:
+        hashing_in_flight -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _in_hashing_pool(hash_password, password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _in_hashing_pool(verify_password, plain, hashed)
+
+
+def hashing_stats() -> dict:
+    return {
+        "workers": HASH_WORKERS,
+        "busy": min(hashing_in_flight, HASH_WORKERS),
+        "queued": max(0, hashing_in_flight - HASH_WORKERS),
+    }
+
+
+# -------------------------------------------------
+# 🎟️ Tokens
+# -------------------------------------------------
 
 
-def create_token(email: str) -> str:
+def create_token(email: str, branch: str = None, role: str = None) -> str:
     """
     STORY:
     This function creates a LOGIN TOKEN 🎟️
@@ -50,6 +202,8 @@ def create_token(email: str) -> str:
 
     payload = {
         "email": email,
+        "branch": branch,
+        "role": role,
         "issued_at": int(time.time())
     }
 
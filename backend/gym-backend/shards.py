@@ -0,0 +1,210 @@
+# --------------------------------------------------
+# shards.py 🏢
+# --------------------------------------------------
+#
+# STORY:
+# The gym has MANY branches. With every branch in one
+# gym.db, the members table (and every dashboard scan
+# over it) kept growing, and all branches queued for
+# the same write lock.
+#
+# Now every branch has its OWN database file (a shard):
+#
+#   gym.db            → HOME: users, the branch registry
+#                       and the default branch's members
+#   gym-north.db      → branch "north"
+#   gym-riverside.db  → branch "riverside"
+#
+# 1️⃣ A user belongs to a branch (users.branch); the
+#    login token carries it
+# 2️⃣ The guard (auth_guard.py) looks the branch up in
+#    the REGISTRY (the branches table in the home
+#    database) and points the request at that shard
+#    (database.current_shard)
+# 3️⃣ Everything else (repository.py, the snapshot,
+#    the change log) simply calls connection() and
+#    gets the right file
+#
+# Each shard has its own connection pools (read-write
+# and read-only), opened (and migrated) the first time
+# the branch is used.
+#
+# Head office may look across branches: fan_out() asks
+# every shard the same question AT THE SAME TIME and
+# returns the answers per branch (dashboard.py merges them).
+#
+# Adding a branch (creates and migrates its file):
+#
+#   python shards.py add north "North branch"
+#   python shards.py list
+#
+# Head office is a ROLE, not a branch (auth_guard.py):
+#
+#   python shards.py head-office <email>
+#
+# Settings:
+# GYM_SHARD_DIR          → where new branch files go
+#                          (default: next to gym.db)
+# --------------------------------------------------
+
+import asyncio
+import os
+import re
+import sys
+import threading
+from collections import namedtuple
+
+import repository
+from database import (
+    AUTO_MIGRATE, BUSY_TIMEOUT_MS, DB_PATH, DEFAULT_BRANCH, READ_POOL_SIZE,
+    ConnectionPool, current_shard, pool as home_pool, read_pool as home_read_pool,
+)
+from migrations import migrate
+
+SHARD_DIR = os.environ.get("GYM_SHARD_DIR", os.path.dirname(os.path.abspath(DB_PATH)))
+
+BRANCH_ID = re.compile(r"^[a-z0-9][a-z0-9_-]{0,39}$")
+
+Shard = namedtuple("Shard", "branch name path pool read_pool")
+
+
+class ShardRegistry:
+    """
+    Blocking (it may open and migrate a database file):
+    from async code use shard_for() / fan_out().
+    """
+
+    def __init__(self, home: ConnectionPool):
+        self.home = home
+        self._shards = {}  # branch → Shard, once opened
+        self._lock = threading.Lock()
+
+    def _resolve(self, path: str) -> str:
+        return path if os.path.isabs(path) else os.path.join(SHARD_DIR, path)
+
+    def _open(self, branch: str, name: str, path) -> Shard:
+        if branch == DEFAULT_BRANCH or not path:
+            return Shard(branch, name, DB_PATH, self.home, home_read_pool)
+
+        path = self._resolve(path)
+        if AUTO_MIGRATE:
+            migrate(path, BUSY_TIMEOUT_MS)
+
+        return Shard(
+            branch, name, path,
+            ConnectionPool(path),
+            ConnectionPool(path, READ_POOL_SIZE, readonly=True),
+        )
+
+    def get(self, branch: str):
+        """The shard of a branch, or None for an unknown branch."""
+        shard = self._shards.get(branch)
+        if shard is not None:
+            return shard
+
+        with self._lock:
+            shard = self._shards.get(branch)
+            if shard is not None:
+                return shard
+
+            with self.home.connection() as conn:
+                row = conn.execute(
+                    "SELECT name, path FROM branches WHERE id = ?", (branch,)
+                ).fetchone()
+
+            if row is None and branch != DEFAULT_BRANCH:
+                return None
+
+            name, path = row or (branch, None)
+            shard = self._shards[branch] = self._open(branch, name, path)
+            return shard
+
+    def all(self) -> list:
+        """Every branch: the default one first, then by id."""
+        with self.home.connection() as conn:
+            branches = [row[0] for row in conn.execute("SELECT id FROM branches ORDER BY id")]
+
+        branches = [DEFAULT_BRANCH] + [b for b in branches if b != DEFAULT_BRANCH]
+        return [self.get(branch) for branch in branches]
+
+    def add(self, branch: str, name: str, path: str = None) -> Shard:
+        if not BRANCH_ID.match(branch):
+            raise ValueError("branch id: lowercase letters, digits, - and _ (max 40)")
+        if branch == DEFAULT_BRANCH:
+            raise ValueError(f"'{branch}' is the default branch (the home database)")
+
+        path = path or f"gym-{branch}.db"
+        migrate(self._resolve(path), BUSY_TIMEOUT_MS)
+
+        with self.home.connection() as conn:
+            conn.execute(
+                "INSERT INTO branches (id, name, path) VALUES (?, ?, ?)",
+                (branch, name, path)
+            )
+
+        return self.get(branch)
+
+    def close(self):
+        """Close every branch's connections (server shutdown)."""
+        with self._lock:
+            shards, self._shards = list(self._shards.values()), {}
+
+        for shard in shards:
+            if shard.pool is not self.home:
+                shard.pool.close()
+                shard.read_pool.close()
+
+    def stats(self) -> dict:
+        return {"open_shards": len(self._shards)}
+
+
+registry = ShardRegistry(home_pool)
+
+
+async def shard_for(branch: str):
+    shard = registry._shards.get(branch)  # already open → no thread hop
+    if shard is not None:
+        return shard
+
+    return await repository.run(registry.get, branch)
+
+
+async def fan_out(fn, *args) -> dict:
+    """
+    STORY:
+    Run `await fn(*args)` once per branch, all at the
+    same time, each inside its own branch.
+    Returns {branch: answer}.
+    """
+    shards = await repository.run(registry.all)
+
+    async def ask(shard):
+        # gather() gives every call its own copy of the
+        # context, so this only changes THIS call's branch
+        current_shard.set(shard)
+        return await fn(*args)
+
+    answers = await asyncio.gather(*(ask(shard) for shard in shards))
+    return {shard.branch: answer for shard, answer in zip(shards, answers)}
+
+
+# --------------------------------------------------
+# CLI
+# --------------------------------------------------
+if __name__ == "__main__":
+    from auth_guard import HEAD_OFFICE
+
+    args = sys.argv[1:]
+
+    if args[:1] == ["add"] and len(args) >= 2:
+        shard = registry.add(args[1], args[2] if len(args) > 2 else args[1])
+        print(f"added {shard.branch} → {shard.path}")
+    elif args[:1] == ["head-office"] and len(args) == 2:
+        if not repository.set_user_role(args[1], HEAD_OFFICE):
+            sys.exit(f"no user {args[1]}")
+        print(f"{args[1]} is head office (from their next login)")
+    elif args[:1] in ([], ["list"]):
+        for shard in registry.all():
+            print(f"{shard.branch:<20} {shard.name:<30} {shard.path}")
+    else:
+        sys.exit("usage: python shards.py [list | add <branch> [name] | head-office <email>]")
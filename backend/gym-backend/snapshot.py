@@ -0,0 +1,290 @@
+# --------------------------------------------------
+# snapshot.py 🧮
+# --------------------------------------------------
+#
+# STORY:
+# Some dashboard questions look at EVERY member:
+# - plan mix by join month
+# - how many of each month's joiners are still here
+# - how many memberships run out on each day
+#
+# Asking SQLite (or looping in Python) over a million
+# rows for every chart is slow. So we keep a COPY of
+# the few columns these questions need, in memory,
+# column by column (NumPy arrays):
+#
+#   ids     → int64
+#   plans   → small int codes (see plan_names)
+#   joined  → datetime64[D]
+#   expiry  → datetime64[D]
+#   join_month → months since 1970 (int32), worked out
+#                once per row instead of per question
+#
+# A whole-gym question is then a handful of vectorized
+# NumPy operations instead of a million Python steps.
+#
+# Keeping the copy fresh:
+# - member_changes (migrations.py) logs every write
+# - the snapshot remembers the last seq it has seen
+# - refresh() only re-reads the members changed since
+#   (a full reload only when that is cheaper, or the
+#   lines it needs were compacted away — see
+#   repository.compact_changes)
+#
+# NumPy is OPTIONAL: without it AVAILABLE is False and
+# /dashboard/analytics answers 503.
+# --------------------------------------------------
+
+import importlib.util
+import threading
+from collections import namedtuple
+
+from database import read_connection
+from plans import PLAN_DAYS
+from repository import change_log_head
+
+# NumPy is imported on first use (for_branch): it is a
+# big share of the server's start-up time, and a
+# process that never draws analytics never needs it
+np = None
+AVAILABLE = importlib.util.find_spec("numpy") is not None
+
+# More changed members than this share of the gym →
+# reloading everything is cheaper than patching
+FULL_RELOAD_SHARE = 0.2
+
+Columns = namedtuple("Columns", "ids plans joined expiry join_month")
+
+# Dates are read as "days since 1970-01-01", which is
+# exactly how datetime64[D] stores them
+MEMBER_SQL = """
+    SELECT id, plan,
+           CAST(julianday(joined_on) - 2440587.5 AS INTEGER),
+           CAST(julianday(expiry_date) - 2440587.5 AS INTEGER)
+    FROM members
+"""
+
+
+class MemberSnapshot:
+    def __init__(self):
+        self.plan_names = list(PLAN_DAYS)
+        self._codes = {plan: code for code, plan in enumerate(self.plan_names)}
+
+        self.columns = None
+        self.seq = None  # last member_changes.seq applied
+
+        self._lock = threading.Lock()
+
+        self.full_loads = 0
+        self.incremental_loads = 0
+
+    # ----------------------------------------------
+    # Building columns
+    # ----------------------------------------------
+    def _code(self, plan: str) -> int:
+        code = self._codes.get(plan)
+        if code is None:
+            code = self._codes[plan] = len(self.plan_names)
+            self.plan_names.append(plan)
+        return code
+
+    def _to_columns(self, rows) -> Columns:
+        count = len(rows)
+        if not count:
+            return Columns(
+                np.empty(0, np.int64), np.empty(0, np.int16),
+                np.empty(0, "datetime64[D]"), np.empty(0, "datetime64[D]"),
+                np.empty(0, np.int32),
+            )
+
+        ids, plans, joined, expiry = zip(*rows)
+        joined = np.fromiter(joined, np.int64, count).astype("datetime64[D]")
+
+        return Columns(
+            np.fromiter(ids, np.int64, count),
+            np.fromiter((self._code(plan) for plan in plans), np.int16, count),
+            joined,
+            np.fromiter(expiry, np.int64, count).astype("datetime64[D]"),
+            joined.astype("datetime64[M]").astype(np.int32),
+        )
+
+    # ----------------------------------------------
+    # Refreshing
+    # ----------------------------------------------
+    def refresh(self) -> Columns:
+        """
+        STORY:
+        Bring the copy up to date and return it.
+        Blocking: call it through repository.run_read().
+        """
+        with self._lock, read_connection() as conn:
+            conn.execute("BEGIN")  # changes + rows from one snapshot
+
+            head, compacted = change_log_head(conn)
+
+            # seq < compacted: lines we need were thrown
+            # away → full reload below
+            if self.columns is not None and self.seq >= compacted:
+                if head == self.seq:
+                    return self.columns  # nothing changed
+
+                changed = conn.execute(
+                    "SELECT COUNT(DISTINCT member_id) FROM member_changes WHERE seq > ?",
+                    (self.seq,)
+                ).fetchone()[0]
+
+                if changed <= FULL_RELOAD_SHARE * max(len(self.columns.ids), 1):
+                    changed_ids = [row[0] for row in conn.execute(
+                        "SELECT DISTINCT member_id FROM member_changes WHERE seq > ?",
+                        (self.seq,)
+                    )]
+                    rows = conn.execute(
+                        MEMBER_SQL + " WHERE id IN "
+                        "(SELECT member_id FROM member_changes WHERE seq > ?) ORDER BY id",
+                        (self.seq,)
+                    ).fetchall()
+
+                    self.columns = self._patch(self.columns, changed_ids, rows)
+                    self.seq = head
+                    self.incremental_loads += 1
+                    return self.columns
+
+            self.seq = head
+            self.columns = self._to_columns(conn.execute(MEMBER_SQL + " ORDER BY id").fetchall())
+            self.full_loads += 1
+            return self.columns
+
+    def _patch(self, old: Columns, changed_ids, rows) -> Columns:
+        """
+        STORY:
+        Drop every changed member from the copy, then add
+        back the current version of those still there.
+
+        New arrays are built (never patched in place), so a
+        reader holding the old Columns is never disturbed.
+        """
+        changed = np.unique(np.asarray(changed_ids, np.int64))
+        position = np.searchsorted(old.ids, changed)
+        found = position < len(old.ids)
+        found[found] = old.ids[position[found]] == changed[found]
+
+        keep = np.ones(len(old.ids), bool)
+        keep[position[found]] = False
+
+        fresh = self._to_columns(rows)
+        merged = Columns(*(
+            np.concatenate((column[keep], new)) for column, new in zip(old, fresh)
+        ))
+
+        # New members have the highest ids, so the copy usually
+        # stays sorted; an updated member has to move back in place.
+        if len(merged.ids) > 1 and (np.diff(merged.ids) < 0).any():
+            order = np.argsort(merged.ids, kind="stable")
+            merged = Columns(*(column[order] for column in merged))
+
+        return merged
+
+    def stats(self) -> dict:
+        return {
+            "members": 0 if self.columns is None else len(self.columns.ids),
+            "seq": self.seq,
+            "full_loads": self.full_loads,
+            "incremental_loads": self.incremental_loads,
+        }
+
+
+# One copy per branch (shards.py)
+snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def for_branch(branch: str):
+    """The branch's snapshot (None without NumPy)."""
+    global np
+
+    if not AVAILABLE:
+        return None
+
+    with _snapshots_lock:
+        if np is None:
+            import numpy as np
+
+        if branch not in snapshots:
+            snapshots[branch] = MemberSnapshot()
+        return snapshots[branch]
+
+
+# --------------------------------------------------
+# Vectorized analytics
+# --------------------------------------------------
+#
+# Each function takes the Columns returned by refresh()
+# and returns plain JSON-ready Python values.
+#
+def plan_summary(columns: Columns, plan_names: list, today: str) -> dict:
+    """Members and active members per plan (active = expiry after today)."""
+    active = columns.expiry > np.datetime64(today, "D")
+    size = len(plan_names)
+
+    members = np.bincount(columns.plans, minlength=size)
+    active_members = np.bincount(columns.plans[active], minlength=size)
+
+    return {
+        "total_members": int(len(columns.ids)),
+        "active_members": int(active.sum()),
+        "plans": {
+            plan: {"members": int(members[code]), "active": int(active_members[code])}
+            for code, plan in enumerate(plan_names)
+        },
+    }
+
+
+def join_months(columns: Columns, plan_names: list, today: str) -> list:
+    """
+    STORY:
+    One row per join month (a cohort):
+    - how many joined, per plan (plan mix)
+    - how many of them are still active today (retention)
+    """
+    if not len(columns.ids):
+        return []
+
+    # Months since 1970 are small ints: bincount instead of a sort
+    first = int(columns.join_month.min())
+    cohort = columns.join_month - first
+    count = int(cohort.max()) + 1
+    size = len(plan_names)
+
+    mix = np.bincount(cohort * size + columns.plans, minlength=count * size)
+    mix = mix.reshape(count, size)
+
+    active = columns.expiry > np.datetime64(today, "D")
+    joined = np.bincount(cohort, minlength=count)
+    still_active = np.bincount(cohort[active], minlength=count)
+
+    months = np.arange(first, first + count).astype("datetime64[M]")
+    rows = np.flatnonzero(joined)
+
+    return [
+        {
+            "month": str(month),
+            "joined": int(joined[row]),
+            "still_active": int(still_active[row]),
+            "retention": round(float(still_active[row] / joined[row]), 4),
+            "plans": {plan: int(mix[row, code]) for code, plan in enumerate(plan_names)},
+        }
+        for row, month in zip(rows, months[rows])
+    ]
+
+
+def expiry_histogram(columns: Columns, first: str, days: int) -> list:
+    """How many memberships run out on each of `days` days from `first`."""
+    offset = (columns.expiry - np.datetime64(first, "D")).astype(np.int64)
+    in_range = (offset >= 0) & (offset < days)
+    counts = np.bincount(offset[in_range], minlength=days)
+
+    start = np.datetime64(first, "D")
+    return [
+        {"day": str(start + day), "expiring": int(counts[day])}
+        for day in range(days)
+    ]
@@ -0,0 +1,250 @@
+# --------------------------------------------------
+# sql_profiler.py ⏱️
+# --------------------------------------------------
+#
+# STORY:
+# When the dashboard is slow, WHERE does the time go?
+# - inside SQLite?
+# - in Python, shaping rows?
+# - turning the answer into JSON?
+#
+# This file is the STOPWATCH for the storage room:
+#
+# 1️⃣ Every SQL statement run through a pooled
+#    connection is timed (ProfiledConnection)
+# 2️⃣ Statements are grouped by SHAPE: numbers and
+#    strings become "?", so "WHERE id = 7" and
+#    "WHERE id = 8" count as the same query
+# 3️⃣ Slow statements (over GYM_SQL_SLOW_MS) go to the
+#    "gym.sql.slow" log together with their
+#    EXPLAIN QUERY PLAN. A batch (executemany) gets
+#    GYM_SQL_SLOW_MS per row: a bulk import is long,
+#    not slow
+# 4️⃣ Each request counts its own queries. Too many
+#    (GYM_SQL_N_PLUS_ONE) → "possible N+1" warning
+# 5️⃣ Responses to head office get a Server-Timing
+#    header (db = time in SQLite, app = everything
+#    else) and x-sql-queries. Like /debug/sql, that is
+#    not for every client: the guard (auth_guard.py)
+#    calls show_timing() for head-office tokens
+#
+# GET /debug/sql (main.py, head office only) lists the
+# top statements.
+#
+# Settings:
+# GYM_SQL_PROFILE      → 0 turns the stopwatch off
+# GYM_SQL_SLOW_MS      → slow-query threshold (ms)
+# GYM_SQL_N_PLUS_ONE   → queries per request before warning
+# GYM_SQL_TIMING_HEADERS → 1 = timing headers for everyone
+#                          (debugging)
+# --------------------------------------------------
+
+import contextvars
+import functools
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+PROFILE_SQL = os.environ.get("GYM_SQL_PROFILE", "1") != "0"
+SLOW_QUERY_MS = float(os.environ.get("GYM_SQL_SLOW_MS", "100"))
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("GYM_SQL_N_PLUS_ONE", "20"))
+TIMING_HEADERS = os.environ.get("GYM_SQL_TIMING_HEADERS", "0") == "1"
+
+slow_log = logging.getLogger("gym.sql.slow")
+request_log = logging.getLogger("gym.sql.requests")
+
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+
+# --------------------------------------------------
+# STEP 1️⃣: Statement shapes
+# --------------------------------------------------
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=2048)
+def normalize(sql: str) -> str:
+    """
+    "SELECT * FROM members  WHERE id IN (1, 2, 3)"
+      → "SELECT * FROM members WHERE id IN (?+)"
+    """
+    shape = _STRINGS.sub("?", sql)
+    shape = _NUMBERS.sub("?", shape)
+    shape = _LISTS.sub("(?+)", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+# --------------------------------------------------
+# STEP 2️⃣: Per-request counters
+# --------------------------------------------------
+class RequestQueries:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = {}
+        self.show_timing = TIMING_HEADERS
+
+
+# Set by QueryProfileMiddleware for each request.
+# repository.run() copies the context into the DB
+# executor, so statements land on the right request.
+current_request = contextvars.ContextVar("current_request_queries", default=None)
+
+
+def show_timing():
+    """This response may carry the timing headers."""
+    queries = current_request.get()
+    if queries is not None:
+        queries.show_timing = True
+
+
+# --------------------------------------------------
+# STEP 3️⃣: Global statistics
+# --------------------------------------------------
+class Profiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shapes = {}  # shape → [count, total_s, max_s, slow]
+        self.flagged_requests = 0
+
+    def record(self, conn, sql: str, parameters, seconds: float,
+               many: bool = False, rows: int = 1):
+        shape = normalize(sql)
+        slow = seconds * 1000 >= SLOW_QUERY_MS * max(rows, 1)
+
+        with self._lock:
+            stats = self._shapes.get(shape)
+            if stats is None:
+                stats = self._shapes[shape] = [0, 0.0, 0.0, 0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] += slow
+
+        queries = current_request.get()
+        if queries is not None:
+            queries.count += 1
+            queries.seconds += seconds
+            queries.shapes[shape] = queries.shapes.get(shape, 0) + 1
+
+        if slow:
+            self.log_slow(conn, sql, None if many else parameters, seconds)
+
+    def log_slow(self, conn, sql: str, parameters, seconds: float):
+        plan = ""
+        if parameters is not None and sql.lstrip().upper().startswith(EXPLAINABLE):
+            try:
+                rows = sqlite3.Connection.execute(
+                    conn, "EXPLAIN QUERY PLAN " + sql, parameters
+                ).fetchall()
+                plan = "\n".join(f"  {row[-1]}" for row in rows)
+            except sqlite3.Error as error:
+                plan = f"  (no plan: {error})"
+
+        slow_log.warning(
+            "slow query %.1f ms: %s\n%s", seconds * 1000, normalize(sql), plan
+        )
+
+    def top(self, limit: int = 20, order: str = "total") -> list:
+        column = {"total": 1, "count": 0, "max": 2}.get(order, 1)
+
+        with self._lock:
+            items = sorted(
+                self._shapes.items(), key=lambda item: item[1][column], reverse=True
+            )[:limit]
+
+        return [
+            {
+                "sql": shape,
+                "count": count,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total / count * 1000, 3),
+                "max_ms": round(worst * 1000, 3),
+                "slow": slow,
+            }
+            for shape, (count, total, worst, slow) in items
+        ]
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+            self.flagged_requests = 0
+
+
+profiler = Profiler()
+
+
+# --------------------------------------------------
+# STEP 4️⃣: The timed connection
+# --------------------------------------------------
+class ProfiledConnection(sqlite3.Connection):
+    """
+    Used as sqlite3.connect(..., factory=ProfiledConnection)
+    by the pool in database.py.
+
+    Times execute() / executemany(). Rows pulled later with
+    fetchmany() (the streaming export) are not included.
+    """
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        cursor = super().execute(sql, parameters)
+        profiler.record(self, sql, parameters, time.perf_counter() - started)
+        return cursor
+
+    def executemany(self, sql, parameters):
+        started = time.perf_counter()
+        cursor = super().executemany(sql, parameters)
+        profiler.record(
+            self, sql, parameters, time.perf_counter() - started,
+            many=True, rows=cursor.rowcount,
+        )
+        return cursor
+
+
+# --------------------------------------------------
+# STEP 5️⃣: Per-request middleware
+# --------------------------------------------------
+class QueryProfileMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILE_SQL:
+            return await self.app(scope, receive, send)
+
+        queries = RequestQueries()
+        token = current_request.set(queries)
+        started = time.perf_counter()
+
+        async def add_timing(message):
+            if message["type"] == "http.response.start" and queries.show_timing:
+                total_ms = (time.perf_counter() - started) * 1000
+                db_ms = queries.seconds * 1000
+                timing = f"db;dur={db_ms:.2f}, app;dur={max(total_ms - db_ms, 0):.2f}"
+
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", timing.encode("latin-1")),
+                    (b"x-sql-queries", str(queries.count).encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, add_timing)
+        finally:
+            current_request.reset(token)
+
+            if queries.count > N_PLUS_ONE_THRESHOLD:
+                profiler.flagged_requests += 1
+
+                shape, repeats = max(queries.shapes.items(), key=lambda item: item[1])
+                request_log.warning(
+                    "possible N+1: %s %s ran %d queries (%dx %s)",
+                    scope["method"], scope["path"], queries.count, repeats, shape,
+                )
@@ -0,0 +1,156 @@
+# --------------------------------------------------
+# tests/test_member_import.py 🧪
+# --------------------------------------------------
+#
+# STORY:
+# POST /members/import must read an upload exactly as
+# a spreadsheet wrote it:
+# - quoted commas and line breaks stay inside a value
+# - a row with the wrong number of values is reported,
+#   never imported half-right
+# - a JSON array is read element by element
+#
+# Run (from backend/gym-backend):
+#   python -m pytest -q tests
+# --------------------------------------------------
+
+import asyncio
+import os
+import sys
+import tempfile
+
+os.environ["GYM_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "gym.db")
+os.environ.setdefault("GYM_LOGIN_RATE_PER_MIN", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+import members  # noqa: E402
+
+USER = {"name": "importer", "email": "importer@gym.local", "password": "importer"}
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.create_app()) as client:
+        client.post("/register", json=USER)
+        token = client.post("/login", json=USER).json()["token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        yield client
+
+
+def upload(client, body: str, content_type: str) -> dict:
+    answer = client.post(
+        "/members/import", content=body.encode("utf-8"),
+        headers={"Content-Type": content_type},
+    )
+    assert answer.status_code == 200, answer.text
+    return answer.json()
+
+
+def imported(client, phone: str) -> list:
+    items = client.get("/members/search", params={"q": phone}).json()["items"]
+    return [(member["name"], member["phone"], member["plan"]) for member in items]
+
+
+def test_csv_quoted_comma_and_newline(client):
+    body = (
+        "name,phone,plan\n"
+        '"Kumar, Pat",1000001,Monthly\n'
+        '"Multi\nLine",1000002,Yearly\n'
+        "Plain,1000003,Quarterly\n"
+    )
+
+    answer = upload(client, body, "text/csv")
+
+    assert answer == {"imported": 3, "failed": 0, "errors": [], "errors_truncated": False}
+    assert imported(client, "1000001") == [("Kumar, Pat", "1000001", "Monthly")]
+    assert imported(client, "1000002") == [("Multi\nLine", "1000002", "Yearly")]
+    assert imported(client, "1000003") == [("Plain", "1000003", "Quarterly")]
+
+
+def test_csv_column_count_mismatch(client):
+    body = (
+        "name,phone,plan\n"
+        "Extra,2000001,Yearly,zzz\n"
+        "Short,2000002\n"
+        '"Two\nLines",2000003,Monthly\n'
+        "Fine,2000004,Monthly\n"
+    )
+
+    answer = upload(client, body, "text/csv")
+
+    assert answer["imported"] == 2
+    assert answer["errors"] == [
+        {"row": 2, "error": "expected 3 values, got 4"},
+        {"row": 3, "error": "expected 3 values, got 2"},
+    ]
+    assert imported(client, "2000001") == []
+    assert imported(client, "2000004") == [("Fine", "2000004", "Monthly")]
+
+
+def test_json_array_streamed(client):
+    body = (
+        '[{"name": "Json One", "phone": "3000001", "plan": "Monthly"},\n'
+        ' {"name": "", "phone": "3000002", "plan": "Monthly"},\n'
+        ' {"name": "Json Three", "phone": "3000003", "plan": "Yearly"}]'
+    )
+
+    answer = upload(client, body, "application/json")
+
+    assert answer["imported"] == 2
+    assert answer["errors"] == [{"row": 2, "error": "name is required"}]
+    assert imported(client, "3000003") == [("Json Three", "3000003", "Yearly")]
+
+
+def test_json_not_an_array(client):
+    answer = client.post(
+        "/members/import", content=b'{"name": "x"}',
+        headers={"Content-Type": "application/json"},
+    )
+    assert answer.status_code == 400
+
+
+class TrickleRequest:
+    """A body that arrives a few bytes at a time."""
+
+    def __init__(self, body: str, size: int = 3):
+        self.body = body.encode("utf-8")
+        self.size = size
+
+    async def stream(self):
+        for start in range(0, len(self.body), self.size):
+            yield self.body[start:start + self.size]
+
+
+def read_all(records) -> list:
+    async def collect():
+        return [
+            (row, str(record) if isinstance(record, ValueError) else record)
+            async for row, record in records
+        ]
+
+    return asyncio.run(collect())
+
+
+def test_records_split_across_chunks():
+    csv_body = 'name,phone,plan\n"A, ""B""\nC",1,Monthly\n\nD,2,Yearly,x\n'
+    assert read_all(members.csv_records(TrickleRequest(csv_body))) == [
+        (2, {"name": 'A, "B"\nC', "phone": "1", "plan": "Monthly"}),
+        (5, "expected 3 values, got 4"),
+    ]
+
+    json_body = '[ {"name": "A", "phone": 12345}, 67890 , {"name": "é"} ]'
+    assert read_all(members.json_records(TrickleRequest(json_body))) == [
+        (1, {"name": "A", "phone": 12345}),
+        (2, 67890),
+        (3, {"name": "é"}),
+    ]
+
+    broken = '[{"name": "A"}, {"name": '
+    assert read_all(members.json_records(TrickleRequest(broken))) == [
+        (1, {"name": "A"}),
+        (2, "Body is not valid JSON"),
+    ]
@@ -4,3 +4,10 @@ import api from "../../services/api";
 export const loginApi = (data: any) => {
   return api.post("/login", data);
 };
+
+// Tell backend to revoke the current token
+export const logoutApi = (token: string) => {
+  return api.post("/logout", null, {
+    headers: { Authorization: `Bearer ${token}` },
+  });
+};
@@ -49,12 +49,14 @@
 // - How many members?
 // - Who is active?
 // - Which plans are popular?
+// - How many people are in the gym right now?
 // --------------------------------------------------
 
 import { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import { useAuth } from "../../auth/hooks/useAuth";
 import LogoutButton from "../../shared/components/LogoutButton";
+import Occupancy from "./Occupancy";
 
 type Stats = {
   total_members: number;
@@ -94,6 +96,8 @@ export default function Dashboard() {
         <LogoutButton />
       </div>
 
+      {token && <Occupancy token={token} />}
+
       <div className="card">
         <h3>Total Members</h3>
         <p>{stats.total_members}</p>
@@ -0,0 +1,83 @@
+// --------------------------------------------------
+// Occupancy.tsx 🚪
+// --------------------------------------------------
+//
+// STORY:
+//
+// A small LIVE widget on the dashboard:
+// - How many people are in the gym right now?
+// - How busy was each of the last hours?
+//
+// The turnstiles send their scans to the backend
+// (POST /checkins). This widget just asks
+// /dashboard/occupancy again every REFRESH_MS.
+// --------------------------------------------------
+
+import { useEffect, useState } from "react";
+
+const REFRESH_MS = 30_000;
+
+type Occupancy = {
+  inside: number;
+  visit_minutes: number;
+  as_of: string;
+  hours: { hour: string; checkins: number }[];
+};
+
+export default function Occupancy({ token }: { token: string }) {
+  const [occupancy, setOccupancy] = useState<Occupancy | null>(null);
+
+  useEffect(() => {
+    let stopped = false;
+
+    const load = () =>
+      fetch("http://127.0.0.1:8000/dashboard/occupancy?hours=12", {
+        headers: {
+          Authorization: `Bearer ${token}`,
+        },
+      })
+        .then(res => (res.ok ? res.json() : null))
+        .then(data => {
+          if (!stopped && data) setOccupancy(data);
+        })
+        .catch(() => {}); // keep the last numbers, try again later
+
+    load();
+    const timer = setInterval(load, REFRESH_MS);
+
+    return () => {
+      stopped = true;
+      clearInterval(timer);
+    };
+  }, [token]);
+
+  if (!occupancy) return null;
+
+  const busiest = Math.max(1, ...occupancy.hours.map(hour => hour.checkins));
+
+  return (
+    <div className="card">
+      <h3>In the Gym Now 🚪</h3>
+      <p>{occupancy.inside}</p>
+      <p className="text-muted">
+        Checked in during the last {occupancy.visit_minutes} minutes
+      </p>
+
+      <div className="hour-bars">
+        {occupancy.hours.map(hour => (
+          <div
+            key={hour.hour}
+            className="hour-bar"
+            title={`${hour.hour}: ${hour.checkins} check-ins`}
+          >
+            <div
+              className="hour-bar-fill"
+              style={{ height: `${(100 * hour.checkins) / busiest}%` }}
+            />
+            <span>{hour.hour.slice(11, 13)}</span>
+          </div>
+        ))}
+      </div>
+    </div>
+  );
+}
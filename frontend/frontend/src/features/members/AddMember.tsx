@@ -9,7 +9,8 @@
 // 1️⃣ Enter member details
 // 2️⃣ Click "Add Member"
 // 3️⃣ Backend saves member
-// 4️⃣ Members list refreshes automatically
+// 4️⃣ Members list updates automatically
+//    (onMemberAdded: the page catches up)
 //
 // This component:
 // ❌ Does NOT manage members list
@@ -22,7 +23,7 @@ import { addMember } from "./membersApi";
 import { useAuth } from "../../auth/context/AuthContext";
 
 type AddMemberProps = {
-  onMemberAdded: () => void;
+  onMemberAdded?: () => void;
 };
 
 export default function AddMember({ onMemberAdded }: AddMemberProps) {
@@ -64,8 +65,8 @@ export default function AddMember({ onMemberAdded }: AddMemberProps) {
       setPhone("");
       setPlan("Monthly");
 
-      // Tell MembersPage to refresh list
-      onMemberAdded();
+      // Tell the parent, if it wants to know
+      onMemberAdded?.();
     } catch (error) {
       alert("Failed to add member ❌");
     } finally {
@@ -118,5 +119,6 @@ export default function AddMember({ onMemberAdded }: AddMemberProps) {
 // - Collects member info
 // - Sends data to backend
 // - Does NOT manage list
-// - Parent (MembersPage) refreshes data
+// - MembersPage hears about the new member
+//   through onMemberAdded and the live events
 // --------------------------------------------------
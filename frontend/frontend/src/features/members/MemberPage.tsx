@@ -10,9 +10,21 @@
 // When someone enters:
 //
 // 1️⃣ Security gives us the TOKEN 🎟️
-// 2️⃣ We fetch members from backend
+// 2️⃣ We fetch members from backend (page by page)
 // 3️⃣ We show members in clean cards
-// 4️⃣ Admin can:
+// 4️⃣ We LISTEN for member changes (ours and other
+//    terminals') and patch the list in place,
+//    instead of downloading it again
+// 5️⃣ We also CATCH UP (/members/changes: only what
+//    changed since we last looked):
+//    - right after loading the list
+//    - after each of our own writes
+//    - every CATCH_UP_MS
+//    - when the live stream says we missed something
+//    A backend with several workers only streams the
+//    changes made through the worker we listen to;
+//    catching up brings in the rest.
+// 6️⃣ Admin can:
 //    - Add member
 //    - Edit member
 //    - Delete member
@@ -21,11 +33,20 @@
 // Styling is handled by global.css
 // --------------------------------------------------
 
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useAuth } from "../../auth/hooks/useAuth";
 import LogoutButton from "../../shared/components/LogoutButton";
 import AddMember from "./AddMember";
-import { getMembers, updateMember, deleteMember } from "./membersApi";
+import {
+  getMembers,
+  getMemberChanges,
+  updateMember,
+  deleteMember,
+  subscribeToMembers,
+  type MemberChange,
+} from "./membersApi";
+
+const CATCH_UP_MS = 15_000;
 
 type Member = {
   id: number;
@@ -39,6 +60,10 @@ export default function MembersPage() {
   const { token } = useAuth();
 
   const [members, setMembers] = useState<Member[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const nextCursorRef = useRef<string | null>(null);
+  const sinceRef = useRef<number | null>(null); // change log position
+  const syncRef = useRef<Promise<void>>(Promise.resolve());
   const [editingId, setEditingId] = useState<number | null>(null);
 
   const [editForm, setEditForm] = useState({
@@ -48,26 +73,115 @@ export default function MembersPage() {
   });
 
   // ----------------------------------------------
-  // Fetch members from backend
+  // Fetch members from backend (first page)
   // ----------------------------------------------
   const fetchMembers = async () => {
     if (!token) return;
 
-    const data = await getMembers(token);
+    // Where the change log is BEFORE the list is read:
+    // the catch-up that follows applies everything
+    // written meanwhile (also what the live stream
+    // patched in before this list replaced it)
+    const { next_since } = await getMemberChanges(token);
+    const page = await getMembers(token);
+
+    sinceRef.current = next_since;
+    nextCursorRef.current = page.next_cursor;
+    setMembers(page.items);
+    setNextCursor(page.next_cursor);
+  };
+
+  // ----------------------------------------------
+  // Catch up: only what changed since sinceRef
+  // ----------------------------------------------
+  const applyChanges = async () => {
+    if (!token) return;
+    if (sinceRef.current == null) await fetchMembers();
+
+    while (true) {
+      const delta = await getMemberChanges(token, sinceRef.current);
+      if (delta.reset) {
+        await fetchMembers();
+        continue;
+      }
+
+      for (const change of delta.changes as MemberChange[]) {
+        if (change.op === "delete") {
+          setMembers((current) => current.filter((m) => m.id !== change.id));
+        } else {
+          upsert(change.member);
+        }
+      }
+
+      sinceRef.current = delta.next_since;
+      if (!delta.has_more) return;
+    }
+  };
+
+  // One catch-up at a time: the next one starts where
+  // the last one stopped. A failed one is simply
+  // retried by the next.
+  const catchUp = () => {
+    syncRef.current = syncRef.current.then(applyChanges).catch(() => {});
+    return syncRef.current;
+  };
+
+  // Replace a member we show; a new one goes at the END,
+  // but only once the last page is loaded (otherwise it
+  // arrives with "Load more")
+  const upsert = (member: Member) =>
+    setMembers((current) => {
+      if (current.some((m) => m.id === member.id)) {
+        return current.map((m) => (m.id === member.id ? member : m));
+      }
+      return nextCursorRef.current ? current : [...current, member];
+    });
+
+  // ----------------------------------------------
+  // Load the next page and append it
+  // ----------------------------------------------
+  const loadMore = async () => {
+    if (!token || !nextCursor) return;
 
-    const formatted = data.map((row: any) => ({
-      id: row[0],
-      name: row[1],
-      phone: row[2],
-      plan: row[3],
-      joined_on: row[4],
-    }));
+    const page = await getMembers(token, nextCursor);
 
-    setMembers(formatted);
+    setMembers((current) => [...current, ...page.items]);
+    setNextCursor(page.next_cursor);
   };
 
   useEffect(() => {
-    fetchMembers();
+    sinceRef.current = null; // first catch-up loads the list
+    catchUp();
+
+    const timer = setInterval(catchUp, CATCH_UP_MS);
+    return () => clearInterval(timer);
+  }, [token]);
+
+  useEffect(() => {
+    nextCursorRef.current = nextCursor;
+  }, [nextCursor]);
+
+  // ----------------------------------------------
+  // Live changes → patch the list
+  // ----------------------------------------------
+  //
+  // The list is sorted by id, and new members get the
+  // highest id. "resync" (we missed events, e.g. after
+  // a reconnect) only downloads the missed changes.
+  //
+  useEffect(() => {
+    if (!token) return;
+
+    return subscribeToMembers(token, {
+      created: upsert,
+      updated: (member) =>
+        setMembers((current) =>
+          current.map((m) => (m.id === member.id ? member : m))
+        ),
+      deleted: ({ id }) =>
+        setMembers((current) => current.filter((m) => m.id !== id)),
+      resync: catchUp,
+    });
   }, [token]);
 
   // ----------------------------------------------
@@ -86,7 +200,7 @@ export default function MembersPage() {
     if (!token) return;
     await updateMember(token, id, editForm);
     setEditingId(null);
-    fetchMembers();
+    catchUp(); // the write may have gone to another worker
   };
 
   // ----------------------------------------------
@@ -96,7 +210,7 @@ export default function MembersPage() {
     if (!token) return;
     if (!confirm("Delete this member?")) return;
     await deleteMember(token, id);
-    fetchMembers();
+    catchUp();
   };
 
   return (
@@ -108,7 +222,8 @@ export default function MembersPage() {
       </div>
 
       {/* Add member section */}
-      <AddMember onMemberAdded={fetchMembers} />
+      {/* The catch-up (or the "created" event) adds the new member */}
+      <AddMember onMemberAdded={catchUp} />
 
       {/* Members list */}
       {members.map((member) => (
@@ -165,6 +280,12 @@ export default function MembersPage() {
           )}
         </div>
       ))}
+
+      {nextCursor && (
+        <button className="secondary" onClick={loadMore}>
+          Load more
+        </button>
+      )}
     </div>
   );
 }
@@ -18,9 +18,17 @@
 
 const BASE_URL = "http://127.0.0.1:8000";
 
-// GET MEMBERS
-export async function getMembers(token: string) {
-  return fetch(`${BASE_URL}/members`, {
+// GET MEMBERS (one page)
+//
+// Backend answers with:
+// { items: [...members], next_cursor: "..." | null }
+//
+// Pass next_cursor back in to get the following page.
+export async function getMembers(token: string, cursor?: string | null) {
+  const params = new URLSearchParams();
+  if (cursor) params.set("cursor", cursor);
+
+  return fetch(`${BASE_URL}/members?${params}`, {
     headers: {
       Authorization: `Bearer ${token}`,
     },
@@ -64,3 +72,66 @@ export async function deleteMember(token: string, memberId: number) {
     },
   }).then(res => res.json());
 }
+
+// MEMBER CHANGES SINCE A SEQ 🔁
+//
+// Backend answers with:
+// {
+//   changes: [{ seq, op: "upsert", member } | { seq, op: "delete", id }],
+//   next_since: number,   // pass it back next time
+//   has_more: boolean,    // ask again right away
+//   reset: boolean        // too far behind: reload the list
+// }
+//
+// Without `since` only next_since comes back: ask for it
+// BEFORE loading the list, then catch up from there.
+export type MemberChange =
+  | { seq: number; op: "upsert"; member: any }
+  | { seq: number; op: "delete"; id: number };
+
+export async function getMemberChanges(token: string, since?: number | null) {
+  const params = new URLSearchParams();
+  if (since != null) params.set("since", String(since));
+
+  return fetch(`${BASE_URL}/members/changes?${params}`, {
+    headers: {
+      Authorization: `Bearer ${token}`,
+    },
+  }).then(res => res.json());
+}
+
+// LIVE MEMBER CHANGES 📣
+//
+// Opens a Server-Sent Events connection. The backend
+// announces every member write:
+//
+// created / updated → the member
+// deleted           → { id }
+// resync            → "reload your list" (you missed something)
+//
+// EventSource cannot send headers, so the token goes
+// in the URL. Returns a function that closes the connection.
+export type MemberEvents = {
+  created: (member: any) => void;
+  updated: (member: any) => void;
+  deleted: (change: { id: number }) => void;
+  resync: () => void;
+};
+
+export function subscribeToMembers(token: string, handlers: MemberEvents) {
+  const params = new URLSearchParams({ token });
+  const source = new EventSource(`${BASE_URL}/members/events?${params}`);
+
+  source.addEventListener("created", (e) =>
+    handlers.created(JSON.parse((e as MessageEvent).data))
+  );
+  source.addEventListener("updated", (e) =>
+    handlers.updated(JSON.parse((e as MessageEvent).data))
+  );
+  source.addEventListener("deleted", (e) =>
+    handlers.deleted(JSON.parse((e as MessageEvent).data))
+  );
+  source.addEventListener("resync", () => handlers.resync());
+
+  return () => source.close();
+}
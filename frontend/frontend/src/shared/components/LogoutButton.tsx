@@ -7,25 +7,28 @@
 //
 // When clicked:
 // - User logs out
-// - Token is destroyed
+// - Token is revoked by backend and destroyed
 // - User is sent to login page
 // --------------------------------------------------
 
 import { useNavigate } from "react-router-dom";
 import { useAuth } from "../../auth/context/AuthContext";
+import { logoutApi } from "../../auth/services/authApi";
 
 export default function LogoutButton() {
-  const { logout } = useAuth();
+  const { token, logout } = useAuth();
   const navigate = useNavigate();
 
   const handleLogout = () => {
     /*
       STORY:
       - User clicks Logout
+      - Backend revokes the token (best effort)
       - Security clears data
       - Send user to login
     */
 
+    if (token) logoutApi(token).catch(() => {});
     logout();
     navigate("/");
   };